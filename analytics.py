@@ -1,41 +1,35 @@
-import sqlite3
-import pandas as pd
 from datetime import datetime, timedelta
 import json
 import os
+from db_connection import get_manager
 
 class MedicalAnalytics:
     def __init__(self, db_path="medical_content.db"):
         self.db_path = db_path
+        self.db = get_manager(db_path)
     
     def generate_weekly_report(self):
         """تولید گزارش هفتگی"""
         print("📈 در حال تولید گزارش هفتگی...")
         
         try:
-            conn = sqlite3.connect(self.db_path)
-            
-            # آمار هفته گذشته
+            # آمار هفته گذشته (از جدول تجمیعی daily_stats)
             week_ago = (datetime.now() - timedelta(days=7)).strftime('%Y-%m-%d')
             
-            weekly_stats = pd.read_sql_query('''
+            stats = self.db.query_one('''
                 SELECT 
-                    COUNT(*) as total_articles,
-                    SUM(word_count) as total_words,
-                    AVG(quality_score) as avg_quality,
-                    COUNT(DISTINCT category) as unique_categories
-                FROM articles 
-                WHERE DATE(created_at) >= ?
-            ''', conn, params=[week_ago])
-            
-            conn.close()
+                    SUM(total_articles) as total_articles,
+                    SUM(total_words) as total_words,
+                    SUM(total_quality) * 1.0 / SUM(total_articles) as avg_quality,
+                    (SELECT COUNT(DISTINCT c.key)
+                     FROM daily_stats d, json_each(d.categories_json) c
+                     WHERE d.date >= ?) as unique_categories
+                FROM daily_stats 
+                WHERE date >= ?
+            ''', (week_ago, week_ago))
             
-            stats = weekly_stats.to_dict('records')[0] if not weekly_stats.empty else {
-                'total_articles': 0,
-                'total_words': 0,
-                'avg_quality': 0,
-                'unique_categories': 0
-            }
+            # SUM روی هفته خالی NULL برمی‌گرداند
+            stats = {name: value or 0 for name, value in stats.items()}
             
             report = {
                 "period": "هفتگی",
@@ -48,7 +42,7 @@ class MedicalAnalytics:
             # ذخیره گزارش
             filename = f"weekly_report_{datetime.now().strftime('%Y%m%d')}.json"
             with open(filename, 'w', encoding='utf-8') as f:
-                json.dump(report, f, ensure_ascii=False, indent=2)
+                json.dump(report, f, ensure_ascii=False, separators=(',', ':'))
             
             print(f"✅ گزارش هفتگی تولید شد: {filename}")
             
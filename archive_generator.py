@@ -0,0 +1,255 @@
+import argparse
+import os
+import random
+import time
+from datetime import date, timedelta
+from content_codec import content_hash
+from database_handler import MedicalDatabase
+from fallback_templates import DEFAULT_BANK
+from medical_bot import AutoMedicalContentBot
+
+INSERT_SQL = '''
+    INSERT INTO articles
+    (title, content, category, word_count, reading_time, quality_score, status, created_at, created_date,
+     published, published_at, content_hash)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+SUMMARY_CHARS = 300
+
+class ArchiveGenerator:
+    """تولید آرشیو مصنوعی چندساله با همان موضوعات، دسته‌بندی‌ها و محتوای جایگزین ربات
+
+    توزیع‌ها (همه با seed قابل تکرار):
+    - تاریخ: اجرای روزانه با رشد خطی تعداد مقالات از start_rate تا end_rate، نوسان روزانه و
+      روزهای بدون اجرا (missed_days)
+    - دسته‌بندی: وزن هر دسته متناسب با تعداد موضوعات آن با اولویت نزولی (شبیه Zipf ملایم)
+    - کیفیت: مقالات PubMed (کیفیت ۱۰) که سهمشان با زمان از pubmed_share[0] به pubmed_share[1]
+      می‌رسد و بقیه محتوای جایگزین (کیفیت ۸)
+    content: 'full' متن کامل مقاله (پیش‌فرض)، 'summary' فقط ابتدای مقدمه یا 'none' - با summary و none
+    ستون word_count همچنان طول مقاله کامل را دارد، پس فقط برای آزمایش کوئری‌های آماری مناسب‌اند و
+    نه اندازه دیتابیس، فشرده‌سازی یا ساخت سایت
+    """
+
+    def __init__(self, seed=42, years=3, end_date=None, start_rate=2.0, end_rate=8.0, missed_days=0.02,
+                 pubmed_share=(0.3, 0.7), content='full', variants_per_topic=2, bot=None):
+        if content not in ('full', 'summary', 'none'):
+            raise ValueError("content باید full، summary یا none باشد")
+        self.seed = seed
+        self.years = years
+        self.end_date = end_date or date.today()
+        self.start_rate = start_rate
+        self.end_rate = end_rate
+        self.missed_days = missed_days
+        self.pubmed_share = pubmed_share
+        self.content = content
+        self.variants_per_topic = variants_per_topic
+        self.bot = bot or AutoMedicalContentBot(seed=seed)
+
+        rng = random.Random(seed)
+        by_category = {}
+        for title, entry in self.bot.topic_catalog().items():
+            by_category.setdefault(entry['category'], []).append(title)
+        categories = sorted(by_category)
+        rng.shuffle(categories)
+        self.categories = categories
+        self.topics = {category: sorted(by_category[category]) for category in categories}
+        self.category_weights = [
+            len(self.topics[category]) / (rank + 1) ** 0.5 for rank, category in enumerate(categories)
+        ]
+        self._variants = {}
+
+    def variants(self, topic):
+        """چند نسخه محتوای جایگزین هر موضوع (یک بار ساخته و بین ردیف‌ها مشترک می‌شود)"""
+        variants = self._variants.get(topic)
+        if variants is None:
+            rng = random.Random(f"{self.seed}:{topic}")
+            variants = []
+            for _ in range(self.variants_per_topic):
+                article = DEFAULT_BANK.render(topic, rng)
+                words = len(article.split())
+                if self.content == 'summary':
+                    # عنوان و ابتدای مقدمه (حدود ۳۰۰ نویسه) - مناسب آزمایش‌های مقیاس آمار و داشبورد
+                    article = '\n\n'.join(article.split('\n\n')[:3])[:SUMMARY_CHARS]
+                elif self.content == 'none':
+                    article = ''
+                variants.append((article, words))
+            self._variants[topic] = variants
+        return variants
+
+    def daily_counts(self, total, rng):
+        """تعداد مقالات هر روز - خروجی: لیست (تاریخ، تعداد) با مجموع دقیقاً total"""
+        days = max(1, round(self.years * 365))
+        first_day = self.end_date - timedelta(days=days - 1)
+        weights = []
+        for offset in range(days):
+            if rng.random() < self.missed_days:
+                weights.append(0.0)
+                continue
+            rate = self.start_rate + (self.end_rate - self.start_rate) * offset / max(1, days - 1)
+            weights.append(rate * rng.uniform(0.7, 1.3))
+        if not any(weights):
+            weights[-1] = 1.0
+        scale = total / sum(weights)
+        counts = [int(weight * scale) for weight in weights]
+        # باقیمانده گرد کردن به روزهای فعال (متناسب با وزن) اضافه می‌شود
+        active = [offset for offset, weight in enumerate(weights) if weight]
+        for offset in rng.choices(active, weights=[weights[i] for i in active], k=total - sum(counts)):
+            counts[offset] += 1
+        return [(first_day + timedelta(days=offset), count) for offset, count in enumerate(counts) if count]
+
+    def rows(self, total):
+        """ردیف‌های جدول articles به ترتیب تاریخ (جریانی، بدون نگه داشتن کل آرشیو در حافظه)"""
+        rng = random.Random(self.seed)
+        schedule = self.daily_counts(total, rng)
+        span = max(1, (schedule[-1][0] - schedule[0][0]).days)
+        published_before = self.end_date - timedelta(days=7)
+        low, high = self.pubmed_share
+        for day, count in schedule:
+            day_text = day.isoformat()
+            progress = (day - schedule[0][0]).days / span
+            pubmed_share = low + (high - low) * progress
+            published = day < published_before
+            # اجرای روزانه حدود ساعت ۸ صبح شروع می‌شود و مقالات پشت سر هم ذخیره می‌شوند
+            seconds = 8 * 3600 + rng.randrange(1800)
+            categories = rng.choices(self.categories, weights=self.category_weights, k=count)
+            used = {}
+            for category in categories:
+                topic = rng.choice(self.topics[category])
+                # عنوان+تاریخ یکتاست: تکرار موضوع در یک روز عنوان «بخش n» می‌گیرد
+                repeat = used[topic] = used.get(topic, 0) + 1
+                title = topic if repeat == 1 else f"{topic} (بخش {repeat})"
+                content, words = rng.choice(self.variants(topic))
+                if rng.random() < pubmed_share:
+                    quality, words = 10, max(600, int(rng.gauss(1050, 150)))
+                else:
+                    quality = 8
+                seconds += rng.randrange(5, 90)
+                created_at = f"{day_text}T{seconds // 3600 % 24:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+                yield (
+                    title, content, category, words, f"{max(5, words // 150)} دقیقه", quality,
+                    'منتشر شده' if published else 'تولید شده', created_at, day_text,
+                    published, created_at if published else None
+                )
+
+def bulk_load(db_path, rows, batch_size=50_000):
+    """درج سریع انبوه ردیف‌ها در جدول articles
+
+    ایندکس‌ها و triggerهای جدول در طول درج حذف و پس از آن یک‌جا ساخته می‌شوند و
+    daily_stats به جای به‌روزرسانی ردیف به ردیف با یک GROUP BY بازسازی می‌شود.
+    ایندکس تکراری‌ها (MinHash/LSH) هم پر می‌شود: امضای هر متن یکتا یک بار محاسبه و اولین ردیف
+    آن مانند index_duplicates ثبت یا علامت‌گذاری می‌شود و ردیف‌های بعدی همان متن تکراری آن هستند.
+    همه مراحل در یک تراکنش است: خطا (مثلاً عنوان+تاریخ تکراری) دیتابیس را تغییر نمی‌دهد.
+    خروجی: تعداد ردیف‌های درج‌شده
+    """
+    db = MedicalDatabase(db_path)
+    inserted = 0
+    # محتوای هر نسخه یک بار فشرده، هش و امضا می‌شود (نسخه‌ها بین ردیف‌ها مشترک هستند)
+    compressed = {}
+    signatures = {}
+    def compress(row):
+        stored = compressed.get(row[1])
+        if stored is None:
+            stored = compressed[row[1]] = (db.codec.compress(row[1]), content_hash(row[1]))
+            signatures[stored[1]] = db.dedup.signature(row[1])
+        return (row[0], stored[0]) + row[2:] + (stored[1],)
+    conn = db.db.connection()
+    conn.execute('PRAGMA synchronous = OFF')
+    try:
+        with db.db.transaction() as conn:
+            conn.execute('BEGIN')
+            saved = conn.execute('''
+                SELECT type, name, sql FROM sqlite_master
+                WHERE tbl_name = 'articles' AND type IN ('index', 'trigger') AND sql IS NOT NULL
+            ''').fetchall()
+            for kind, name, _ in saved:
+                conn.execute(f'DROP {kind.upper()} "{name}"')
+            last_id = conn.execute('SELECT IFNULL(MAX(id), 0) FROM articles').fetchone()[0]
+
+            batch = []
+            for row in rows:
+                batch.append(compress(row))
+                if len(batch) == batch_size:
+                    conn.executemany(INSERT_SQL, batch)
+                    inserted += len(batch)
+                    batch = []
+            if batch:
+                conn.executemany(INSERT_SQL, batch)
+                inserted += len(batch)
+
+            # ایندکس‌ها اول ساخته می‌شوند تا بازسازی آمار از ایندکس پوششی استفاده کند
+            for kind, _, sql in saved:
+                if kind == 'index':
+                    conn.execute(sql)
+            conn.execute('DELETE FROM daily_stats')
+            conn.execute('''
+                INSERT INTO daily_stats (date, total_articles, total_words, total_quality, avg_quality, categories_json)
+                SELECT date, total_articles, total_words, total_quality, avg_quality, categories_json
+                FROM daily_stats_source
+            ''')
+            for kind, _, sql in saved:
+                if kind == 'trigger':
+                    conn.execute(sql)
+            index_variants(db, conn, signatures, last_id)
+    finally:
+        conn.execute('PRAGMA synchronous = NORMAL')
+    return inserted
+
+def index_variants(db, conn, signatures, last_id):
+    """ایندکس تکراری‌های ردیف‌های درج‌شده (id > last_id) با یک امضا برای هر متن یکتا
+
+    نتیجه همان index_duplicates دیتابیس است (به ترتیب شناسه) بدون محاسبه امضای هر ردیف.
+    """
+    roots = []
+    for text_hash, first_id in conn.execute('''
+        SELECT content_hash, MIN(id) FROM articles WHERE id > ? GROUP BY content_hash ORDER BY MIN(id)
+    ''', (last_id,)).fetchall():
+        matches = db.dedup.find_similar(conn, signatures[text_hash], limit=1)
+        if matches:
+            roots.append((text_hash, matches[0][0]))
+        else:
+            db.dedup.add(conn, first_id, signatures[text_hash])
+            roots.append((text_hash, first_id))
+    conn.execute('CREATE TEMP TABLE variant_roots (content_hash TEXT PRIMARY KEY, root_id INTEGER)')
+    try:
+        conn.executemany('INSERT INTO variant_roots VALUES (?, ?)', roots)
+        conn.execute('''
+            UPDATE articles SET duplicate_of = NULLIF(
+                (SELECT root_id FROM variant_roots v WHERE v.content_hash = articles.content_hash), id
+            )
+            WHERE id > ?
+        ''', (last_id,))
+    finally:
+        conn.execute('DROP TABLE variant_roots')
+
+def generate_archive(db_path, total, seed=42, years=3, content='full', batch_size=50_000, **options):
+    """ساخت آرشیو مصنوعی total مقاله‌ای در db_path - خروجی: گزارش زمان و نرخ درج"""
+    generator = ArchiveGenerator(seed=seed, years=years, content=content, **options)
+    start = time.perf_counter()
+    inserted = bulk_load(db_path, generator.rows(total), batch_size)
+    seconds = time.perf_counter() - start
+    return {
+        'articles': inserted,
+        'seconds': seconds,
+        'rows_per_sec': inserted / seconds if seconds else 0.0,
+        'size_mb': os.path.getsize(db_path) / 1024 / 1024
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="تولید آرشیو مصنوعی بزرگ برای تست بار دیتابیس و داشبورد")
+    parser.add_argument('--db', default="synthetic_archive.db", help="مسیر دیتابیس خروجی")
+    parser.add_argument('--articles', type=int, default=1_000_000, help="تعداد مقالات")
+    parser.add_argument('--years', type=float, default=3, help="بازه زمانی آرشیو (سال)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--content', choices=['full', 'summary', 'none'], default='full',
+                        help="full متن کامل (پیش‌فرض)؛ summary (حدود ۳۰۰ نویسه) و none دیتابیس کوچک‌تری "
+                             "می‌سازند ولی word_count طول مقاله کامل است - برای سنجش اندازه، فشرده‌سازی "
+                             "یا ساخت سایت مناسب نیستند")
+    args = parser.parse_args()
+
+    print(f"🏗️ در حال ساخت آرشیو {args.articles:,} مقاله‌ای ({args.years:g} سال) در {args.db}...")
+    report = generate_archive(args.db, args.articles, args.seed, args.years, args.content)
+    print(f"✅ {report['articles']:,} مقاله در {report['seconds']:.1f} ثانیه درج شد "
+          f"({report['rows_per_sec']:,.0f} ردیف در ثانیه، {report['size_mb']:.0f} مگابایت)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,406 @@
+import math
+import re
+from collections import Counter, defaultdict
+
+# طول هدف مقاله (کلمه، بدون فهرست منابع)
+TARGET_WORDS = 1000
+# بودجه تقریبی کلمات جملات استخراج‌شده هر بخش - بودجه استفاده‌نشده یک بخش به بخش‌های دیگر می‌رسد
+SECTION_BUDGETS = {'background': 170, 'methods': 130, 'results': 330, 'conclusions': 170}
+STUDY_TYPE_NAMES = {'Meta-Analysis': "متا-آنالیز", 'Systematic Review': "مرور سیستماتیک",
+                    'Randomized Controlled Trial': "کارآزمایی بالینی تصادفی", 'Review': "مرور"}
+SECTION_HEADINGS = (
+    ('background', "مقدمه"),
+    ('methods', "روش‌های بررسی"),
+    ('results', "نتایج"),
+    ('conclusions', "بحث و نتیجه‌گیری"),
+)
+# NlmCategory چکیده ساختاریافته ← بخش مقاله
+NLM_SECTIONS = {
+    'BACKGROUND': 'background', 'OBJECTIVE': 'background', 'UNASSIGNED': 'background',
+    'METHODS': 'methods',
+    'RESULTS': 'results',
+    'CONCLUSIONS': 'conclusions',
+}
+
+STOPWORDS = frozenset('''
+a about above after again all also among an and any are as at be been before being between both but by can
+could did do does during each either for from further had has have having he her here his how however i if
+in into is it its itself may might more most much must no nor not of on once only or other our out over own
+per same she should so some such than that the their them then there these they this those through to too
+under until up very was we were what when where which while who whom why will with within without would you
+study studies review analysis included including results conclusions background methods objective
+'''.split())
+
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+(?=[A-Z(\[])')
+# نقطه این اختصارها پایان جمله نیست
+_ABBREVIATIONS = re.compile(r'\b(vs|e\.g|i\.e|et al|approx|ca|no|fig)\.\s+', re.IGNORECASE)
+_TOKEN = re.compile(r'[a-z][a-z0-9\-]+|\d+(?:\.\d+)?%?')
+_HAS_NUMBER = re.compile(r'\d')
+_PERSIAN_DIGITS = str.maketrans('0123456789', '۰۱۲۳۴۵۶۷۸۹')
+
+_METHOD_CUES = ('we searched', 'were searched', 'random-effects', 'random effects', 'pooled', 'eligible',
+                'inclusion criteria', 'databases', 'medline', 'embase', 'we included', 'were included')
+_RESULT_CUES = ('95% ci', 'reduced', 'increased', 'lower risk', 'higher risk', 'associated with', 'odds ratio',
+                'relative risk', 'hazard ratio', 'mean difference', 'participants', 'heterogeneity')
+_CONCLUSION_CUES = ('conclude', 'suggest', 'should', 'support', 'needed', 'recommend', 'may be', 'findings')
+
+def persian_number(value):
+    return str(value).translate(_PERSIAN_DIGITS)
+
+def split_sentences(text):
+    """تقسیم متن انگلیسی چکیده به جمله‌ها (با در نظر گرفتن اختصارهای رایج)"""
+    protected = _ABBREVIATIONS.sub(lambda m: m.group(0).replace('. ', '.\x00'), text.strip())
+    return [s.replace('\x00', ' ').strip() for s in _SENTENCE_END.split(protected) if len(s.split()) >= 4]
+
+def tokenize(text):
+    return [token for token in _TOKEN.findall(text.lower()) if token not in STOPWORDS]
+
+def classify_sentence(sentence, position, count):
+    """بخش جمله در چکیده بدون ساختار: نشانه‌های متنی و سپس جایگاه جمله"""
+    lowered = sentence.lower()
+    if any(cue in lowered for cue in _METHOD_CUES):
+        return 'methods'
+    if any(cue in lowered for cue in _RESULT_CUES) or ('%' in lowered and _HAS_NUMBER.search(lowered)):
+        return 'results'
+    if position == count - 1 or any(cue in lowered for cue in _CONCLUSION_CUES):
+        return 'conclusions' if position > 0 else 'background'
+    return 'background' if position == 0 else 'results'
+
+def extract_sentences(articles):
+    """جملات همه چکیده‌ها با شماره منبع، جایگاه و بخش مقاله"""
+    sentences = []
+    for source, article in enumerate(articles):
+        sections = article.get('abstract_sections') or [{'label': '', 'category': '', 'text': article['abstract']}]
+        structured = any(section.get('category') in NLM_SECTIONS for section in sections)
+        texts = []
+        for section in sections:
+            for sentence in split_sentences(section['text']):
+                texts.append((sentence, NLM_SECTIONS.get(section.get('category')) if structured else None))
+        for position, (text, section) in enumerate(texts):
+            sentences.append({
+                'text': text,
+                'source': source,
+                'position': position,
+                'section': section or classify_sentence(text, position, len(texts)),
+                'tokens': tokenize(text),
+                'words': len(text.split())
+            })
+    return sentences
+
+def _numpy():
+    """numpy اختیاری است و فقط هنگام اولین رتبه‌بندی import می‌شود"""
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+def tfidf_matrix(sentences, np):
+    """ماتریس TF-IDF نرمال‌شده جملات (هر سطر یک جمله) با numpy - همان وزن‌های tfidf_vectors"""
+    vocabulary = {}
+    rows, columns = [], []
+    for index, sentence in enumerate(sentences):
+        for token in sentence['tokens']:
+            rows.append(index)
+            columns.append(vocabulary.setdefault(token, len(vocabulary)))
+    counts = np.zeros((len(sentences), len(vocabulary)))
+    np.add.at(counts, (np.array(rows, dtype=np.intp), np.array(columns, dtype=np.intp)), 1.0)
+    present = counts > 0
+    idf = np.log((1 + len(sentences)) / (1 + present.sum(axis=0)))
+    weights = np.where(present, (1 + np.log(np.where(present, counts, 1.0))) * idf + 1e-9, 0.0)
+    norms = np.sqrt((weights * weights).sum(axis=1))
+    norms[norms == 0] = 1.0
+    return weights / norms[:, None]
+
+def textrank_matrix(matrix, np, damping=0.85, iterations=30, tolerance=1e-6):
+    """همان textrank روی ماتریس TF-IDF: شباهت همه جفت‌ها با یک ضرب ماتریسی و تکرار برداری"""
+    count = matrix.shape[0]
+    if not count:
+        return []
+    similarity = matrix @ matrix.T
+    np.fill_diagonal(similarity, 0.0)
+    out_weight = similarity.sum(axis=1)
+    dangling = out_weight == 0
+    out_weight[dangling] = 1.0
+    scores = np.full(count, 1.0 / count)
+    for _ in range(iterations):
+        # جمله بدون همسایه امتیازش را به طور یکنواخت بین همه پخش می‌کند
+        base = (1 - damping) / count + damping * scores[dangling].sum() / count
+        new_scores = base + damping * (similarity @ np.where(dangling, 0.0, scores / out_weight))
+        delta = np.abs(new_scores - scores).sum()
+        scores = new_scores
+        if delta < tolerance:
+            break
+    return scores.tolist()
+
+def tfidf_vectors(sentences):
+    """بردار TF-IDF هر جمله به صورت dict نرمال‌شده (کسینوس = ضرب داخلی)"""
+    document_frequency = Counter()
+    for sentence in sentences:
+        document_frequency.update(set(sentence['tokens']))
+    total = len(sentences)
+    vectors = []
+    for sentence in sentences:
+        counts = Counter(sentence['tokens'])
+        vector = {
+            term: (1 + math.log(count)) * math.log((1 + total) / (1 + document_frequency[term])) + 1e-9
+            for term, count in counts.items()
+        }
+        norm = math.sqrt(sum(weight * weight for weight in vector.values())) or 1.0
+        vectors.append({term: weight / norm for term, weight in vector.items()})
+    return vectors
+
+def textrank(vectors, damping=0.85, iterations=30, tolerance=1e-6):
+    """امتیاز TextRank جملات روی گراف شباهت کسینوسی
+
+    شباهت‌ها با ایندکس معکوس (واژه ← جملات) جمع می‌شوند، پس فقط جفت‌هایی که واژه مشترک
+    دارند محاسبه می‌شوند نه همه n² جفت.
+    """
+    postings = defaultdict(list)
+    for index, vector in enumerate(vectors):
+        for term, weight in vector.items():
+            postings[term].append((index, weight))
+    edges = [defaultdict(float) for _ in vectors]
+    for entries in postings.values():
+        if len(entries) < 2:
+            continue
+        for i, (first, first_weight) in enumerate(entries):
+            for second, second_weight in entries[i + 1:]:
+                if first != second:
+                    product = first_weight * second_weight
+                    edges[first][second] += product
+                    edges[second][first] += product
+
+    count = len(vectors)
+    if not count:
+        return []
+    out_weight = [sum(neighbours.values()) for neighbours in edges]
+    scores = [1.0 / count] * count
+    dangling = [node for node in range(count) if not out_weight[node]]
+    for _ in range(iterations):
+        # جمله بدون همسایه امتیازش را به طور یکنواخت بین همه پخش می‌کند
+        base = (1 - damping) / count + damping * sum(scores[node] for node in dangling) / count
+        new_scores = [base] * count
+        for node, neighbours in enumerate(edges):
+            if out_weight[node]:
+                share = damping * scores[node] / out_weight[node]
+                for neighbour, weight in neighbours.items():
+                    new_scores[neighbour] += share * weight
+        delta = sum(abs(new - old) for new, old in zip(new_scores, scores))
+        scores = new_scores
+        if delta < tolerance:
+            break
+    return scores
+
+def rank_sentences(sentences, query_terms=()):
+    """امتیاز نهایی: TextRank × (۱ + هم‌پوشانی با کوئری موضوع)، با پاداش اعداد در نتایج
+
+    با numpy (در صورت نصب بودن) TF-IDF و TextRank برداری محاسبه می‌شوند و بردار هر جمله یک سطر
+    ماتریس است؛ بدون آن همان محاسبه با dict و ایندکس معکوس انجام می‌شود.
+    """
+    np = _numpy()
+    if np is None:
+        vectors = tfidf_vectors(sentences)
+        scores = textrank(vectors)
+    else:
+        vectors = tfidf_matrix(sentences, np)
+        scores = textrank_matrix(vectors, np)
+    query_terms = set(query_terms)
+    for sentence, vector, score in zip(sentences, vectors, scores):
+        sentence['vector'] = vector
+        tokens = set(sentence['tokens'])
+        overlap = len(tokens & query_terms) / len(query_terms) if query_terms else 0.0
+        bonus = 1.2 if sentence['section'] == 'results' and _HAS_NUMBER.search(sentence['text']) else 1.0
+        # گرد کردن: جملات هم‌امتیاز (مثلاً تکراری) در هر دو روش محاسبه به یک ترتیب انتخاب می‌شوند
+        sentence['score'] = round(score * (1 + overlap) * bonus, 12)
+    return sentences
+
+def cosine(first, second):
+    if not isinstance(first, dict):
+        return float(first @ second)
+    if len(first) > len(second):
+        first, second = second, first
+    return sum(weight * second.get(term, 0.0) for term, weight in first.items())
+
+def select_sentences(sentences, budget, selected=(), redundancy=0.7):
+    """انتخاب حریصانه جملات با بیشترین امتیاز تا بودجه کلمات؛ خروجی به ترتیب منبع و جایگاه
+
+    جمله‌ای که تقریباً تکرار یکی از جملات انتخاب‌شده (در این بخش یا selected) باشد کنار گذاشته می‌شود.
+    """
+    chosen, used = [], 0
+    for sentence in sorted(sentences, key=lambda s: -s['score']):
+        if used and used + sentence['words'] > budget:
+            continue
+        if any(cosine(sentence['vector'], other['vector']) >= redundancy for other in (*selected, *chosen)):
+            continue
+        chosen.append(sentence)
+        used += sentence['words']
+    return sorted(chosen, key=lambda s: (s['source'], s['position']))
+
+def format_authors(authors, total=None):
+    """نام نویسندگان به سبک ونکوور: «Rahimi S, Chen W» - et al فقط وقتی نویسندگانی حذف شده باشند
+
+    total: تعداد واقعی نویسندگان (پردازشگر فقط سه نویسنده اول را نگه می‌دارد)
+    """
+    formatted = []
+    for author in authors:
+        parts = author.split()
+        if len(parts) > 1:
+            formatted.append(f"{parts[-1]} {''.join(part[0] for part in parts[:-1])}")
+        else:
+            formatted.append(author)
+    return ', '.join(formatted) + (', et al' if (total or 0) > len(authors) else '')
+
+def format_reference(number, article):
+    """یک منبع واقعی از نویسندگان، عنوان، مجله، سال، DOI و PMID مقاله"""
+    parts = []
+    if article.get('authors'):
+        parts.append(format_authors(article['authors'], article.get('author_count')) + '.')
+    parts.append(article['title'].rstrip('.') + '.')
+    if article.get('journal') and article['journal'] != "نامشخص":
+        parts.append(f"{article['journal']}.")
+    if article.get('year') and article['year'] != "نامشخص":
+        parts.append(f"{article['year']}.")
+    if article.get('doi') and article['doi'] != "نامشخص":
+        parts.append(f"doi:{article['doi']}.")
+    if article.get('pmid'):
+        parts.append(f"PMID: {article['pmid']}.")
+    return f"{persian_number(number)}. {' '.join(parts)}"
+
+def _year_range(articles):
+    years = sorted(int(a['year']) for a in articles if str(a.get('year', '')).isdigit())
+    if not years:
+        return ""
+    if years[0] == years[-1]:
+        return f" منتشرشده در سال {persian_number(years[0])}"
+    return f" منتشرشده بین سال‌های {persian_number(years[0])} تا {persian_number(years[-1])}"
+
+def _study_types(articles):
+    types = Counter(t for a in articles for t in a.get('publication_types', []) if t in STUDY_TYPE_NAMES)
+    return '، '.join(f"{persian_number(count)} {STUDY_TYPE_NAMES[kind]}" for kind, count in types.most_common())
+
+def study_overview(number, article, quoted):
+    """معرفی یک مطالعه منبع از روی اطلاعات آن (عنوان، مجله، سال، نوع و MeSH) بدون عدد ساختگی"""
+    text = f"مطالعه [{persian_number(number)}] با عنوان «{article['title'].rstrip('.')}»"
+    if article.get('year') and article['year'] != "نامشخص":
+        text += f" در سال {persian_number(article['year'])}"
+    if article.get('journal') and article['journal'] != "نامشخص":
+        text += f" در مجله {article['journal']}"
+    text += " منتشر شده است"
+    types = [STUDY_TYPE_NAMES[t] for t in article.get('publication_types', []) if t in STUDY_TYPE_NAMES]
+    text += f" و از نوع {' و '.join(types)} است. " if types else ". "
+    if article.get('mesh_terms'):
+        text += f"محورهای اصلی این مطالعه بر اساس اصطلاحات MeSH عبارت‌اند از: {'، '.join(article['mesh_terms'][:5])}. "
+    text += (f"{persian_number(quoted)} جمله کلیدی از چکیده این مطالعه در بخش‌های بالا نقل شده است؛ "
+             "جزئیات روش‌شناسی، ویژگی‌های شرکت‌کنندگان و پیامدهای ثانویه در متن کامل مقاله در دسترس است.")
+    return text
+
+def _words(sentences):
+    return sum(sentence['words'] for sentence in sentences)
+
+def allocate_sentences(by_section, budgets):
+    """انتخاب جملات هر بخش؛ بودجه بخش‌هایی که جمله کافی ندارند بین بخش‌های دیگر پخش می‌شود"""
+    chosen, selected = {}, []
+    for section, _ in SECTION_HEADINGS:
+        chosen[section] = select_sentences(by_section.get(section, []), budgets[section], selected)
+        selected.extend(chosen[section])
+    spare = sum(budgets.values()) - _words(selected)
+    for section, _ in SECTION_HEADINGS:
+        if spare <= 0:
+            break
+        others = [sentence for sentence in selected if sentence['section'] != section]
+        extended = select_sentences(by_section.get(section, []), _words(chosen[section]) + spare, others)
+        spare -= _words(extended) - _words(chosen[section])
+        chosen[section] = extended
+        selected = others + extended
+    return chosen
+
+def synthesize_article(topic, articles, query=None, budgets=SECTION_BUDGETS):
+    """ساخت مقاله جامع ساختاریافته از چکیده‌های PubMed - بدون شبکه و به صورت قطعی
+
+    جملات کلیدی هر بخش با TF-IDF/TextRank از چکیده‌ها استخراج و با شماره منبع ارجاع داده می‌شوند.
+    متن فقط از چکیده‌ها و اطلاعات منابع ساخته می‌شود و عدد یا ادعای ساختگی ندارد، پس با کمتر از
+    حدود چهار چکیده (هر چکیده با معرفی مطالعه‌اش حدود ۱۵۰ کلمه می‌آورد) مقاله کوتاه‌تر از
+    TARGET_WORDS می‌ماند.
+    """
+    sentences = rank_sentences(extract_sentences(articles), tokenize(query) if query else ())
+    by_section = defaultdict(list)
+    for sentence in sentences:
+        by_section[sentence['section']].append(sentence)
+
+    mesh = Counter(term for article in articles for term in article.get('mesh_terms', []))
+    journals = list(dict.fromkeys(a['journal'] for a in articles if a.get('journal') and a['journal'] != "نامشخص"))
+    count = persian_number(len(articles))
+    study_types = _study_types(articles)
+
+    framing = {
+        'background': (
+            f"{topic} از موضوعاتی است که در سال‌های اخیر در مطالعات مروری و متا-آنالیزهای متعددی بررسی شده است. "
+            f"این مقاله بر پایه {count} مطالعه نمایه‌شده در PubMed{_year_range(articles)} تهیه شده و "
+            "مهم‌ترین یافته‌های آن‌ها را با ذکر منبع هر جمله (شماره داخل کروشه) خلاصه می‌کند. "
+            "زمینه و اهداف مطالعات منتخب به شرح زیر است:"
+        ),
+        'methods': (
+            f"مطالعات این مرور با جستجوی مرورهای سیستماتیک و متا-آنالیزهای ده سال اخیر در PubMed انتخاب شدند"
+            + (f" و شامل {study_types} هستند" if study_types else "") + ". "
+            + (f"این مطالعات در مجلات {'، '.join(journals[:4])} منتشر شده‌اند. " if journals else "")
+            + "روش‌شناسی گزارش‌شده در چکیده‌ها:"
+        ),
+        'results': (
+            "مهم‌ترین نتایج کمّی و کیفی گزارش‌شده در مطالعات، به ترتیب منبع، در ادامه آمده است. "
+            "اعداد و فاصله‌های اطمینان عیناً از چکیده مقالات نقل شده‌اند:"
+        ),
+        'conclusions': (
+            "جمع‌بندی نویسندگان مطالعات و پیامدهای بالینی آن‌ها:"
+        ),
+    }
+    closing = (
+        f"در مجموع، شواهد موجود درباره {topic} بیشتر بر "
+        + ('، '.join(term for term, _ in mesh.most_common(4)) if mesh else "مداخلات بررسی‌شده")
+        + " متمرکز است. با توجه به ناهمگونی مطالعات و محدودیت‌های ذکرشده در آن‌ها، "
+        "تصمیم‌گیری درمانی باید با مشورت پزشک و بر اساس شرایط هر فرد انجام شود."
+    )
+
+    chosen_by_section = allocate_sentences(by_section, budgets)
+    # فقط منابعی که جمله‌ای از آن‌ها نقل شده، به ترتیب اولین ارجاع شماره‌گذاری می‌شوند
+    numbers, quoted = {}, Counter()
+    for section, _ in SECTION_HEADINGS:
+        for sentence in chosen_by_section[section]:
+            numbers.setdefault(sentence['source'], len(numbers) + 1)
+            quoted[sentence['source']] += 1
+
+    parts = []
+    for section, heading in SECTION_HEADINGS:
+        parts.append(f"## {heading}\n\n{framing[section]}\n\n")
+        if chosen_by_section[section]:
+            parts.append('\n'.join(
+                f"- {sentence['text']} [{persian_number(numbers[sentence['source']])}]"
+                for sentence in chosen_by_section[section]
+            ))
+            parts.append("\n\n")
+    parts.append(f"{closing}\n\n")
+
+    # با چکیده‌های کم، معرفی مطالعات منبع (به ترتیب ارجاع) مقاله را به طول هدف می‌رساند
+    words = sum(len(part.split()) for part in parts)
+    overviews = []
+    for source, number in numbers.items():
+        if words >= TARGET_WORDS:
+            break
+        overviews.append(study_overview(number, articles[source], quoted[source]))
+        words += len(overviews[-1].split())
+    if overviews:
+        parts.append("## مرور مطالعات منبع\n\n" + '\n\n'.join(overviews) + "\n\n")
+    if words < TARGET_WORDS:
+        parts.append(
+            "## نکات کاربردی\n\n"
+            f"یافته‌های مطالعات بالا درباره {topic} میانگین اثر در جمعیت‌های مورد مطالعه را نشان می‌دهند و "
+            "پاسخ هر فرد ممکن است با توجه به سن، بیماری‌های همراه، داروهای مصرفی و سبک زندگی متفاوت باشد. "
+            "پیش از شروع یا تغییر هر درمان، نتایج را با پزشک معالج در میان بگذارید و از قطع خودسرانه داروها "
+            "خودداری کنید. پیگیری منظم، ثبت علائم و انجام آزمایش‌های دوره‌ای به پزشک کمک می‌کند اثربخشی و "
+            "عوارض احتمالی را به موقع ارزیابی کند. همچنین به خاطر داشته باشید که شواهد علمی به طور مداوم "
+            "به‌روز می‌شوند و مطالعات جدیدتر ممکن است توصیه‌های فعلی را تکمیل یا اصلاح کنند.\n\n"
+        )
+    parts.append("## منابع\n\n")
+    parts.append('\n\n'.join(format_reference(number, articles[source]) for source, number in numbers.items()))
+    parts.append("\n")
+    return ''.join(parts)
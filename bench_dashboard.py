@@ -0,0 +1,110 @@
+# bench_dashboard.py
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+from database_handler import MedicalDatabase
+from dashboard import MedicalDashboard
+from stats_engine import StatsEngine
+
+CATEGORIES = ["قلب و عروق", "تغذیه و رژیم", "سلامت روان", "دیابت", "پوست و مو", "عمومی"]
+SIZES = (10_000, 100_000, 1_000_000)
+REPEATS = 5
+
+INSERT_SQL = '''
+    INSERT INTO articles (title, content, category, word_count, quality_score, created_at, created_date)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+'''
+
+def build_archive(db_path, rows, days=3 * 365, seed=42):
+    """ساخت آرشیو مصنوعی با rows مقاله پخش‌شده در days روز (جدول تجمیعی با trigger پر می‌شود)"""
+    db = MedicalDatabase(db_path)
+    rng = random.Random(seed)
+    first_day = date.today() - timedelta(days=days - 1)
+    batch = []
+    with db.db.transaction() as conn:
+        for i in range(rows):
+            day = (first_day + timedelta(days=i % days)).isoformat()
+            batch.append((
+                f"مقاله {i}", "متن", rng.choice(CATEGORIES),
+                rng.randint(500, 1500), rng.randint(5, 10), f"{day}T08:00:00", day
+            ))
+            if len(batch) == 10_000:
+                conn.executemany(INSERT_SQL, batch)
+                batch = []
+        if batch:
+            conn.executemany(INSERT_SQL, batch)
+    return db
+
+def legacy_overview(conn):
+    """روش قبلی: پنج read_sql_query جدا روی کل جدول articles"""
+    import pandas as pd
+    today = date.today().isoformat()
+    return {
+        'total_articles': pd.read_sql_query('SELECT COUNT(*) as count FROM articles', conn).iloc[0]['count'],
+        'today_articles': pd.read_sql_query(
+            'SELECT COUNT(*) as count FROM articles WHERE DATE(created_at) = ?', conn, params=[today]
+        ).iloc[0]['count'],
+        'avg_quality': pd.read_sql_query('SELECT AVG(quality_score) as avg FROM articles', conn).iloc[0]['avg'],
+        'categories': pd.read_sql_query('''
+            SELECT category, COUNT(*) as count FROM articles
+            GROUP BY category ORDER BY count DESC
+        ''', conn).to_dict('records'),
+        'total_words': pd.read_sql_query('SELECT SUM(word_count) as total FROM articles', conn).iloc[0]['total'] or 0
+    }
+
+def best_of(func, repeats=REPEATS):
+    """کمترین زمان اجرا (میلی‌ثانیه) در چند تکرار"""
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return min(timings), result
+
+def run_benchmark(rows, tmp):
+    db_path = os.path.join(tmp, f"archive_{rows}.db")
+    start = time.perf_counter()
+    db = build_archive(db_path, rows)
+    build_seconds = time.perf_counter() - start
+
+    conn = db.db.connection()
+    engine = StatsEngine(db_path)
+    legacy_ms, legacy = best_of(lambda: legacy_overview(conn))
+    engine_ms, stats = best_of(engine.overview)
+    assert stats['total_articles'] == legacy['total_articles'] == rows
+    assert stats['total_words'] == legacy['total_words']
+
+    # رندر کامل داشبورد و صفحات دسته‌بندی با اندازه‌گیری اوج حافظه
+    tracemalloc.start()
+    start = time.perf_counter()
+    MedicalDashboard(db_path).generate_html_dashboard(os.path.join(tmp, f"site_{rows}"), page_size=1000)
+    render_seconds = time.perf_counter() - start
+    render_peak_mb = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+    tracemalloc.stop()
+
+    return {
+        'rows': rows,
+        'build_seconds': build_seconds,
+        'legacy_ms': legacy_ms,
+        'engine_ms': engine_ms,
+        'render_seconds': render_seconds,
+        'render_peak_mb': render_peak_mb
+    }
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or SIZES
+    print("🧪 بنچمارک آمار کلی داشبورد (پنج کوئری pandas در برابر جدول تجمیعی)...")
+    print(f"{'تعداد مقالات':>12} {'ساخت (s)':>10} {'روش قبلی ms':>12} {'موتور آمار ms':>14} {'بهبود':>8} {'رندر (s)':>10} {'اوج حافظه MB':>13}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in sizes:
+            r = run_benchmark(rows, tmp)
+            print(f"{r['rows']:>12} {r['build_seconds']:>10.1f} {r['legacy_ms']:>12.1f} "
+                  f"{r['engine_ms']:>14.2f} {r['legacy_ms'] / r['engine_ms']:>7.0f}x "
+                  f"{r['render_seconds']:>10.1f} {r['render_peak_mb']:>13.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+# bench_database.py
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from db_connection import ConnectionManager
+
+ARTICLES_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS articles (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        title TEXT NOT NULL,
+        content TEXT NOT NULL,
+        category TEXT,
+        word_count INTEGER,
+        quality_score INTEGER,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+'''
+
+INSERT_SQL = 'INSERT INTO articles (title, content, category, word_count, quality_score) VALUES (?, ?, ?, ?, ?)'
+READ_SQL = 'SELECT COUNT(*), AVG(quality_score), SUM(word_count) FROM articles'
+CONTENT = "متن نمونه مقاله پزشکی " * 200
+
+class LegacyAccess:
+    """روش قبلی: اتصال جدید برای هر عملیات با تنظیمات پیش‌فرض journal"""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+
+    def write(self, row):
+        conn = sqlite3.connect(self.db_path)
+        conn.execute(INSERT_SQL, row)
+        conn.commit()
+        conn.close()
+
+    def read(self):
+        conn = sqlite3.connect(self.db_path)
+        result = conn.execute(READ_SQL).fetchone()
+        conn.close()
+        return result
+
+class PooledAccess:
+    """روش جدید: اتصال ماندگار هر thread با WAL از طریق ConnectionManager"""
+
+    def __init__(self, db_path):
+        self.manager = ConnectionManager(db_path)
+
+    def write(self, row):
+        with self.manager.transaction() as conn:
+            conn.execute(INSERT_SQL, row)
+
+    def read(self):
+        return self.manager.connection().execute(READ_SQL).fetchone()
+
+def run_benchmark(access_class, db_path, writes=1000, readers=4):
+    """یک نویسنده و چند خواننده همزمان - خروجی: نرخ نوشتن/خواندن و تعداد خطاها"""
+    conn = sqlite3.connect(db_path)
+    conn.execute(ARTICLES_SCHEMA)
+    conn.commit()
+    conn.close()
+
+    access = access_class(db_path)
+    done = threading.Event()
+    counters = {'reads': 0, 'read_errors': 0, 'write_errors': 0, 'max_read_ms': 0.0}
+    lock = threading.Lock()
+
+    def reader():
+        while not done.is_set():
+            start = time.perf_counter()
+            try:
+                access.read()
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                with lock:
+                    counters['reads'] += 1
+                    counters['max_read_ms'] = max(counters['max_read_ms'], elapsed_ms)
+            except sqlite3.OperationalError:
+                with lock:
+                    counters['read_errors'] += 1
+
+    threads = [threading.Thread(target=reader) for _ in range(readers)]
+    for thread in threads:
+        thread.start()
+
+    start = time.perf_counter()
+    for i in range(writes):
+        try:
+            access.write((f"مقاله {i}", CONTENT, "قلب و عروق", 1000, 8))
+        except sqlite3.OperationalError:
+            counters['write_errors'] += 1
+    elapsed = time.perf_counter() - start
+
+    done.set()
+    for thread in threads:
+        thread.join()
+
+    return {
+        'mode': access_class.__name__,
+        'writes_per_sec': writes / elapsed,
+        'reads_per_sec': counters['reads'] / elapsed,
+        'max_read_ms': counters['max_read_ms'],
+        'errors': counters['read_errors'] + counters['write_errors']
+    }
+
+def main():
+    print("🧪 بنچمارک دسترسی همزمان به دیتابیس (۱ نویسنده + ۴ خواننده)...")
+    print(f"{'روش':<14} {'نوشتن/ثانیه':>12} {'خواندن/ثانیه':>13} {'بیشترین تأخیر خواندن ms':>24} {'خطا':>6}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for access_class in (LegacyAccess, PooledAccess):
+            db_path = os.path.join(tmp, f"{access_class.__name__}.db")
+            r = run_benchmark(access_class, db_path)
+            print(f"{r['mode']:<14} {r['writes_per_sec']:>12.0f} {r['reads_per_sec']:>13.0f} "
+                  f"{r['max_read_ms']:>24.1f} {r['errors']:>6}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+# bench_fallback.py
+import random
+import sys
+import time
+from fallback_templates import FallbackTemplateBank, DEFAULT_BANK
+from medical_bot import AutoMedicalContentBot
+
+COUNTS = (1_000, 10_000, 50_000)
+REPEATS = 3
+
+def best_of(func, repeats=REPEATS):
+    """کمترین زمان اجرا (ثانیه) در چند تکرار"""
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+def run_benchmark(count, seed=42):
+    topics = AutoMedicalContentBot(seed=seed).select_daily_topics(count)
+    # کاتالوگ موضوعات محدود است؛ برای دسته‌های بزرگ موضوعات تکرار می‌شوند
+    topics = (topics * (count // len(topics) + 1))[:count]
+    rng = random.Random(seed)
+
+    single_seconds, _ = best_of(lambda: [DEFAULT_BANK.render(topic, rng) for topic in topics])
+    batch_seconds, articles = best_of(lambda: DEFAULT_BANK.render_many(topics, rng))
+    words = sum(len(article.split()) for article in articles)
+    return {
+        'count': count,
+        'single_per_second': count / single_seconds,
+        'batch_per_second': count / batch_seconds,
+        'words_per_article': words / count
+    }
+
+def main():
+    counts = [int(arg) for arg in sys.argv[1:]] or COUNTS
+    compile_seconds, _ = best_of(FallbackTemplateBank)
+    print("🧪 بنچمارک تولید مقاله جایگزین (بانک قالب‌های کامپایل‌شده)...")
+    print(f"⚙️ کامپایل بانک قالب‌ها: {compile_seconds * 1000:.2f} میلی‌ثانیه")
+    print(f"{'تعداد مقالات':>12} {'تکی (مقاله/s)':>14} {'دسته‌ای (مقاله/s)':>17} {'کلمه/مقاله':>11}")
+    for count in counts:
+        r = run_benchmark(count)
+        print(f"{r['count']:>12} {r['single_per_second']:>14,.0f} {r['batch_per_second']:>17,.0f} "
+              f"{r['words_per_article']:>11.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+# bench_pubmed_parser.py
+import os
+import re
+import tempfile
+import time
+import tracemalloc
+import xml.etree.ElementTree as ET
+from pubmed_parser import iter_pubmed_articles, extract_article
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'efetch_sample.xml')
+
+def build_large_response(path, copies):
+    """ساخت پاسخ efetch بزرگ با تکرار رکوردهای فیکسچر ضبط شده"""
+    with open(FIXTURE, encoding='utf-8') as f:
+        fixture = f.read()
+    records = re.findall(r'<PubmedArticle>.*?</PubmedArticle>', fixture, re.S)
+
+    with open(path, 'w', encoding='utf-8') as out:
+        out.write('<?xml version="1.0" ?>\n<PubmedArticleSet>\n')
+        pmid = 10000000
+        for _ in range(copies):
+            for record in records:
+                pmid += 1
+                out.write(re.sub(r'<PMID Version="1">\d+</PMID>', f'<PMID Version="1">{pmid}</PMID>', record))
+                out.write('\n')
+        out.write('</PubmedArticleSet>\n')
+    return copies * len(records)
+
+def legacy_parse(xml_content):
+    """روش قبلی: regex روی کل پاسخ و ساخت درخت کامل با fromstring"""
+    clean_xml = re.sub(r'xmlns="[^"]+"', '', xml_content)
+    root = ET.fromstring(clean_xml)
+    articles = [extract_article(article) for article in root.findall('.//PubmedArticle')]
+    return [article for article in articles if article is not None]
+
+def measure(label, func):
+    """اندازه‌گیری زمان و اوج حافظه یک تابع"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    count = func()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'label': label, 'count': count, 'seconds': elapsed, 'peak_mb': peak / 1024 / 1024}
+
+def run_benchmark(copies_list=(100, 1000, 5000)):
+    """اجرای بنچمارک روی اندازه‌های مختلف پاسخ"""
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for copies in copies_list:
+            path = os.path.join(tmp, f'efetch_{copies}.xml')
+            records = build_large_response(path, copies)
+            size_mb = os.path.getsize(path) / 1024 / 1024
+
+            def run_legacy():
+                with open(path, encoding='utf-8') as f:
+                    return len(legacy_parse(f.read()))
+
+            def run_streaming():
+                return sum(1 for _ in iter_pubmed_articles(path))
+
+            for result in (measure('legacy', run_legacy), measure('iterparse', run_streaming)):
+                result.update({'records': records, 'size_mb': size_mb})
+                results.append(result)
+    return results
+
+def main():
+    print("🧪 بنچمارک پردازش XML پاسخ‌های PubMed...")
+    print(f"{'روش':<10} {'رکورد':>8} {'حجم MB':>8} {'ثانیه':>8} {'مقاله/ثانیه':>12} {'اوج حافظه MB':>14}")
+    for r in run_benchmark():
+        print(f"{r['label']:<10} {r['records']:>8} {r['size_mb']:>8.1f} {r['seconds']:>8.2f} "
+              f"{r['count'] / r['seconds']:>12.0f} {r['peak_mb']:>14.1f}")
+
+if __name__ == "__main__":
+    main()
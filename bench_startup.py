@@ -0,0 +1,68 @@
+# bench_startup.py
+import subprocess
+import sys
+
+# ماژول‌هایی که در هر اجرای CI و CLI بارگذاری می‌شوند
+MODULES = ("database_handler", "analytics", "dashboard", "medical_bot")
+
+# بسته‌های سنگینی که نباید در زمان شروع بارگذاری شوند
+FORBIDDEN = ("pandas", "numpy")
+
+# سقف زمان import هر ماژول (میلی‌ثانیه) - pandas به تنهایی چند صد میلی‌ثانیه بود
+STARTUP_BUDGET_MS = 400
+
+def measure_import(module):
+    """زمان import یک ماژول در یک پردازه تازه با python -X importtime
+
+    خروجی: زمان کل (ms)، مجموعه ماژول‌های بارگذاری‌شده و سنگین‌ترین‌ها
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, check=True
+    )
+    imported = []
+    for line in result.stderr.splitlines():
+        # قالب: import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        imported.append((name.strip(), int(cumulative) / 1000))
+
+    return {
+        'module': module,
+        'total_ms': dict(imported).get(module, 0.0),
+        'modules': {name.split('.')[0] for name, _ in imported},
+        'slowest': sorted(
+            (item for item in imported if item[0] != module and '.' not in item[0]),
+            key=lambda item: item[1], reverse=True
+        )[:3]
+    }
+
+def check_startup(modules=MODULES, budget_ms=STARTUP_BUDGET_MS):
+    """اندازه‌گیری همه ماژول‌ها و برگرداندن لیست تخطی‌ها از بودجه"""
+    results = [measure_import(module) for module in modules]
+    violations = []
+    for r in results:
+        heavy = [name for name in FORBIDDEN if name in r['modules']]
+        if heavy:
+            violations.append(f"{r['module']} بسته سنگین {', '.join(heavy)} را بارگذاری می‌کند")
+        if r['total_ms'] > budget_ms:
+            violations.append(f"{r['module']} در {r['total_ms']:.0f}ms بارگذاری شد (سقف {budget_ms}ms)")
+    return results, violations
+
+def main():
+    print(f"🧪 بنچمارک زمان شروع (python -X importtime، سقف {STARTUP_BUDGET_MS}ms)...")
+    results, violations = check_startup()
+    print(f"{'ماژول':<18} {'زمان ms':>9}   سنگین‌ترین وابستگی‌ها")
+    for r in results:
+        slowest = ', '.join(f"{name} {ms:.0f}ms" for name, ms in r['slowest'])
+        print(f"{r['module']:<18} {r['total_ms']:>9.1f}   {slowest}")
+
+    if violations:
+        for violation in violations:
+            print(f"❌ {violation}")
+        sys.exit(1)
+    print("✅ زمان شروع در محدوده مجاز است")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,310 @@
+# bench_suite.py
+import argparse
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+import telemetry
+from analytics import MedicalAnalytics
+from archive_generator import generate_archive
+from article_synthesis import synthesize_article
+from bench_pubmed_parser import build_large_response
+from dashboard import MedicalDashboard
+from database_handler import MedicalDatabase
+from fallback_templates import DEFAULT_BANK
+from medical_bot import AutoMedicalContentBot
+from pubmed_bot import PubMedBot
+from rate_limiter import TokenBucket
+from stats_engine import StatsEngine
+from topic_registry import get_registry
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+# پاسخ‌های ضبط‌شده eutils که سرور محلی به جای NCBI برمی‌گرداند
+RECORDED = {
+    'esearch': ('esearch_sample.json', 'application/json'),
+    'epost': ('epost_sample.xml', 'text/xml'),
+    'efetch': ('efetch_sample.xml', 'text/xml'),
+}
+RESULTS_PATH = os.environ.get('BENCH_RESULTS', 'bench_results.jsonl')
+SIZES = (1_000, 100_000, 1_000_000)
+REPEATS = 5
+
+class ReplayEutils:
+    """سرور محلی eutils که پاسخ‌های ضبط‌شده fixtures را برای هر درخواست برمی‌گرداند"""
+
+    def __init__(self):
+        self.responses = {}
+        for endpoint, (filename, content_type) in RECORDED.items():
+            with open(os.path.join(FIXTURES, filename), 'rb') as f:
+                self.responses[endpoint] = (f.read(), content_type)
+        self.requests = 0
+
+        replay = self
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                endpoint = urlparse(self.path).path.rsplit('/', 1)[-1].replace('.fcgi', '')
+                if endpoint not in replay.responses:
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                body, content_type = replay.responses[endpoint]
+                replay.requests += 1
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                self.do_GET()
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+def best_of(func, repeats=REPEATS):
+    """کمترین زمان اجرا (ثانیه) در چند تکرار به همراه خروجی آخرین اجرا"""
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def metric(name, value, unit, higher_is_better=True):
+    return {'name': name, 'value': value, 'unit': unit, 'higher_is_better': higher_is_better}
+
+def replay_topics(count):
+    """کوئری‌های واقعی registry برای جستجوهای بازپخش"""
+    queries = sorted({entry['query'] for entry in get_registry().entries.values()})
+    return queries[:count]
+
+def bench_pubmed(tmp, copies=1000, topics=20):
+    """پردازش XML (parse_complete_articles) و جستجوی دسته‌ای کامل روی پاسخ‌های ضبط‌شده"""
+    path = os.path.join(tmp, 'efetch_large.xml')
+    build_large_response(path, copies)
+    with open(path, encoding='utf-8') as f:
+        xml = f.read()
+    size_mb = len(xml.encode('utf-8')) / 1024 / 1024
+
+    replay = ReplayEutils()
+    try:
+        bot = PubMedBot(cache=False, local_db=False, base_url=replay.url, rate_limiter=TokenBucket(100_000))
+        bot.max_searches_per_day = 10 ** 9  # سقف روزانه NCBI برای سرور محلی معنی ندارد
+        seconds, articles = best_of(lambda: bot.parse_complete_articles(xml), repeats=3)
+        queries = replay_topics(topics)
+        search_seconds, results = best_of(lambda: bot.search_many(queries), repeats=3)
+        assert all(results.values())
+    finally:
+        replay.close()
+    return [
+        metric('parse.articles_per_sec', len(articles) / seconds, 'articles/s'),
+        metric('parse.mb_per_sec', size_mb / seconds, 'MB/s'),
+        metric('replay.search_many_topics_per_sec', len(queries) / search_seconds, 'topics/s'),
+    ]
+
+def bench_generation(topics=100):
+    """تولید مقاله جامع از چکیده‌های ضبط‌شده و محتوای جایگزین (مقاله در ثانیه)"""
+    with open(os.path.join(FIXTURES, 'efetch_sample.xml'), encoding='utf-8') as f:
+        articles = PubMedBot(cache=False, local_db=False).parse_complete_articles(f.read())
+    bot = AutoMedicalContentBot(seed=1)
+    titles = list(bot.topic_catalog())[:topics]
+    prefetched = {bot.translate_topic(title): articles for title in titles}
+
+    pubmed_seconds, generated = best_of(lambda: [bot.generate_ai_content(title, prefetched) for title in titles], 3)
+    assert all(article['source'] == "PubMed Comprehensive Analysis" for article in generated)
+    fallback_seconds, _ = best_of(lambda: bot.generate_fallback_batch(titles * 10), 3)
+    return [
+        metric('generate.pubmed_articles_per_sec', len(titles) / pubmed_seconds, 'articles/s'),
+        metric('generate.fallback_articles_per_sec', len(titles) * 10 / fallback_seconds, 'articles/s'),
+    ]
+
+def bench_synthesis(abstracts=40):
+    """تأخیر ساخت مقاله جامع از چکیده‌های ضبط‌شده و از مجموعه بزرگ abstracts چکیده (میلی‌ثانیه)"""
+    with open(os.path.join(FIXTURES, 'efetch_sample.xml'), encoding='utf-8') as f:
+        articles = PubMedBot(cache=False, local_db=False).parse_complete_articles(f.read())
+    fixture_seconds, _ = best_of(lambda: synthesize_article("درمان دیابت نوع ۲", articles))
+    large = [dict(articles[i % len(articles)], pmid=str(i), title=f"{articles[i % len(articles)]['title']} {i}")
+             for i in range(abstracts)]
+    large_seconds, _ = best_of(lambda: synthesize_article("درمان دیابت نوع ۲", large, query="type 2 diabetes"))
+    return [
+        metric('synthesis.fixture_ms', fixture_seconds * 1000, 'ms', higher_is_better=False),
+        metric(f'synthesis.abstracts_{abstracts}_ms', large_seconds * 1000, 'ms', higher_is_better=False),
+    ]
+
+def bench_save_articles(tmp, rows=1000, batch_size=50):
+    """نرخ درج save_articles (با صف انتشار، با و بدون امضای MinHash) در دسته‌های batch_size تایی"""
+    db = MedicalDatabase(os.path.join(tmp, 'save.db'))
+    titles = [f"مقاله بنچمارک {i}" for i in range(rows)]
+    contents = DEFAULT_BANK.render_many(titles)
+    articles = [{
+        'title': title, 'content': content, 'category': "عمومی", 'word_count': len(content.split()),
+        'reading_time': "۶ دقیقه", 'quality_score': 8
+    } for title, content in zip(titles, contents)]
+
+    start = time.perf_counter()
+    for i in range(0, rows, batch_size):
+        db.save_articles(articles[i:i + batch_size])
+    seconds = time.perf_counter() - start
+
+    # ورود انبوه بدون امضای MinHash (ایندکس بعداً با index_duplicates)
+    bulk = MedicalDatabase(os.path.join(tmp, 'save_bulk.db'))
+    start = time.perf_counter()
+    for i in range(0, rows, batch_size):
+        bulk.save_articles(articles[i:i + batch_size], dedup=False)
+    bulk_seconds = time.perf_counter() - start
+    return [metric('db.save_articles_rows_per_sec', rows / seconds, 'rows/s'),
+            metric('db.save_articles_no_dedup_rows_per_sec', rows / bulk_seconds, 'rows/s')]
+
+def bench_queries(tmp, rows):
+    """تأخیر کوئری‌های داشبورد و آنالیز روی آرشیو مصنوعی rows مقاله‌ای (میلی‌ثانیه)"""
+    db_path = os.path.join(tmp, f'archive_{rows}.db')
+    start = time.perf_counter()
+    # کوئری‌های داشبورد محتوا را نمی‌خوانند؛ متن کامل آرشیو میلیونی را چند گیگابایتی می‌کرد
+    generate_archive(db_path, rows, content='summary')
+    build_seconds = time.perf_counter() - start
+
+    engine = StatsEngine(db_path)
+    dashboard = MedicalDashboard(db_path)
+    analytics = MedicalAnalytics(db_path)
+    overview_seconds, stats = best_of(engine.overview)
+    assert stats['total_articles'] == rows
+    weekly_seconds, _ = best_of(dashboard.get_weekly_report)
+    # گزارش هفتگی فایل JSON می‌نویسد، پس در پوشه موقت اجرا می‌شود
+    cwd = os.getcwd()
+    os.chdir(tmp)
+    try:
+        analytics_seconds, report = best_of(analytics.generate_weekly_report)
+    finally:
+        os.chdir(cwd)
+    assert report
+    category = stats['categories'][0]['category']
+    page_seconds, page = best_of(lambda: list(zip(range(100), dashboard.iter_category_articles(category))))
+    assert len(page) == min(100, stats['categories'][0]['count'])
+
+    label = f"{rows:,}".replace(',', '_')
+    return [
+        metric(f'archive.build_seconds@{label}', build_seconds, 's', higher_is_better=False),
+        metric(f'dashboard.overview_ms@{label}', overview_seconds * 1000, 'ms', higher_is_better=False),
+        metric(f'dashboard.weekly_ms@{label}', weekly_seconds * 1000, 'ms', higher_is_better=False),
+        metric(f'analytics.weekly_report_ms@{label}', analytics_seconds * 1000, 'ms', higher_is_better=False),
+        metric(f'dashboard.category_page_ms@{label}', page_seconds * 1000, 'ms', higher_is_better=False),
+    ]
+
+def git_revision():
+    """commit جاری و وجود تغییرات commit نشده (برای مقایسه نتایج بین commitها)"""
+    repo = os.path.dirname(os.path.abspath(__file__))
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=repo, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=repo,
+                                    capture_output=True, text=True, check=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return None, False
+    return commit, dirty
+
+def run_suite(sizes=SIZES, save_rows=1000):
+    """اجرای همه بنچمارک‌ها بدون شبکه - خروجی: رکورد نتایج قابل ذخیره"""
+    commit, dirty = git_revision()
+    metrics = []
+    env = {'PUBMED_OFFLINE': '1', 'PUBMED_LOCAL_DB': '', 'PUBMED_CACHE': '0'}
+    saved_env = {name: os.environ.get(name) for name in env}
+    os.environ.update(env)
+    try:
+        with tempfile.TemporaryDirectory() as tmp, telemetry.quiet():
+            metrics += bench_pubmed(tmp)
+            metrics += bench_generation()
+            metrics += bench_synthesis()
+            metrics += bench_save_articles(tmp, save_rows)
+            for rows in sizes:
+                metrics += bench_queries(tmp, rows)
+    finally:
+        for name, value in saved_env.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+    return {
+        'commit': commit,
+        'dirty': dirty,
+        'recorded_at': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'metrics': metrics
+    }
+
+def load_results(path=RESULTS_PATH):
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def save_result(record, path=RESULTS_PATH):
+    """افزودن نتیجه اجرا به فایل JSON lines (هر اجرا یک خط)"""
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n')
+
+def baseline_for(record, history, against=None):
+    """آخرین نتیجه commit دیگر (یا commit مشخص‌شده با against) برای مقایسه"""
+    for previous in reversed(history):
+        if against is not None:
+            if previous['commit'] and previous['commit'].startswith(against):
+                return previous
+        elif previous['commit'] != record['commit']:
+            return previous
+    return None
+
+def compare(record, baseline):
+    """تغییر هر معیار نسبت به baseline - درصد مثبت یعنی بهبود"""
+    previous = {m['name']: m['value'] for m in baseline['metrics']} if baseline else {}
+    rows = []
+    for m in record['metrics']:
+        old = previous.get(m['name'])
+        change = None
+        if old:
+            ratio = m['value'] / old if m['higher_is_better'] else old / m['value']
+            change = (ratio - 1) * 100
+        rows.append(dict(m, previous=old, change=change))
+    return rows
+
+def print_report(record, baseline):
+    print(f"\n🧪 نتایج بنچمارک commit {record['commit'] or '?'}{' (با تغییرات)' if record['dirty'] else ''}"
+          + (f" در مقایسه با {baseline['commit']}" if baseline else ""))
+    print(f"{'معیار':<44} {'مقدار':>14} {'واحد':>11} {'قبلی':>14} {'تغییر':>8}")
+    for row in compare(record, baseline):
+        previous = f"{row['previous']:>14.2f}" if row['previous'] is not None else f"{'-':>14}"
+        change = f"{row['change']:>+7.1f}%" if row['change'] is not None else f"{'-':>8}"
+        print(f"{row['name']:<44} {row['value']:>14.2f} {row['unit']:>11} {previous} {change}")
+
+def main():
+    parser = argparse.ArgumentParser(description="بنچمارک آفلاین با پاسخ‌های ضبط‌شده PubMed")
+    parser.add_argument('--sizes', type=int, nargs='*', default=list(SIZES), help="اندازه‌های آرشیو مصنوعی")
+    parser.add_argument('--against', help="commit مبنا برای مقایسه (پیش‌فرض: آخرین commit دیگر)")
+    parser.add_argument('--no-save', action='store_true', help="نتیجه در فایل نتایج ذخیره نشود")
+    args = parser.parse_args()
+
+    print(f"🧪 اجرای بنچمارک‌ها (آرشیو: {', '.join(f'{size:,}' for size in args.sizes)} مقاله)...")
+    record = run_suite(args.sizes)
+    history = load_results()
+    print_report(record, baseline_for(record, history, args.against))
+    if not args.no_save:
+        save_result(record)
+        print(f"\n💾 نتایج در {RESULTS_PATH} ذخیره شد")
+
+if __name__ == "__main__":
+    main()
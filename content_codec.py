@@ -0,0 +1,157 @@
+import hashlib
+import re
+import threading
+import zlib
+from collections import Counter
+
+# قالب مقدار ذخیره‌شده: ۱ بایت الگوریتم + ۲ بایت شناسه دیکشنری (۰ = بدون دیکشنری) + داده فشرده
+# مقدار TEXT (ردیف‌های قدیمی یا compression='none') بدون تغییر برگردانده می‌شود
+ZLIB = 1
+ZSTD = 2
+ALGORITHMS = {'zlib': ZLIB, 'zstd': ZSTD}
+HEADER_SIZE = 3
+# zlib فقط ۳۲ کیلوبایت آخر دیکشنری را استفاده می‌کند
+DICTIONARY_SIZE = 32768
+# تکه‌های متن بین اعداد و پایان جمله‌ها - بخش ثابت جملات قالبی
+_PIECES = re.compile(r'[^\d۰-۹.!?؟\n]{16,}[.!?؟]?')
+
+def content_hash(text):
+    """هش متن مقاله (مستقل از الگوریتم و دیکشنری فشرده‌سازی) - در ستون content_hash ذخیره می‌شود"""
+    return hashlib.sha256((text or '').encode('utf-8')).hexdigest()[:32]
+
+def _zstandard():
+    """zstandard اختیاری است و فقط هنگام استفاده از zstd بارگذاری می‌شود"""
+    try:
+        import zstandard
+    except ImportError:
+        return None
+    return zstandard
+
+def zstd_available():
+    return _zstandard() is not None
+
+def train_dictionary(samples, size=DICTIONARY_SIZE, algorithm='zlib'):
+    """ساخت دیکشنری مشترک از نمونه مقالات - خروجی: bytes
+
+    zstd از الگوریتم آموزش خود zstandard استفاده می‌کند. برای zlib تکه‌های پرتکرار متن
+    (بخش ثابت جملات قالبی و عنوان‌ها) به ترتیب ارزش کنار هم قرار می‌گیرند؛ باارزش‌ترین
+    تکه‌ها در انتهای دیکشنری، نزدیک‌ترین فاصله به متن فشرده‌شده.
+    """
+    samples = [sample for sample in samples if sample]
+    if algorithm == 'zstd':
+        zstandard = _zstandard()
+        if zstandard is None:
+            raise RuntimeError("برای دیکشنری zstd بسته zstandard لازم است")
+        return zstandard.train_dictionary(size, [sample.encode('utf-8') for sample in samples]).as_bytes()
+
+    counts = Counter()
+    for sample in samples:
+        counts.update(set(piece.strip() for piece in _PIECES.findall(sample)))
+    scored = sorted(
+        ((count * len(piece.encode('utf-8')), piece) for piece, count in counts.items() if count > 1),
+        reverse=True
+    )
+    chosen, used = [], 0
+    for _, piece in scored:
+        data = piece.encode('utf-8') + b' '
+        if used + len(data) > size:
+            continue
+        chosen.append(data)
+        used += len(data)
+    return b''.join(reversed(chosen))
+
+class ContentCodec:
+    """فشرده‌سازی شفاف متن مقالات با zlib (یا zstd در صورت نصب) و دیکشنری مشترک اختیاری
+
+    loader(شناسه) دیکشنری‌های ذخیره‌شده را در اولین نیاز به صورت (الگوریتم، bytes) برمی‌گرداند.
+    """
+
+    def __init__(self, algorithm='zlib', level=None, dictionary_id=None, loader=None):
+        if algorithm not in ('zlib', 'zstd', 'none'):
+            raise ValueError(f"الگوریتم فشرده‌سازی ناشناخته: {algorithm}")
+        if algorithm == 'zstd' and not zstd_available():
+            print("⚠️ بسته zstandard نصب نیست - فشرده‌سازی با zlib انجام می‌شود")
+            algorithm = 'zlib'
+        self.algorithm = algorithm
+        self.level = level if level is not None else (9 if algorithm == 'zlib' else 10)
+        self.dictionary_id = dictionary_id
+        self.loader = loader
+        self._dictionaries = {}
+        # اشیای zstd برای استفاده همزمان در چند thread امن نیستند
+        self._local = threading.local()
+
+    def dictionary(self, dictionary_id):
+        entry = self._dictionaries.get(dictionary_id)
+        if entry is None:
+            entry = self.loader(dictionary_id) if self.loader else None
+            if entry is None:
+                raise KeyError(f"دیکشنری فشرده‌سازی {dictionary_id} پیدا نشد")
+            self._dictionaries[dictionary_id] = entry
+        return entry[1]
+
+    def _zstd(self, kind, dictionary_id):
+        cache = self._local.__dict__.setdefault(kind, {})
+        obj = cache.get(dictionary_id)
+        if obj is None:
+            zstandard = _zstandard()
+            dict_data = zstandard.ZstdCompressionDict(self.dictionary(dictionary_id)) if dictionary_id else None
+            if kind == 'compressor':
+                obj = zstandard.ZstdCompressor(level=self.level, dict_data=dict_data)
+            else:
+                obj = zstandard.ZstdDecompressor(dict_data=dict_data)
+            cache[dictionary_id] = obj
+        return obj
+
+    def compress(self, text):
+        """متن ← مقدار قابل ذخیره (bytes فشرده یا همان متن با algorithm='none')"""
+        if self.algorithm == 'none':
+            return text
+        data = text.encode('utf-8')
+        dictionary_id = self.dictionary_id or 0
+        if self.algorithm == 'zstd':
+            payload = self._zstd('compressor', dictionary_id).compress(data)
+        elif dictionary_id:
+            compressor = zlib.compressobj(self.level, zdict=self.dictionary(dictionary_id))
+            payload = compressor.compress(data) + compressor.flush()
+        else:
+            payload = zlib.compress(data, self.level)
+        return bytes((ALGORITHMS[self.algorithm],)) + dictionary_id.to_bytes(2, 'big') + payload
+
+    def decompress(self, value):
+        """مقدار ذخیره‌شده ← متن (متن فشرده‌نشده و NULL بدون تغییر برمی‌گردند)"""
+        if value is None or isinstance(value, str):
+            return value
+        algorithm = value[0]
+        dictionary_id = int.from_bytes(value[1:HEADER_SIZE], 'big')
+        payload = value[HEADER_SIZE:]
+        if algorithm == ZSTD:
+            zstandard = _zstandard()
+            if zstandard is None:
+                raise RuntimeError("این محتوا با zstd فشرده شده و بسته zstandard نصب نیست")
+            data = self._zstd('decompressor', dictionary_id).decompress(payload)
+        elif algorithm == ZLIB:
+            if dictionary_id:
+                decompressor = zlib.decompressobj(zdict=self.dictionary(dictionary_id))
+                data = decompressor.decompress(payload) + decompressor.flush()
+            else:
+                data = zlib.decompress(payload)
+        else:
+            raise ValueError(f"قالب محتوای فشرده ناشناخته: {algorithm}")
+        return data.decode('utf-8')
+
+def dictionary_loader(conn):
+    """خواندن دیکشنری از جدول content_dictionaries همان دیتابیس"""
+    def load(dictionary_id):
+        try:
+            row = conn.execute(
+                'SELECT algorithm, data FROM content_dictionaries WHERE id = ?', (dictionary_id,)
+            ).fetchone()
+        except Exception:
+            return None
+        return (row[0], bytes(row[1])) if row else None
+    return load
+
+def register_functions(conn):
+    """تابع SQL content_text(content): باز کردن محتوا فقط برای ردیف‌هایی که واقعاً خوانده می‌شوند"""
+    codec = ContentCodec('none', loader=dictionary_loader(conn))
+    conn.create_function('content_text', 1, codec.decompress, deterministic=True)
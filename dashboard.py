@@ -1,50 +1,129 @@
 from datetime import datetime, timedelta
-import sqlite3
-import pandas as pd
-import json
+import math
 import os
+import re
+from urllib.parse import quote
+from db_connection import get_manager
+from stats_engine import StatsEngine
+from html_renderer import Template, Markup, ChunkedWriter
+from telemetry import count, span
+
+# قالب‌ها یک بار در زمان import کامپایل می‌شوند و همه مقادیر هنگام درج escape می‌شوند
+PAGE_HEAD = Template("""<!DOCTYPE html>
+<html dir="rtl">
+<head>
+    <meta charset="UTF-8">
+    <title>{title}</title>
+    <style>
+        body {{ font-family: Tahoma, Arial; background: #f0f8ff; margin: 0; padding: 20px; }}
+        .dashboard {{ max-width: 1200px; margin: 0 auto; background: white; padding: 30px; border-radius: 15px; box-shadow: 0 5px 15px rgba(0,0,0,0.1); }}
+        .stats {{ display: grid; grid-template-columns: repeat(auto-fit, minmax(200px, 1fr)); gap: 20px; margin-bottom: 30px; }}
+        .stat-card {{ background: linear-gradient(135deg, #2c5aa0, #1e3a8a); color: white; padding: 25px; border-radius: 10px; text-align: center; box-shadow: 0 3px 10px rgba(0,0,0,0.2); }}
+        .stat-number {{ font-size: 2.5em; font-weight: bold; margin-bottom: 10px; }}
+        .stat-label {{ font-size: 1.1em; opacity: 0.9; }}
+        h1 {{ color: #2c5aa0; text-align: center; margin-bottom: 30px; }}
+        table {{ width: 100%; border-collapse: collapse; margin-top: 20px; }}
+        th, td {{ padding: 12px; text-align: center; border: 1px solid #ddd; }}
+        th {{ background: #2c5aa0; color: white; }}
+        tr:nth-child(even) {{ background: #f8f9fa; }}
+        .pager {{ text-align: center; margin-top: 20px; }}
+        .pager a {{ margin: 0 10px; color: #2c5aa0; }}
+        .last-update {{ text-align: center; color: #666; margin-top: 30px; font-style: italic; }}
+    </style>
+</head>
+<body>
+    <div class="dashboard">
+        <h1>{heading}</h1>
+""")
+
+STATS_CARDS = Template("""
+        <div class="stats">
+            <div class="stat-card">
+                <div class="stat-number">{total_articles}</div>
+                <div class="stat-label">📊 کل مقالات</div>
+            </div>
+            <div class="stat-card">
+                <div class="stat-number">{today_articles}</div>
+                <div class="stat-label">📅 مقالات امروز</div>
+            </div>
+            <div class="stat-card">
+                <div class="stat-number">{avg_quality:.1f}/10</div>
+                <div class="stat-label">⭐ میانگین کیفیت</div>
+            </div>
+            <div class="stat-card">
+                <div class="stat-number">{total_words}</div>
+                <div class="stat-label">📝 کل کلمات</div>
+            </div>
+        </div>
+""")
+
+TABLE_START = Template("""
+        <h2>{heading}</h2>
+        <table>
+            <tr>{header_cells}</tr>
+""")
+HEADER_CELL = Template("<th>{label}</th>")
+WEEKLY_ROW = Template("""
+            <tr>
+                <td>{date}</td>
+                <td>{article_count}</td>
+                <td>{total_words}</td>
+                <td>{avg_quality:.1f}/10</td>
+            </tr>""")
+CATEGORY_ROW = Template("""
+            <tr>
+                <td><a href="{href}">{category}</a></td>
+                <td>{count}</td>
+            </tr>""")
+ARTICLE_ROW = Template("""
+            <tr>
+                <td>{title}</td>
+                <td>{created_date}</td>
+                <td>{word_count}</td>
+                <td>{quality_score}/10</td>
+            </tr>""")
+EMPTY_ROW = Template("""
+            <tr>
+                <td colspan="{colspan}" style="text-align: center; padding: 20px;">
+                    {message}
+                </td>
+            </tr>""")
+TABLE_END = Template("""
+        </table>
+""")
+PAGER_LINK = Template('<a href="{href}">{label}</a>')
+PAGER = Template("""
+        <div class="pager">{links} صفحه {page} از {pages}</div>
+""")
+PAGE_FOOT = Template("""
+        <div class="last-update">
+            آخرین بروزرسانی: {updated_at}
+        </div>
+    </div>
+</body>
+</html>
+""")
+
+def category_slug(category):
+    """نام فایل امن برای صفحه یک دسته‌بندی (حروف فارسی حفظ می‌شوند)"""
+    return re.sub(r'\W+', '-', category).strip('-') or 'category'
+
+def table_start(heading, labels):
+    """تکه‌های شروع یک جدول با سرستون‌ها"""
+    header_cells = Markup(''.join(HEADER_CELL.render({'label': label}) for label in labels))
+    return TABLE_START.chunks({'heading': heading, 'header_cells': header_cells})
 
 class MedicalDashboard:
     def __init__(self, db_path="medical_content.db"):
         self.db_path = db_path
+        # خواندن‌ها با WAL هیچ‌وقت نوشتن‌های pipeline را مسدود نمی‌کنند
+        self.db = get_manager(db_path)
+        self.stats_engine = StatsEngine(db_path)
     
     def get_overview_stats(self):
-        """آمار کلی سیستم"""
-        conn = sqlite3.connect(self.db_path)
-        
-        stats = {}
-        
+        """آمار کلی سیستم - یک پیمایش روی جدول تجمیعی، بدون ساخت DataFrame"""
         try:
-            # کل مقالات
-            stats['total_articles'] = pd.read_sql_query(
-                'SELECT COUNT(*) as count FROM articles', conn
-            ).iloc[0]['count']
-            
-            # مقالات امروز
-            today = datetime.now().strftime('%Y-%m-%d')
-            stats['today_articles'] = pd.read_sql_query(
-                'SELECT COUNT(*) as count FROM articles WHERE DATE(created_at) = ?', 
-                conn, params=[today]
-            ).iloc[0]['count']
-            
-            # میانگین کیفیت
-            stats['avg_quality'] = pd.read_sql_query(
-                'SELECT AVG(quality_score) as avg FROM articles', conn
-            ).iloc[0]['avg']
-            
-            # توزیع دسته‌بندی‌ها
-            stats['categories'] = pd.read_sql_query('''
-                SELECT category, COUNT(*) as count 
-                FROM articles 
-                GROUP BY category 
-                ORDER BY count DESC
-            ''', conn).to_dict('records')
-            
-            # کل کلمات تولید شده
-            stats['total_words'] = pd.read_sql_query(
-                'SELECT SUM(word_count) as total FROM articles', conn
-            ).iloc[0]['total'] or 0
-            
+            stats = self.stats_engine.overview()
         except Exception as e:
             print(f"❌ خطا در دریافت آمار: {e}")
             stats = {
@@ -55,160 +134,131 @@ class MedicalDashboard:
                 'total_words': 0
             }
         
-        conn.close()
         return stats
     
     def get_weekly_report(self):
         """گزارش هفتگی"""
-        conn = sqlite3.connect(self.db_path)
-        
         try:
             # آمار ۷ روز گذشته
             week_ago = (datetime.now() - timedelta(days=7)).strftime('%Y-%m-%d')
             
-            weekly_stats = pd.read_sql_query('''
+            result = self.db.query('''
                 SELECT 
-                    DATE(created_at) as date,
-                    COUNT(*) as article_count,
-                    SUM(word_count) as total_words,
-                    AVG(quality_score) as avg_quality
-                FROM articles 
-                WHERE DATE(created_at) >= ?
-                GROUP BY DATE(created_at)
+                    date,
+                    total_articles as article_count,
+                    total_words,
+                    avg_quality
+                FROM daily_stats 
+                WHERE date >= ? AND total_articles > 0
                 ORDER BY date DESC
-            ''', conn, params=[week_ago])
-            
-            result = weekly_stats.to_dict('records')
+            ''', (week_ago,))
         except Exception as e:
             print(f"❌ خطا در دریافت گزارش هفتگی: {e}")
             result = []
         
-        conn.close()
         return result
     
-    def generate_html_dashboard(self):
-        """تولید داشبورد HTML"""
-        stats = self.get_overview_stats()
-        weekly = self.get_weekly_report()
+    def generate_html_dashboard(self, output_dir='.', page_size=100):
+        """تولید داشبورد HTML به صورت جریانی
         
-        html = f"""
-        <!DOCTYPE html>
-        <html dir="rtl">
-        <head>
-            <meta charset="UTF-8">
-            <title>داشبورد مدیریت محتوای پزشکی</title>
-            <style>
-                body {{ font-family: Tahoma, Arial; background: #f0f8ff; margin: 0; padding: 20px; }}
-                .dashboard {{ max-width: 1200px; margin: 0 auto; background: white; padding: 30px; border-radius: 15px; box-shadow: 0 5px 15px rgba(0,0,0,0.1); }}
-                .stats {{ display: grid; grid-template-columns: repeat(auto-fit, minmax(200px, 1fr)); gap: 20px; margin-bottom: 30px; }}
-                .stat-card {{ background: linear-gradient(135deg, #2c5aa0, #1e3a8a); color: white; padding: 25px; border-radius: 10px; text-align: center; box-shadow: 0 3px 10px rgba(0,0,0,0.2); }}
-                .stat-number {{ font-size: 2.5em; font-weight: bold; margin-bottom: 10px; }}
-                .stat-label {{ font-size: 1.1em; opacity: 0.9; }}
-                h1 {{ color: #2c5aa0; text-align: center; margin-bottom: 30px; }}
-                table {{ width: 100%; border-collapse: collapse; margin-top: 20px; }}
-                th, td {{ padding: 12px; text-align: center; border: 1px solid #ddd; }}
-                th {{ background: #2c5aa0; color: white; }}
-                tr:nth-child(even) {{ background: #f8f9fa; }}
-                .last-update {{ text-align: center; color: #666; margin-top: 30px; font-style: italic; }}
-            </style>
-        </head>
-        <body>
-            <div class="dashboard">
-                <h1>🏥 داشبورد مدیریت محتوای پزشکی</h1>
-                
-                <div class="stats">
-                    <div class="stat-card">
-                        <div class="stat-number">{stats['total_articles']}</div>
-                        <div class="stat-label">📊 کل مقالات</div>
-                    </div>
-                    <div class="stat-card">
-                        <div class="stat-number">{stats['today_articles']}</div>
-                        <div class="stat-label">📅 مقالات امروز</div>
-                    </div>
-                    <div class="stat-card">
-                        <div class="stat-number">{stats['avg_quality']:.1f}/10</div>
-                        <div class="stat-label">⭐ میانگین کیفیت</div>
-                    </div>
-                    <div class="stat-card">
-                        <div class="stat-number">{stats['total_words']}</div>
-                        <div class="stat-label">📝 کل کلمات</div>
-                    </div>
-                </div>
-                
-                <h2>📈 گزارش هفتگی عملکرد</h2>
-                <table>
-                    <tr>
-                        <th>📅 تاریخ</th>
-                        <th>📄 تعداد مقالات</th>
-                        <th>📊 کل کلمات</th>
-                        <th>⭐ میانگین کیفیت</th>
-                    </tr>
+        صفحه اصلی در index.html و فهرست مقالات هر دسته‌بندی در صفحات
+        categories/<دسته>-<شماره>.html با حداکثر page_size ردیف نوشته می‌شود.
+        خروجی: مسیر صفحه اصلی
         """
+        with span('dashboard.render'):
+            index_path, pages = self._generate_html_dashboard(output_dir, page_size)
+        count('dashboard.pages', pages + 1)
+        print(f"✅ داشبورد HTML ایجاد شد: {index_path} (+{pages} صفحه دسته‌بندی)")
+        return index_path
+    
+    def _generate_html_dashboard(self, output_dir, page_size):
+        stats = self.get_overview_stats()
+        weekly = self.get_weekly_report()
+        updated_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        index_path = os.path.join(output_dir, 'index.html')
         
-        if weekly:
+        with ChunkedWriter(index_path) as out:
+            out.write_all(PAGE_HEAD.chunks({
+                'title': 'داشبورد مدیریت محتوای پزشکی',
+                'heading': '🏥 داشبورد مدیریت محتوای پزشکی'
+            }))
+            out.write_all(STATS_CARDS.chunks(stats))
+            
+            out.write_all(table_start('📈 گزارش هفتگی عملکرد',
+                                      ('📅 تاریخ', '📄 تعداد مقالات', '📊 کل کلمات', '⭐ میانگین کیفیت')))
             for day in weekly:
-                html += f"""
-                    <tr>
-                        <td>{day['date']}</td>
-                        <td>{day['article_count']}</td>
-                        <td>{day['total_words']}</td>
-                        <td>{day['avg_quality']:.1f}/10</td>
-                    </tr>
-                """
-        else:
-            html += """
-                    <tr>
-                        <td colspan="4" style="text-align: center; padding: 20px;">
-                            📭 هیچ داده‌ای برای نمایش وجود ندارد
-                        </td>
-                    </tr>
-            """
-        
-        html += f"""
-                </table>
-                
-                <h2>🏷️ توزیع موضوعات</h2>
-                <table>
-                    <tr>
-                        <th>دسته‌بندی</th>
-                        <th>تعداد مقالات</th>
-                    </tr>
-        """
-        
-        if stats['categories']:
+                out.write_all(WEEKLY_ROW.chunks(day))
+            if not weekly:
+                out.write_all(EMPTY_ROW.chunks({'colspan': 4, 'message': '📭 هیچ داده‌ای برای نمایش وجود ندارد'}))
+            out.write_all(TABLE_END.chunks({}))
+            
+            out.write_all(table_start('🏷️ توزیع موضوعات', ('دسته‌بندی', 'تعداد مقالات')))
             for category in stats['categories']:
-                html += f"""
-                    <tr>
-                        <td>{category['category']}</td>
-                        <td>{category['count']}</td>
-                    </tr>
-                """
-        else:
-            html += """
-                    <tr>
-                        <td colspan="2" style="text-align: center; padding: 20px;">
-                            📭 هیچ دسته‌بندی‌ای وجود ندارد
-                        </td>
-                    </tr>
-            """
+                href = quote(f"categories/{category_slug(category['category'])}-1.html")
+                out.write_all(CATEGORY_ROW.chunks(dict(category, href=href)))
+            if not stats['categories']:
+                out.write_all(EMPTY_ROW.chunks({'colspan': 2, 'message': '📭 هیچ دسته‌بندی‌ای وجود ندارد'}))
+            out.write_all(TABLE_END.chunks({}))
+            
+            out.write_all(PAGE_FOOT.chunks({'updated_at': updated_at}))
         
-        html += f"""
-                </table>
-                
-                <div class="last-update">
-                    آخرین بروزرسانی: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-                </div>
-            </div>
-        </body>
-        </html>
+        pages = 0
+        for category in stats['categories']:
+            pages += self.generate_category_pages(
+                category['category'], category['count'], output_dir, page_size, updated_at
+            )
+        return index_path, pages
+    
+    def iter_category_articles(self, category):
+        """پیمایش جریانی مقالات یک دسته‌بندی (جدیدترین اول) بدون بارگذاری کل نتیجه
+
+        ترتیب از ایندکس (category, id) خوانده می‌شود؛ برای «عمومی» دو شاخه (category IS NULL)
+        جداگانه از ایندکس خوانده و ادغام (MERGE) می‌شوند تا SQLite کل دسته را مرتب نکند.
         """
+        cursor = self.db.connection().execute(self._category_sql(category), (category,))
+        for title, created_date, word_count, quality_score, _ in cursor:
+            yield {
+                'title': title,
+                'created_date': created_date or '',
+                'word_count': word_count or 0,
+                'quality_score': quality_score or 0
+            }
+    
+    @staticmethod
+    def _category_sql(category):
+        columns = 'SELECT title, created_date, word_count, quality_score, id FROM articles'
+        if category == 'عمومی':
+            return f'{columns} WHERE category = ? UNION ALL {columns} WHERE category IS NULL ORDER BY 5 DESC'
+        return f'{columns} WHERE category = ? ORDER BY id DESC'
+    
+    def generate_category_pages(self, category, count, output_dir='.', page_size=100, updated_at=''):
+        """نوشتن صفحات صفحه‌بندی‌شده یک دسته‌بندی - حافظه مصرفی مستقل از تعداد مقالات"""
+        slug = category_slug(category)
+        pages = max(1, math.ceil(count / page_size))
+        articles = self.iter_category_articles(category)
         
-        # ذخیره فایل HTML
-        with open('index.html', 'w', encoding='utf-8') as f:
-            f.write(html)
+        for page in range(1, pages + 1):
+            path = os.path.join(output_dir, 'categories', f"{slug}-{page}.html")
+            with ChunkedWriter(path) as out:
+                out.write_all(PAGE_HEAD.chunks({
+                    'title': f"{category} - صفحه {page}",
+                    'heading': f"🏷️ {category}"
+                }))
+                out.write_all(table_start(f"📄 مقالات ({count})",
+                                          ('عنوان', '📅 تاریخ', '📝 کلمات', '⭐ کیفیت')))
+                for _, article in zip(range(page_size), articles):
+                    out.write_all(ARTICLE_ROW.chunks(article))
+                out.write_all(TABLE_END.chunks({}))
+                
+                links = [PAGER_LINK.render({'href': '../index.html', 'label': 'داشبورد'})]
+                if page > 1:
+                    links.append(PAGER_LINK.render({'href': quote(f"{slug}-{page - 1}.html"), 'label': '→ قبلی'}))
+                if page < pages:
+                    links.append(PAGER_LINK.render({'href': quote(f"{slug}-{page + 1}.html"), 'label': 'بعدی ←'}))
+                out.write_all(PAGER.chunks({'links': Markup(' '.join(links)), 'page': page, 'pages': pages}))
+                out.write_all(PAGE_FOOT.chunks({'updated_at': updated_at}))
         
-        print("✅ داشبورد HTML ایجاد شد: index.html")
-        return html
+        return pages
 
 def main():
     """تابع اصلی برای تست داشبورد"""
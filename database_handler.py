@@ -1,17 +1,244 @@
-import sqlite3
+import hashlib
 import json
-import pandas as pd
+import re
+import time
+import uuid
 from datetime import datetime
 import os
+from db_connection import get_manager
+from content_codec import ContentCodec, content_hash, dictionary_loader, train_dictionary, DICTIONARY_SIZE
+from dedup_index import MinHashLSH
+from telemetry import count, span
 
 class MedicalDatabase:
-    def __init__(self, db_path="medical_content.db"):
+    # مهاجرت‌های schema به ترتیب - نسخه فعلی در PRAGMA user_version نگه داشته می‌شود
+    MIGRATIONS = [
+        # ۱: ستون تاریخ ذخیره‌شده، حذف تکراری‌ها (عنوان+تاریخ) و ایندکس‌های پوششی آمار
+        '''
+            ALTER TABLE articles ADD COLUMN created_date TEXT;
+            UPDATE articles SET created_date = DATE(created_at);
+            DELETE FROM articles WHERE id NOT IN (
+                SELECT MAX(id) FROM articles GROUP BY title, created_date
+            );
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_articles_title_date ON articles(title, created_date);
+            CREATE INDEX IF NOT EXISTS idx_articles_date_stats
+                ON articles(created_date, category, word_count, quality_score);
+            CREATE INDEX IF NOT EXISTS idx_articles_category_stats
+                ON articles(category, word_count, quality_score);
+        ''',
+        # ۲: جدول تجمیعی daily_stats که با trigger به صورت افزایشی به‌روز می‌شود
+        '''
+            ALTER TABLE daily_stats ADD COLUMN total_quality INTEGER DEFAULT 0;
+            
+            CREATE TRIGGER IF NOT EXISTS articles_daily_stats_ai
+            AFTER INSERT ON articles WHEN new.created_date IS NOT NULL BEGIN
+                INSERT INTO daily_stats
+                (date, total_articles, total_words, total_quality, avg_quality, categories_json)
+                SELECT new.created_date, 0, 0, 0, 0, '{}'
+                WHERE new.created_date IS NOT NULL
+                  AND NOT EXISTS (SELECT 1 FROM daily_stats WHERE date = new.created_date);
+                UPDATE daily_stats SET
+                    total_articles = total_articles + 1,
+                    total_words = total_words + COALESCE(new.word_count, 0),
+                    total_quality = total_quality + COALESCE(new.quality_score, 0),
+                    avg_quality = (total_quality + COALESCE(new.quality_score, 0)) * 1.0 / (total_articles + 1),
+                    categories_json = json_set(
+                        categories_json,
+                        '$."' || IFNULL(new.category, 'عمومی') || '"',
+                        COALESCE(json_extract(categories_json, '$."' || IFNULL(new.category, 'عمومی') || '"'), 0) + 1
+                    )
+                WHERE date = new.created_date;
+            END;
+            
+            CREATE TRIGGER IF NOT EXISTS articles_daily_stats_ad
+            AFTER DELETE ON articles WHEN old.created_date IS NOT NULL BEGIN
+                UPDATE daily_stats SET
+                    total_articles = total_articles - 1,
+                    total_words = total_words - COALESCE(old.word_count, 0),
+                    total_quality = total_quality - COALESCE(old.quality_score, 0),
+                    avg_quality = CASE WHEN total_articles > 1
+                        THEN (total_quality - COALESCE(old.quality_score, 0)) * 1.0 / (total_articles - 1)
+                        ELSE 0 END,
+                    categories_json = CASE
+                        WHEN json_extract(categories_json, '$."' || IFNULL(old.category, 'عمومی') || '"') > 1
+                        THEN json_set(
+                            categories_json,
+                            '$."' || IFNULL(old.category, 'عمومی') || '"',
+                            json_extract(categories_json, '$."' || IFNULL(old.category, 'عمومی') || '"') - 1
+                        )
+                        ELSE json_remove(categories_json, '$."' || IFNULL(old.category, 'عمومی') || '"')
+                    END
+                WHERE date = old.created_date;
+            END;
+            
+            -- به‌روزرسانی (مثلاً upsert در save_articles) = حذف مقدار قدیم + افزودن مقدار جدید
+            -- (OR IGNORE استفاده نمی‌شود چون ON CONFLICT دستور بیرونی روی آن غالب می‌شود)
+            CREATE TRIGGER IF NOT EXISTS articles_daily_stats_au
+            AFTER UPDATE OF created_date, category, word_count, quality_score ON articles BEGIN
+                UPDATE daily_stats SET
+                    total_articles = total_articles - 1,
+                    total_words = total_words - COALESCE(old.word_count, 0),
+                    total_quality = total_quality - COALESCE(old.quality_score, 0),
+                    avg_quality = CASE WHEN total_articles > 1
+                        THEN (total_quality - COALESCE(old.quality_score, 0)) * 1.0 / (total_articles - 1)
+                        ELSE 0 END,
+                    categories_json = CASE
+                        WHEN json_extract(categories_json, '$."' || IFNULL(old.category, 'عمومی') || '"') > 1
+                        THEN json_set(
+                            categories_json,
+                            '$."' || IFNULL(old.category, 'عمومی') || '"',
+                            json_extract(categories_json, '$."' || IFNULL(old.category, 'عمومی') || '"') - 1
+                        )
+                        ELSE json_remove(categories_json, '$."' || IFNULL(old.category, 'عمومی') || '"')
+                    END
+                WHERE date = old.created_date;
+                INSERT INTO daily_stats
+                (date, total_articles, total_words, total_quality, avg_quality, categories_json)
+                SELECT new.created_date, 0, 0, 0, 0, '{}'
+                WHERE new.created_date IS NOT NULL
+                  AND NOT EXISTS (SELECT 1 FROM daily_stats WHERE date = new.created_date);
+                UPDATE daily_stats SET
+                    total_articles = total_articles + 1,
+                    total_words = total_words + COALESCE(new.word_count, 0),
+                    total_quality = total_quality + COALESCE(new.quality_score, 0),
+                    avg_quality = (total_quality + COALESCE(new.quality_score, 0)) * 1.0 / (total_articles + 1),
+                    categories_json = json_set(
+                        categories_json,
+                        '$."' || IFNULL(new.category, 'عمومی') || '"',
+                        COALESCE(json_extract(categories_json, '$."' || IFNULL(new.category, 'عمومی') || '"'), 0) + 1
+                    )
+                WHERE date = new.created_date;
+            END;
+            
+            -- محاسبه کامل آمار روزانه از جدول articles (برای پر کردن مجدد و بررسی سازگاری)
+            CREATE VIEW IF NOT EXISTS daily_stats_source AS
+            SELECT created_date AS date,
+                   SUM(n) AS total_articles,
+                   SUM(words) AS total_words,
+                   SUM(quality) AS total_quality,
+                   SUM(quality) * 1.0 / SUM(n) AS avg_quality,
+                   json_group_object(category, n) AS categories_json
+            FROM (
+                SELECT created_date, IFNULL(category, 'عمومی') AS category, COUNT(*) AS n,
+                       SUM(COALESCE(word_count, 0)) AS words, SUM(COALESCE(quality_score, 0)) AS quality
+                FROM articles
+                WHERE created_date IS NOT NULL
+                GROUP BY created_date, IFNULL(category, 'عمومی')
+            )
+            GROUP BY created_date;
+            
+            -- پر کردن اولیه از روی داده‌های موجود
+            DELETE FROM daily_stats;
+            INSERT INTO daily_stats (date, total_articles, total_words, total_quality, avg_quality, categories_json)
+            SELECT date, total_articles, total_words, total_quality, avg_quality, categories_json
+            FROM daily_stats_source;
+        ''',
+        # ۳: صف انتشار پایدار (outbox) با کلید idempotency و شناسه پست وبسایت
+        '''
+            ALTER TABLE articles ADD COLUMN remote_post_id TEXT;
+            ALTER TABLE articles ADD COLUMN published_at TIMESTAMP;
+            
+            CREATE TABLE IF NOT EXISTS publish_outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                article_id INTEGER NOT NULL REFERENCES articles(id) ON DELETE CASCADE,
+                idempotency_key TEXT NOT NULL UNIQUE,
+                status TEXT NOT NULL DEFAULT 'pending',  -- pending / in_flight / published / failed
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at REAL NOT NULL DEFAULT 0,
+                claim_token TEXT,
+                claimed_at REAL,
+                remote_post_id TEXT,
+                last_error TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP
+            );
+            CREATE INDEX IF NOT EXISTS idx_publish_outbox_status ON publish_outbox(status, next_attempt_at);
+            CREATE INDEX IF NOT EXISTS idx_publish_outbox_claim ON publish_outbox(claim_token);
+        ''',
+        # ۴: ایندکس MinHash/LSH برای تشخیص مقالات تقریباً تکراری
+        '''
+            ALTER TABLE articles ADD COLUMN duplicate_of INTEGER;
+            
+            CREATE TABLE IF NOT EXISTS article_minhash (
+                article_id INTEGER PRIMARY KEY,
+                signature BLOB NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS article_lsh (
+                band INTEGER NOT NULL,
+                bucket INTEGER NOT NULL,
+                article_id INTEGER NOT NULL,
+                PRIMARY KEY (band, bucket, article_id)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS idx_article_lsh_article ON article_lsh(article_id);
+            
+            CREATE TRIGGER IF NOT EXISTS articles_dedup_ad AFTER DELETE ON articles BEGIN
+                DELETE FROM article_minhash WHERE article_id = old.id;
+                DELETE FROM article_lsh WHERE article_id = old.id;
+            END;
+        ''',
+        # ۵: معیارهای تله‌متری هر اجرا (زمان spanها و شمارنده‌ها) برای رسم روند عملکرد
+        '''
+            CREATE TABLE IF NOT EXISTS run_metrics (
+                run_id TEXT NOT NULL,
+                recorded_at TIMESTAMP NOT NULL,
+                name TEXT NOT NULL,
+                kind TEXT NOT NULL,  -- span / counter
+                count INTEGER,
+                errors INTEGER,
+                total_ms REAL,
+                avg_ms REAL,
+                max_ms REAL,
+                value REAL,
+                PRIMARY KEY (run_id, name, kind)
+            );
+            CREATE INDEX IF NOT EXISTS idx_run_metrics_name ON run_metrics(name, recorded_at);
+        ''',
+        # ۶: دیکشنری‌های مشترک فشرده‌سازی محتوا (articles.content می‌تواند BLOB فشرده باشد)
+        '''
+            CREATE TABLE IF NOT EXISTS content_dictionaries (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                algorithm TEXT NOT NULL,
+                data BLOB NOT NULL,
+                samples INTEGER,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            );
+        ''',
+        # ۷: صفحات دسته‌بندی (جدیدترین اول) بدون مرتب‌سازی کل دسته در حافظه
+        '''
+            CREATE INDEX IF NOT EXISTS idx_articles_category_id ON articles(category, id);
+        ''',
+        # ۸: هش متن مقاله که هنگام ذخیره نوشته می‌شود (ساخت سایت بدون خواندن محتوا)
+        '''
+            ALTER TABLE articles ADD COLUMN content_hash TEXT;
+        ''',
+        # ۹: تعداد واقعی نویسندگان مقالات PubMed (authors_json فقط سه نویسنده اول است)
+        '''
+            ALTER TABLE pubmed_articles ADD COLUMN author_count INTEGER;
+        ''',
+    ]
+    
+    def __init__(self, db_path="medical_content.db", compression=None):
         self.db_path = db_path
+        # اتصال‌های مشترک و ماندگار (WAL) به جای اتصال جدید در هر متد
+        self.db = get_manager(db_path)
+        # ایندکس تکراری‌ها در همین دیتابیس نگه داشته می‌شود
+        self.dedup = MinHashLSH()
         self.init_database()
+        # متن مقالات فشرده ذخیره می‌شود: zlib (پیش‌فرض)، zstd یا none (متغیر محیطی CONTENT_COMPRESSION)
+        self.codec = self._content_codec(compression or os.environ.get('CONTENT_COMPRESSION', 'zlib'))
+    
+    def _content_codec(self, algorithm):
+        """کدک محتوا با آخرین دیکشنری آموزش‌دیده همان الگوریتم (در صورت وجود)"""
+        codec = ContentCodec(algorithm, loader=dictionary_loader(self.db.connection()))
+        row = self.db.query_one(
+            'SELECT id FROM content_dictionaries WHERE algorithm = ? ORDER BY id DESC LIMIT 1', (codec.algorithm,)
+        )
+        codec.dictionary_id = row['id'] if row else None
+        return codec
     
     def init_database(self):
         """ایجاد جداول دیتابیس"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.db.connection()
         cursor = conn.cursor()
         
         # جدول مقالات
@@ -44,49 +271,568 @@ class MedicalDatabase:
             )
         ''')
         
+        # جدول مقالات PubMed (دریافتی یا وارد شده از فایل‌های baseline)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS pubmed_articles (
+                pmid TEXT PRIMARY KEY,
+                title TEXT NOT NULL,
+                abstract TEXT NOT NULL,
+                abstract_sections_json TEXT,
+                authors_json TEXT,
+                year TEXT,
+                journal TEXT,
+                doi TEXT,
+                publication_types_json TEXT,
+                mesh_terms_json TEXT,
+                is_review BOOLEAN DEFAULT FALSE,
+                source_file TEXT,
+                imported_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_pubmed_articles_review_year ON pubmed_articles(is_review, year)')
+        
+        # ایندکس متن کامل (FTS5) روی عنوان، چکیده و اصطلاحات MeSH
+        fts_exists = cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'pubmed_articles_fts'"
+        ).fetchone()
+        cursor.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS pubmed_articles_fts USING fts5(
+                title, abstract, mesh_terms_json,
+                content='pubmed_articles', content_rowid='rowid',
+                tokenize='porter unicode61'
+            )
+        ''')
+        # همگام نگه داشتن ایندکس با جدول اصلی
+        cursor.executescript('''
+            CREATE TRIGGER IF NOT EXISTS pubmed_articles_ai AFTER INSERT ON pubmed_articles BEGIN
+                INSERT INTO pubmed_articles_fts(rowid, title, abstract, mesh_terms_json)
+                VALUES (new.rowid, new.title, new.abstract, new.mesh_terms_json);
+            END;
+            CREATE TRIGGER IF NOT EXISTS pubmed_articles_ad AFTER DELETE ON pubmed_articles BEGIN
+                INSERT INTO pubmed_articles_fts(pubmed_articles_fts, rowid, title, abstract, mesh_terms_json)
+                VALUES ('delete', old.rowid, old.title, old.abstract, old.mesh_terms_json);
+            END;
+            CREATE TRIGGER IF NOT EXISTS pubmed_articles_au AFTER UPDATE ON pubmed_articles BEGIN
+                INSERT INTO pubmed_articles_fts(pubmed_articles_fts, rowid, title, abstract, mesh_terms_json)
+                VALUES ('delete', old.rowid, old.title, old.abstract, old.mesh_terms_json);
+                INSERT INTO pubmed_articles_fts(rowid, title, abstract, mesh_terms_json)
+                VALUES (new.rowid, new.title, new.abstract, new.mesh_terms_json);
+            END;
+        ''')
+        if not fts_exists:
+            # ساخت ایندکس برای رکوردهایی که قبل از FTS وارد شده‌اند
+            cursor.execute("INSERT INTO pubmed_articles_fts(pubmed_articles_fts) VALUES ('rebuild')")
+        
         conn.commit()
-        conn.close()
+        self.migrate()
         print("✅ دیتابیس با موفقیت راه‌اندازی شد")
     
-    def save_articles(self, articles):
-        """ذخیره مقالات در دیتابیس"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+    def migrate(self):
+        """اجرای مهاجرت‌های schema که هنوز روی این دیتابیس اعمال نشده‌اند"""
+        conn = self.db.connection()
+        version = conn.execute('PRAGMA user_version').fetchone()[0]
+        for number, script in enumerate(self.MIGRATIONS[version:], start=version + 1):
+            # هر مهاجرت به همراه شماره نسخه در یک تراکنش اعمال می‌شود
+            try:
+                conn.executescript(f'BEGIN; {script} PRAGMA user_version = {number}; COMMIT;')
+            except Exception:
+                conn.rollback()
+                raise
+            print(f"🔧 مهاجرت دیتابیس به نسخه {number} انجام شد")
+    
+    def save_articles(self, articles, enqueue=True, dedup=True):
+        """ذخیره دسته‌ای مقالات در یک تراکنش - مقاله تکراری (عنوان+تاریخ) به‌روزرسانی می‌شود
+        
+        با enqueue=True مقالات در همان تراکنش به صف انتشار (publish_outbox) اضافه می‌شوند.
+        محتوای تقریباً تکراری (نسبت به آرشیو یا مقالات قبلی همین دسته) با duplicate_of
+        علامت‌گذاری می‌شود و شناسه مقاله اصلی در article['duplicate_of'] برمی‌گردد.
+        با dedup=False (ورود انبوه) امضای MinHash که بیشتر زمان ذخیره را می‌گیرد محاسبه نمی‌شود و
+        ردیف‌ها بدون امضا می‌مانند تا index_duplicates (دستور dedup-index) بعداً یک‌جا ایندکسشان کند.
+        """
+        now = datetime.now()
+        # امضاها بیرون از تراکنش محاسبه می‌شوند تا قفل نوشتن کوتاه بماند
+        with span('db.signature'):
+            signatures = [self.dedup.signature(article['content']) for article in articles] if dedup else []
+        with span('db.compress'):
+            contents = [self.codec.compress(article['content']) for article in articles]
+        rows = [(
+            article['title'],
+            content,
+            article['category'],
+            article['word_count'],
+            article['reading_time'],
+            article['quality_score'],
+            content_hash(article['content']),
+            now.isoformat(),
+            now.strftime('%Y-%m-%d')
+        ) for article, content in zip(articles, contents)]
         
-        for article in articles:
-            cursor.execute('''
+        duplicates = 0
+        with span('db.save_articles', rows=len(rows)), self.db.transaction() as conn:
+            conn.executemany('''
                 INSERT INTO articles 
-                (title, content, category, word_count, reading_time, quality_score, created_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                article['title'],
-                article['content'],
-                article['category'],
-                article['word_count'],
-                article['reading_time'],
-                article['quality_score'],
-                datetime.now().isoformat()
-            ))
+                (title, content, category, word_count, reading_time, quality_score, content_hash, created_at,
+                 created_date)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(title, created_date) DO UPDATE SET
+                    content = excluded.content,
+                    content_hash = excluded.content_hash,
+                    category = excluded.category,
+                    word_count = excluded.word_count,
+                    reading_time = excluded.reading_time,
+                    quality_score = excluded.quality_score,
+                    created_at = excluded.created_at
+            ''', rows)
+            if not dedup:
+                # امضای قبلی ردیف‌های بازنویسی‌شده معتبر نیست و index_duplicates باید دوباره ببیندشان
+                keys = [(row[0], row[-1]) for row in rows]
+                for table in ('article_minhash', 'article_lsh'):
+                    conn.executemany(f'''
+                        DELETE FROM {table}
+                        WHERE article_id = (SELECT id FROM articles WHERE title = ? AND created_date = ?)
+                    ''', keys)
+                conn.executemany('UPDATE articles SET duplicate_of = NULL WHERE title = ? AND created_date = ?', keys)
+            for article, row, signature in zip(articles, rows, signatures):
+                article_id = conn.execute(
+                    'SELECT id FROM articles WHERE title = ? AND created_date = ?', (row[0], row[-1])
+                ).fetchone()[0]
+                matches = self.dedup.find_similar(conn, signature, exclude=article_id, limit=1)
+                duplicate_of = matches[0][0] if matches else None
+                conn.execute('UPDATE articles SET duplicate_of = ? WHERE id = ?', (duplicate_of, article_id))
+                if duplicate_of is None:
+                    self.dedup.add(conn, article_id, signature)
+                else:
+                    duplicates += 1
+                article['duplicate_of'] = duplicate_of
+            if enqueue:
+                self._enqueue(conn, [(row[0], row[-1]) for row in rows])
         
-        conn.commit()
-        conn.close()
+        count('db.articles_written', len(rows))
+        count('db.duplicates', duplicates)
         print(f"✅ {len(articles)} مقاله در دیتابیس ذخیره شد")
+        if duplicates:
+            print(f"⚠️ {duplicates} مقاله تقریباً تکراری علامت‌گذاری شد")
+        return len(rows)
     
-    def get_daily_stats(self):
-        """دریافت آمار روزانه"""
-        conn = sqlite3.connect(self.db_path)
+    def find_near_duplicates(self, content, limit=5, exclude=None):
+        """مقالات آرشیو که محتوایشان تقریباً با content یکی است - خروجی: لیست dict با شباهت
+
+        exclude: شناسه ردیفی که قرار است بازنویسی شود (همان عنوان+تاریخ) و نباید تکراری خودش حساب شود
+        """
+        conn = self.db.connection()
+        matches = self.dedup.find_similar(conn, self.dedup.signature(content), exclude=exclude, limit=limit)
+        results = []
+        for article_id, similarity in matches:
+            row = self.db.query_one('SELECT id, title, created_date FROM articles WHERE id = ?', (article_id,))
+            if row:
+                row['similarity'] = similarity
+                results.append(row)
+        return results
+    
+    def article_id(self, title, created_date=None):
+        """شناسه مقاله با عنوان و تاریخ (پیش‌فرض امروز) یا None - همان کلید یکتای upsert"""
+        row = self.db.query_one(
+            'SELECT id FROM articles WHERE title = ? AND created_date = ?',
+            (title, created_date or datetime.now().strftime('%Y-%m-%d'))
+        )
+        return row['id'] if row else None
+    
+    def index_duplicates(self, batch_size=1000):
+        """ایندکس کردن مقالات قدیمی که هنوز امضا ندارند (به ترتیب شناسه: مقاله قدیمی‌تر اصلی است)"""
+        conn = self.db.connection()
+        indexed = duplicates = 0
+        last_id = 0
+        while True:
+            rows = conn.execute('''
+                SELECT id, content_text(content) FROM articles
+                WHERE id > ? AND duplicate_of IS NULL
+                  AND id NOT IN (SELECT article_id FROM article_minhash)
+                ORDER BY id LIMIT ?
+            ''', (last_id, batch_size)).fetchall()
+            if not rows:
+                break
+            with self.db.transaction() as conn:
+                for article_id, content in rows:
+                    signature = self.dedup.signature(content)
+                    matches = self.dedup.find_similar(conn, signature, exclude=article_id, limit=1)
+                    if matches:
+                        conn.execute('UPDATE articles SET duplicate_of = ? WHERE id = ?', (matches[0][0], article_id))
+                        duplicates += 1
+                    else:
+                        self.dedup.add(conn, article_id, signature)
+                    indexed += 1
+            last_id = rows[-1][0]
+        print(f"🧬 {indexed} مقاله ایندکس شد ({duplicates} مقاله تقریباً تکراری)")
+        return {'indexed': indexed, 'duplicates': duplicates}
+    
+    @staticmethod
+    def publish_key(title, created_date):
+        """کلید idempotency پایدار هر مقاله (همان هویت یکتای عنوان+تاریخ)"""
+        return hashlib.sha256(f"{title}|{created_date}".encode('utf-8')).hexdigest()
+    
+    def _enqueue(self, conn, identities):
+        """افزودن مقالات (عنوان، تاریخ) به صف انتشار - مقاله‌ای که قبلاً در صف بوده دوباره اضافه نمی‌شود"""
+        conn.executemany('''
+            INSERT INTO publish_outbox (article_id, idempotency_key)
+            SELECT id, ? FROM articles WHERE title = ? AND created_date = ?
+            ON CONFLICT(idempotency_key) DO NOTHING
+        ''', [(self.publish_key(title, created_date), title, created_date) for title, created_date in identities])
+    
+    def enqueue_unpublished(self):
+        """افزودن همه مقالات منتشرنشده‌ای که در صف نیستند (مثلاً مقالات قدیمی)"""
+        with self.db.transaction() as conn:
+            before = conn.total_changes
+            self._enqueue(conn, conn.execute('''
+                SELECT title, created_date FROM articles
+                WHERE NOT published AND created_date IS NOT NULL
+                  AND id NOT IN (SELECT article_id FROM publish_outbox)
+            ''').fetchall())
+            added = conn.total_changes - before
+        print(f"📥 {added} مقاله به صف انتشار اضافه شد")
+        return added
+    
+    def claim_publish_batch(self, batch_size=20, lease_seconds=300):
+        """برداشتن دسته‌ای از صف انتشار برای یک worker
+        
+        موارد in_flight که lease آن‌ها تمام شده (worker قبلی از کار افتاده) دوباره برداشته می‌شوند.
+        برداشتن با یک UPDATE اتمی انجام می‌شود تا دو worker یک مقاله را برندارند.
+        """
+        now = time.time()
+        token = uuid.uuid4().hex
+        with self.db.transaction() as conn:
+            conn.execute('''
+                UPDATE publish_outbox
+                SET status = 'in_flight', claim_token = ?, claimed_at = ?, attempts = attempts + 1,
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE id IN (
+                    SELECT id FROM publish_outbox
+                    WHERE (status = 'pending' AND next_attempt_at <= ?)
+                       OR (status = 'in_flight' AND claimed_at < ?)
+                    ORDER BY id
+                    LIMIT ?
+                )
+            ''', (token, now, now, now - lease_seconds, batch_size))
         
+        return self.db.query('''
+            SELECT o.id AS outbox_id, o.idempotency_key, o.attempts, a.id AS article_id,
+                   a.title, content_text(a.content) AS content, a.category, a.word_count, a.reading_time,
+                   a.quality_score
+            FROM publish_outbox o JOIN articles a ON a.id = o.article_id
+            WHERE o.claim_token = ?
+            ORDER BY o.id
+        ''', (token,))
+    
+    def complete_publish_batch(self, results, max_attempts=5, retry_delay=60):
+        """ثبت نتیجه ارسال‌ها: (مورد برداشته‌شده، نتیجه) - موفق‌ها منتشر و بقیه زمان‌بندی مجدد می‌شوند"""
+        now = time.time()
+        with self.db.transaction() as conn:
+            for item, outcome in results:
+                if outcome['success']:
+                    post_id = None if outcome['post_id'] is None else str(outcome['post_id'])
+                    conn.execute('''
+                        UPDATE publish_outbox
+                        SET status = 'published', remote_post_id = ?, last_error = NULL,
+                            claim_token = NULL, updated_at = CURRENT_TIMESTAMP
+                        WHERE id = ?
+                    ''', (post_id, item['outbox_id']))
+                    conn.execute('''
+                        UPDATE articles SET published = 1, remote_post_id = ?, published_at = CURRENT_TIMESTAMP
+                        WHERE id = ?
+                    ''', (post_id, item['article_id']))
+                else:
+                    # پس از max_attempts تلاش، مورد برای بررسی دستی failed می‌ماند
+                    status = 'failed' if item['attempts'] >= max_attempts else 'pending'
+                    conn.execute('''
+                        UPDATE publish_outbox
+                        SET status = ?, next_attempt_at = ?, last_error = ?,
+                            claim_token = NULL, updated_at = CURRENT_TIMESTAMP
+                        WHERE id = ?
+                    ''', (status, now + retry_delay * 2 ** (item['attempts'] - 1), outcome['error'], item['outbox_id']))
+    
+    def outbox_status(self):
+        """تعداد موارد صف انتشار به تفکیک وضعیت"""
+        return {row['status']: row['count'] for row in self.db.query(
+            'SELECT status, COUNT(*) AS count FROM publish_outbox GROUP BY status'
+        )}
+    
+    def get_article_content(self, article_id):
+        """متن کامل یک مقاله (محتوای فشرده فقط همین‌جا باز می‌شود) یا None"""
+        row = self.db.connection().execute('SELECT content FROM articles WHERE id = ?', (article_id,)).fetchone()
+        return self.codec.decompress(row[0]) if row else None
+    
+    def train_content_dictionary(self, sample_size=2000, size=DICTIONARY_SIZE):
+        """آموزش دیکشنری مشترک از جدیدترین مقالات و فعال کردن آن برای ذخیره‌های بعدی - خروجی: شناسه"""
+        if self.codec.algorithm == 'none':
+            raise ValueError("فشرده‌سازی غیرفعال است")
+        samples = [row[0] for row in self.db.connection().execute(
+            'SELECT content_text(content) FROM articles ORDER BY id DESC LIMIT ?', (sample_size,)
+        )]
+        data = train_dictionary(samples, size, self.codec.algorithm)
+        with self.db.transaction() as conn:
+            dictionary_id = conn.execute(
+                'INSERT INTO content_dictionaries (algorithm, data, samples) VALUES (?, ?, ?)',
+                (self.codec.algorithm, data, len(samples))
+            ).lastrowid
+        self.codec.dictionary_id = dictionary_id
+        print(f"📚 دیکشنری {dictionary_id} ({len(data) // 1024} کیلوبایت) از {len(samples)} مقاله ساخته شد")
+        return dictionary_id
+    
+    def compress_content(self, batch_size=500, recompress=False, vacuum=False):
+        """فشرده‌سازی محتوای ذخیره‌شده قبلی (و با recompress=True بازفشرده‌سازی با دیکشنری فعلی)
+        
+        خروجی: تعداد ردیف‌های بازنویسی‌شده. با vacuum=True فضای آزادشده به سیستم فایل برمی‌گردد.
+        """
+        condition = '1' if recompress else "typeof(content) = 'text'"
+        conn = self.db.connection()
+        rewritten = 0
+        last_id = 0
+        while True:
+            rows = conn.execute(f'''
+                SELECT id, content_text(content) FROM articles
+                WHERE id > ? AND {condition} ORDER BY id LIMIT ?
+            ''', (last_id, batch_size)).fetchall()
+            if not rows:
+                break
+            with self.db.transaction() as conn:
+                conn.executemany('UPDATE articles SET content = ? WHERE id = ?',
+                                 [(self.codec.compress(content), article_id) for article_id, content in rows])
+            rewritten += len(rows)
+            last_id = rows[-1][0]
+        if vacuum:
+            conn.execute('VACUUM')
+        print(f"🗜️ محتوای {rewritten} مقاله فشرده شد")
+        return rewritten
+    
+    def storage_stats(self):
+        """حجم ذخیره‌شده محتوا به تفکیک نوع (فشرده/متنی) و حجم فایل دیتابیس"""
+        conn = self.db.connection()
+        stats = {'compressed': 0, 'uncompressed': 0, 'content_bytes': 0}
+        for kind, count, size in conn.execute('''
+            SELECT typeof(content), COUNT(*), SUM(length(CAST(content AS BLOB))) FROM articles GROUP BY 1
+        '''):
+            stats['compressed' if kind == 'blob' else 'uncompressed'] += count
+            stats['content_bytes'] += size or 0
+        page_size = conn.execute('PRAGMA page_size').fetchone()[0]
+        stats['file_bytes'] = conn.execute('PRAGMA page_count').fetchone()[0] * page_size
+        return stats
+    
+    def save_run_metrics(self, summary):
+        """ذخیره خلاصه تله‌متری یک اجرا (خروجی Telemetry.summary) - خروجی: تعداد معیارها"""
+        recorded_at = summary.get('started_at') or datetime.now().isoformat()
+        rows = [(summary['run_id'], recorded_at, s['name'], 'span', s['count'], s['errors'],
+                 s['total_ms'], s['avg_ms'], s['max_ms'], None) for s in summary['spans']]
+        rows += [(summary['run_id'], recorded_at, name, 'counter', None, None, None, None, None, value)
+                 for name, value in summary['counters'].items()]
+        with self.db.transaction() as conn:
+            conn.executemany('''
+                INSERT OR REPLACE INTO run_metrics
+                (run_id, recorded_at, name, kind, count, errors, total_ms, avg_ms, max_ms, value)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', rows)
+        return len(rows)
+    
+    def metric_history(self, name, limit=30):
+        """روند یک معیار در اجراهای اخیر (قدیمی‌ترین اول) برای رسم نمودار"""
+        rows = self.db.query('''
+            SELECT run_id, recorded_at, kind, count, errors, total_ms, avg_ms, max_ms, value
+            FROM run_metrics WHERE name = ?
+            ORDER BY recorded_at DESC LIMIT ?
+        ''', (name, limit))
+        return rows[::-1]
+    
+    def get_daily_stats(self):
+        """دریافت آمار روزانه (از جدول تجمیعی daily_stats)"""
         # آمار مقالات امروز
         today = datetime.now().strftime('%Y-%m-%d')
-        df = pd.read_sql_query('''
+        stats = self.db.query_one('''
             SELECT 
-                COUNT(*) as total_articles,
-                SUM(word_count) as total_words,
-                AVG(quality_score) as avg_quality,
-                GROUP_CONCAT(DISTINCT category) as categories
-            FROM articles 
-            WHERE DATE(created_at) = ?
-        ''', conn, params=[today])
-        
-        conn.close()
-        return df.to_dict('records')[0] if not df.empty else {}
+                total_articles,
+                total_words,
+                avg_quality,
+                categories_json
+            FROM daily_stats 
+            WHERE date = ? AND total_articles > 0
+        ''', (today,))
+        
+        if stats is None:
+            return {'total_articles': 0, 'total_words': None, 'avg_quality': None, 'categories': None}
+        
+        stats['categories'] = ','.join(json.loads(stats.pop('categories_json') or '{}'))
+        return stats
+    
+    def rebuild_daily_stats(self):
+        """بازسازی کامل daily_stats از روی جدول articles"""
+        with self.db.transaction() as conn:
+            conn.execute('DELETE FROM daily_stats')
+            conn.execute('''
+                INSERT INTO daily_stats (date, total_articles, total_words, total_quality, avg_quality, categories_json)
+                SELECT date, total_articles, total_words, total_quality, avg_quality, categories_json
+                FROM daily_stats_source
+            ''')
+            days = conn.execute('SELECT COUNT(*) FROM daily_stats').fetchone()[0]
+        print(f"✅ آمار روزانه برای {days} روز بازسازی شد")
+        return days
+    
+    def check_daily_stats(self):
+        """بررسی سازگاری daily_stats با جدول articles - خروجی: لیست روزهای ناسازگار"""
+        conn = self.db.connection()
+        expected = {
+            row[0]: (row[1], row[2], row[3], json.loads(row[4]))
+            for row in conn.execute(
+                'SELECT date, total_articles, total_words, total_quality, categories_json FROM daily_stats_source'
+            )
+        }
+        actual = {
+            row[0]: (row[1], row[2], row[3], json.loads(row[4] or '{}'))
+            for row in conn.execute(
+                'SELECT date, total_articles, total_words, total_quality, categories_json FROM daily_stats WHERE total_articles != 0'
+            )
+        }
+        
+        mismatches = sorted(date for date in set(expected) | set(actual) if expected.get(date) != actual.get(date))
+        if mismatches:
+            print(f"❌ آمار روزانه برای {len(mismatches)} روز ناسازگار است: {mismatches[:10]}")
+        else:
+            print(f"✅ آمار روزانه برای {len(expected)} روز سازگار است")
+        return mismatches
+    
+    def save_pubmed_articles(self, articles, source_file=None):
+        """ذخیره دسته‌ای مقالات PubMed (به‌روزرسانی رکوردهای تکراری بر اساس PMID)"""
+        review_types = {'Meta-Analysis', 'Systematic Review'}
+        rows = [(
+            article['pmid'],
+            article['title'],
+            article['abstract'],
+            json.dumps(article.get('abstract_sections', []), ensure_ascii=False),
+            json.dumps(article.get('authors', []), ensure_ascii=False),
+            article.get('year'),
+            article.get('journal'),
+            article.get('doi'),
+            json.dumps(article.get('publication_types', []), ensure_ascii=False),
+            json.dumps(article.get('mesh_terms', []), ensure_ascii=False),
+            bool(review_types & set(article.get('publication_types', []))),
+            source_file,
+            article.get('author_count')
+        ) for article in articles if article.get('pmid')]
+        
+        # UPSERT به جای REPLACE تا triggerهای ایندکس FTS اجرا شوند
+        with self.db.transaction() as conn:
+            conn.executemany('''
+                INSERT INTO pubmed_articles
+                (pmid, title, abstract, abstract_sections_json, authors_json, year, journal, doi,
+                 publication_types_json, mesh_terms_json, is_review, source_file, author_count)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(pmid) DO UPDATE SET
+                    title = excluded.title,
+                    abstract = excluded.abstract,
+                    abstract_sections_json = excluded.abstract_sections_json,
+                    authors_json = excluded.authors_json,
+                    author_count = excluded.author_count,
+                    year = excluded.year,
+                    journal = excluded.journal,
+                    doi = excluded.doi,
+                    publication_types_json = excluded.publication_types_json,
+                    mesh_terms_json = excluded.mesh_terms_json,
+                    is_review = excluded.is_review,
+                    source_file = COALESCE(excluded.source_file, pubmed_articles.source_file),
+                    imported_at = CURRENT_TIMESTAMP
+            ''', rows)
+        return len(rows)
+    
+    # کلمات بی‌اثر در کوئری‌های موضوعی
+    FTS_STOPWORDS = {'a', 'an', 'and', 'the', 'of', 'for', 'in', 'on', 'to', 'with', 'by', 'or'}
+    
+    def _fts_query(self, query):
+        """تبدیل موضوع به کوئری FTS5 - همه کلمات (با ریشه‌یابی porter) لازم هستند"""
+        words = [
+            word for word in re.findall(r'\w+', query.lower())
+            if word not in self.FTS_STOPWORDS and len(word) > 1
+        ]
+        return ' AND '.join(f'"{word}"' for word in words)
+    
+    def search_pubmed_articles(self, query, limit=5, reviews_only=True):
+        """جستجوی آفلاین مقالات PubMed ذخیره شده با رتبه‌بندی BM25"""
+        fts_query = self._fts_query(query)
+        if not fts_query:
+            return []
+        
+        conn = self.db.connection()
+        # وزن بیشتر برای عنوان و MeSH نسبت به متن چکیده
+        rows = conn.execute(f'''
+            SELECT p.pmid, p.title, p.abstract, p.abstract_sections_json, p.authors_json, p.year,
+                   p.journal, p.doi, p.publication_types_json, p.mesh_terms_json, p.author_count,
+                   julianday('now') - julianday(p.imported_at)
+            FROM pubmed_articles_fts
+            JOIN pubmed_articles p ON p.rowid = pubmed_articles_fts.rowid
+            WHERE pubmed_articles_fts MATCH ?
+            {'AND p.is_review = 1' if reviews_only else ''}
+            ORDER BY bm25(pubmed_articles_fts, 10.0, 1.0, 5.0)
+            LIMIT ?
+        ''', (fts_query, limit)).fetchall()
+        
+        articles = []
+        for row in rows:
+            article = self._pubmed_row_to_article(row[:-1])
+            # چند روز از ذخیره یا آخرین دریافت مقاله گذشته (برای تصمیم به جستجوی دوباره در شبکه)
+            article['age_days'] = row[-1]
+            articles.append(article)
+        return articles
+    
+    def _pubmed_row_to_article(self, row):
+        """تبدیل ردیف جدول pubmed_articles به همان قالب خروجی PubMedBot"""
+        pmid, title, abstract, sections, authors, year, journal, doi, pub_types, mesh, author_count = row
+        authors = json.loads(authors or '[]')
+        return {
+            'pmid': pmid,
+            'title': title,
+            'abstract': abstract,
+            'abstract_sections': json.loads(sections or '[]'),
+            'authors': authors,
+            'author_count': author_count if author_count is not None else len(authors),
+            'year': year,
+            'journal': journal,
+            'doi': doi,
+            'publication_types': json.loads(pub_types or '[]'),
+            'mesh_terms': json.loads(mesh or '[]'),
+            'source': 'PubMed',
+            'word_count': len(abstract.split())
+        }
+
+def main():
+    """ابزار خط فرمان نگهداری دیتابیس"""
+    import argparse
+    parser = argparse.ArgumentParser(description="نگهداری دیتابیس محتوای پزشکی")
+    parser.add_argument('command', choices=['rebuild-stats', 'check-stats', 'enqueue-unpublished', 'outbox-status',
+                                            'dedup-index', 'metrics', 'compress', 'train-dictionary',
+                                            'storage-stats'],
+                        help="عملیات")
+    parser.add_argument('--db', default="medical_content.db", help="مسیر دیتابیس")
+    parser.add_argument('--metric', default="stage.compose", help="نام معیار برای دستور metrics")
+    args = parser.parse_args()
+    
+    db = MedicalDatabase(args.db)
+    if args.command == 'rebuild-stats':
+        db.rebuild_daily_stats()
+    elif args.command == 'enqueue-unpublished':
+        db.enqueue_unpublished()
+    elif args.command == 'outbox-status':
+        print(json.dumps(db.outbox_status(), ensure_ascii=False))
+    elif args.command == 'dedup-index':
+        db.index_duplicates()
+    elif args.command == 'train-dictionary':
+        db.train_content_dictionary()
+        db.compress_content(recompress=True, vacuum=True)
+    elif args.command == 'compress':
+        db.compress_content(vacuum=True)
+    elif args.command == 'storage-stats':
+        print(json.dumps(db.storage_stats(), ensure_ascii=False))
+    elif args.command == 'metrics':
+        # هر اجرا یک خط JSON - مناسب برای رسم نمودار روند
+        for row in db.metric_history(args.metric):
+            print(json.dumps(row, ensure_ascii=False))
+    else:
+        # کد خروج غیرصفر برای استفاده در CI
+        raise SystemExit(1 if db.check_daily_stats() else 0)
+
+if __name__ == "__main__":
+    main()
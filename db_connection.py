@@ -0,0 +1,109 @@
+import atexit
+import sqlite3
+import threading
+from contextlib import contextmanager
+from content_codec import register_functions
+
+class ConnectionManager:
+    """مدیریت اتصال‌های SQLite: یک اتصال ماندگار برای هر thread با حالت WAL"""
+
+    # تنظیمات هر اتصال - WAL باعث می‌شود خواندن‌ها نوشتن را مسدود نکنند
+    PRAGMAS = (
+        ('journal_mode', 'WAL'),
+        ('synchronous', 'NORMAL'),    # در حالت WAL امن و بسیار سریع‌تر از FULL
+        ('cache_size', -20000),       # حدود ۲۰ مگابایت کش صفحات
+        ('mmap_size', 268435456),     # ۲۵۶ مگابایت نگاشت حافظه برای خواندن
+        ('temp_store', 'MEMORY'),
+        ('busy_timeout', 5000),
+    )
+
+    def __init__(self, db_path, cached_statements=256):
+        self.db_path = db_path
+        # sqlite3 دستورات آماده (prepared) را به ازای هر اتصال کش می‌کند
+        self.cached_statements = cached_statements
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+
+    def connection(self):
+        """اتصال مخصوص thread جاری (در اولین استفاده ساخته می‌شود)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(
+                self.db_path,
+                timeout=5.0,
+                cached_statements=self.cached_statements,
+                check_same_thread=False  # هر اتصال فقط در thread خودش استفاده می‌شود
+            )
+            for name, value in self.PRAGMAS:
+                conn.execute(f'PRAGMA {name} = {value}')
+            # content_text() برای خواندن محتوای فشرده مقالات در کوئری‌ها
+            register_functions(conn)
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    @contextmanager
+    def transaction(self):
+        """تراکنش نوشتن: در پایان commit و در صورت خطا rollback"""
+        conn = self.connection()
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+    def query(self, sql, params=()):
+        """اجرای کوئری خواندنی و برگرداندن ردیف‌ها به صورت لیست dict (بدون pandas)"""
+        cursor = self.connection().cursor()
+        cursor.row_factory = sqlite3.Row
+        return [dict(row) for row in cursor.execute(sql, params)]
+
+    def query_one(self, sql, params=()):
+        """اولین ردیف نتیجه به صورت dict یا None اگر نتیجه‌ای نباشد"""
+        cursor = self.connection().cursor()
+        cursor.row_factory = sqlite3.Row
+        row = cursor.execute(sql, params).fetchone()
+        return dict(row) if row is not None else None
+
+    def checkpoint(self):
+        """انتقال کامل فایل WAL به فایل اصلی دیتابیس و خالی کردن آن (TRUNCATE)
+
+        بدون checkpoint تغییرات commit‌شده در فایل -wal می‌مانند و کپی تنها فایل .db
+        (کش و artifact در CI) ناقص است.
+        """
+        return self.connection().execute('PRAGMA wal_checkpoint(TRUNCATE)').fetchone()
+
+    def close_all(self):
+        """checkpoint و بستن همه اتصال‌های باز (در پایان اجرا)"""
+        with self._lock:
+            if self._connections:
+                try:
+                    self._connections[0].execute('PRAGMA wal_checkpoint(TRUNCATE)')
+                except sqlite3.Error as e:
+                    print(f"⚠️ checkpoint دیتابیس {self.db_path} انجام نشد: {e}")
+            for conn in self._connections:
+                conn.close()
+            self._connections = []
+        self._local = threading.local()
+
+_managers = {}
+_managers_lock = threading.Lock()
+
+def get_manager(db_path):
+    """مدیر اتصال مشترک برای هر فایل دیتابیس"""
+    with _managers_lock:
+        if db_path not in _managers:
+            _managers[db_path] = ConnectionManager(db_path)
+        return _managers[db_path]
+
+@atexit.register
+def close_managers():
+    """checkpoint و بستن همه دیتابیس‌ها در پایان هر پروسه (ربات، داشبورد، CLIها)"""
+    with _managers_lock:
+        managers = list(_managers.values())
+        _managers.clear()
+    for manager in managers:
+        manager.close_all()
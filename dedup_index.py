@@ -0,0 +1,136 @@
+import hashlib
+import random
+import re
+import zlib
+from array import array
+
+# پارامترهای پیش‌فرض: ۱۲۸ تابع hash در ۱۶ باند ۸ ردیفی
+# آستانه تقریبی LSH برابر (1/16)^(1/8) ≈ 0.71 است، پس جفت‌های با شباهت ۰.۸ به بالا
+# تقریباً همیشه (حدود ۹۵٪) کاندید می‌شوند و مقالات قالبی معمولی (شباهت حدود ۰.۴) به ندرت
+NUM_PERM = 128
+BANDS = 16
+SHINGLE_SIZE = 5
+THRESHOLD = 0.8
+
+# بزرگ‌ترین عدد اول کوچک‌تر از 2^32: حاصل a*h+b در ۶۴ بیت جا می‌شود و با numpy و پایتون یکسان است
+_PRIME = 4294967291
+_MAX_HASH = 0xFFFFFFFF
+_WORD = re.compile(r'\w+')
+
+def _numpy():
+    """numpy اختیاری است و فقط هنگام اولین محاسبه امضا import می‌شود"""
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+def shingles(text, size=SHINGLE_SIZE):
+    """مجموعه hash دنباله‌های size کلمه‌ای متن (عنوان‌های markdown و علائم نادیده گرفته می‌شوند)"""
+    words = _WORD.findall(text.lower())
+    if len(words) < size:
+        return {zlib.crc32(' '.join(words).encode('utf-8'))} if words else set()
+    return {
+        zlib.crc32(' '.join(words[i:i + size]).encode('utf-8'))
+        for i in range(len(words) - size + 1)
+    }
+
+class MinHashLSH:
+    """امضای MinHash و کلید باندهای LSH برای یافتن مقالات تقریباً تکراری
+
+    امضا و باندها در دیتابیس (جداول article_minhash و article_lsh) نگه داشته می‌شوند،
+    پس هر مقاله جدید فقط با مقالات هم‌باند مقایسه می‌شود نه با کل آرشیو.
+    """
+
+    def __init__(self, num_perm=NUM_PERM, bands=BANDS, threshold=THRESHOLD, seed=1):
+        if num_perm % bands:
+            raise ValueError("num_perm باید بر تعداد باندها بخش‌پذیر باشد")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        # ضرایب ثابت: امضاهای ذخیره‌شده در اجراهای بعدی هم قابل مقایسه می‌مانند
+        rng = random.Random(seed)
+        self.permutations = [(rng.randrange(1, _PRIME), rng.randrange(0, _PRIME)) for _ in range(num_perm)]
+        self._vectors = None
+
+    def signature(self, text):
+        """امضای MinHash متن به صورت array از num_perm عدد ۳۲ بیتی (با numpy در صورت نصب بودن)"""
+        hashes = shingles(text)
+        if not hashes:
+            return array('I', [_MAX_HASH] * self.num_perm)
+        if self._vectors is None:
+            np = _numpy()
+            self._vectors = (np, None, None) if np is None else (
+                np,
+                np.array([a for a, _ in self.permutations], dtype=np.uint64)[:, None],
+                np.array([b for _, b in self.permutations], dtype=np.uint64)[:, None]
+            )
+        np, a_column, b_column = self._vectors
+        if np is None:
+            return array('I', [min([(a * h + b) % _PRIME for h in hashes]) for a, b in self.permutations])
+        values = np.fromiter(hashes, dtype=np.uint64, count=len(hashes))
+        minimums = ((a_column * values + b_column) % np.uint64(_PRIME)).min(axis=1)
+        return array('I', minimums.astype(np.uint32).tobytes())
+
+    def band_keys(self, signature):
+        """کلید هر باند: (شماره باند، hash پایدار ۶۴ بیتی ردیف‌های آن باند)"""
+        keys = []
+        for band in range(self.bands):
+            chunk = signature[band * self.rows:(band + 1) * self.rows].tobytes()
+            bucket = int.from_bytes(hashlib.blake2b(chunk, digest_size=8).digest(), 'big', signed=True)
+            keys.append((band, bucket))
+        return keys
+
+    def similarity(self, first, second):
+        """تخمین شباهت Jaccard از روی دو امضا"""
+        return sum(1 for x, y in zip(first, second) if x == y) / self.num_perm
+
+    @staticmethod
+    def to_blob(signature):
+        return signature.tobytes()
+
+    @staticmethod
+    def from_blob(blob):
+        signature = array('I')
+        signature.frombytes(blob)
+        return signature
+
+    def candidates(self, conn, signature, exclude=None):
+        """شناسه مقالاتی که دست‌کم در یک باند با این امضا هم‌سطل هستند (جستجوی ایندکسی)"""
+        found = set()
+        for band, bucket in self.band_keys(signature):
+            for (article_id,) in conn.execute(
+                'SELECT article_id FROM article_lsh WHERE band = ? AND bucket = ?', (band, bucket)
+            ):
+                found.add(article_id)
+        found.discard(exclude)
+        return found
+
+    def find_similar(self, conn, signature, exclude=None, limit=5):
+        """مقالات تقریباً تکراری - خروجی: لیست (شناسه، شباهت) به ترتیب نزولی شباهت"""
+        ids = self.candidates(conn, signature, exclude)
+        matches = []
+        for article_id in ids:
+            row = conn.execute(
+                'SELECT signature FROM article_minhash WHERE article_id = ?', (article_id,)
+            ).fetchone()
+            if row is None:
+                continue
+            score = self.similarity(signature, self.from_blob(row[0]))
+            if score >= self.threshold:
+                matches.append((article_id, score))
+        matches.sort(key=lambda match: -match[1])
+        return matches[:limit]
+
+    def add(self, conn, article_id, signature):
+        """ثبت (یا جایگزینی) امضا و باندهای یک مقاله - داخل تراکنش فراخواننده"""
+        conn.execute('DELETE FROM article_lsh WHERE article_id = ?', (article_id,))
+        conn.execute(
+            'INSERT OR REPLACE INTO article_minhash (article_id, signature) VALUES (?, ?)',
+            (article_id, self.to_blob(signature))
+        )
+        conn.executemany(
+            'INSERT OR IGNORE INTO article_lsh (band, bucket, article_id) VALUES (?, ?, ?)',
+            [(band, bucket, article_id) for band, bucket in self.band_keys(signature)]
+        )
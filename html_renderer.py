@@ -0,0 +1,87 @@
+import html
+import os
+from string import Formatter
+
+class Template:
+    """قالب HTML که یک بار کامپایل می‌شود و بارها به صورت تکه‌تکه رندر می‌شود
+
+    جای‌گذاری‌ها مثل str.format نوشته می‌شوند ({name} یا {name:.1f}) و همه
+    مقادیر پیش از درج escape می‌شوند. برای درج HTML آماده از Markup استفاده کنید.
+    """
+
+    def __init__(self, source):
+        self.source = source
+        # تجزیه قالب فقط یک بار: لیست (متن ثابت، نام فیلد، قالب عدد)
+        self.parts = [
+            (literal, field, spec or '')
+            for literal, field, spec, _ in Formatter().parse(source)
+        ]
+        self.fields = {field for _, field, _ in self.parts if field}
+
+    def chunks(self, context):
+        """تکه‌های خروجی به ترتیب - بدون ساختن کل رشته در حافظه"""
+        for literal, field, spec in self.parts:
+            if literal:
+                yield literal
+            if field:
+                value = context[field]
+                if isinstance(value, Markup):
+                    yield value
+                else:
+                    yield html.escape(format(value, spec), quote=True)
+
+    def render(self, context):
+        """رندر کامل به صورت رشته (برای قالب‌های کوچک مثل یک ردیف جدول)"""
+        return ''.join(self.chunks(context))
+
+class Markup(str):
+    """رشته HTML مطمئن که نباید دوباره escape شود"""
+
+class ChunkedWriter:
+    """نوشتن خروجی در فایل موقت با بافر ثابت و جایگزینی اتمی در پایان"""
+
+    def __init__(self, path, buffer_size=64 * 1024):
+        self.path = path
+        self.tmp_path = f"{path}.tmp"
+        self.buffer_size = buffer_size
+        self.buffer = []
+        self.buffered = 0
+        self.bytes_written = 0
+        self.file = None
+
+    def __enter__(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.file = open(self.tmp_path, 'w', encoding='utf-8')
+        return self
+
+    def write(self, chunk):
+        self.buffer.append(chunk)
+        self.buffered += len(chunk)
+        if self.buffered >= self.buffer_size:
+            self.flush()
+
+    def write_all(self, chunks):
+        for chunk in chunks:
+            self.write(chunk)
+
+    def flush(self):
+        if self.buffer:
+            data = ''.join(self.buffer)
+            self.file.write(data)
+            self.bytes_written += len(data)
+            self.buffer = []
+            self.buffered = 0
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                self.flush()
+        finally:
+            self.file.close()
+        if exc_type is None:
+            os.replace(self.tmp_path, self.path)
+        else:
+            os.remove(self.tmp_path)
+        return False
@@ -1,124 +1,120 @@
 from pubmed_bot import PubMedBot
 import requests
 from bs4 import BeautifulSoup
+import gzip
 import json
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+import hashlib
+import multiprocessing
 import random
+import threading
 import time
 import os
 from database_handler import MedicalDatabase
 from website_poster import WebsiteAutoPoster
 from analytics import MedicalAnalytics
+from fallback_templates import DEFAULT_BANK
+from topic_registry import get_registry
+from pipeline import Pipeline, Stage
+import telemetry
+from telemetry import count, span
+
+def topic_seed(seed, topic):
+    """seed پایدار هر موضوع - مستقل از ترتیب اجرا و worker، پس خروجی قابل تکرار است"""
+    return int(hashlib.sha256(f"{seed}:{topic}".encode('utf-8')).hexdigest()[:16], 16)
+
+def compose_article(topic, prefetched, seed):
+    """نگارش یک مقاله با seed مشخص (قابل اجرا در ProcessPoolExecutor)"""
+    random.seed(seed)
+    return AutoMedicalContentBot().generate_ai_content(topic, prefetched)
 
 class AutoMedicalContentBot:
-    def __init__(self):
+    def __init__(self, daily_count=None, seed=None, fetch_workers=None, compose_workers=None,
+                 fetch_batch_size=20, registry=None):
         self.generated_articles = []
-        
-    # گسترش موضوعات و دسته‌بندی‌ها
-    AUTO_TOPICS = {
-        "دیابت و متابولیک": [
-            "درمان دیابت نوع ۲ با روش‌های نوین", 
-            "کنترل قند خون در فصل سرما",
-            "رژیم غذایی مناسب برای دیابتی‌ها",
-            "ورزش‌های مؤثر برای کاهش قند خون",
-            "عوارض بلندمدت دیابت و راه‌های پیشگیری"
-        ],
-        "تغذیه و رژیم": [
-            "رژیم مدیترانه‌ای و فواید آن برای قلب",
-            "فستینگ متناوب و تأثیر بر متابولیسم",
-            "رژیم کتوژنیک برای کاهش وزن",
-            "شاخص گلایسمی و کنترل وزن",
-            "مکمل‌های غذایی ضروری برای سالمندان"
-        ],
-        "قلب و عروق": [
-            "درمان فشار خون با تغییر سبک زندگی",
-            "کنترل کلسترول با تغذیه مناسب",
-            "ورزش‌های قلبی-عروقی برای سلامت قلب",
-            "پیشگیری از سکته مغزی",
-            "رژیم غذایی مخصوص بیماران قلبی"
-        ],
-        "گوارش و کبد": [
-            "درمان کبد چرب با روش‌های طبیعی",
-            "تغذیه مناسب برای سلامت دستگاه گوارش",
-            "پروبیوتیک‌ها و بهبود میکروبیوم روده",
-            "رژیم غذایی برای بهبود گوارش",
-            "پاکسازی کبد با مواد غذایی طبیعی"
-        ],
-        "روانشناسی سلامت": [
-            "تأثیر استرس بر سیستم ایمنی بدن",
-            "رابطه خواب و سلامت متابولیک",
-            "تکنیک‌های کاهش استرس روزانه",
-            "تأثیر مدیتیشن بر فشار خون"
-        ]
-    }
+        # موضوعات، دسته‌بندی‌ها و ترجمه‌ها از فایل topics.json (یک بار برای هر پروسه)
+        self.registry = registry or get_registry()
+        # تعداد مقالات روزانه و seed از متغیرهای محیطی (DAILY_ARTICLES, BOT_SEED) قابل تنظیم است
+        self.daily_count = daily_count or int(os.environ.get('DAILY_ARTICLES', '3'))
+        # seed پیش‌فرض تاریخ روز است: اجرای دوباره در همان روز همان موضوعات و متن را می‌سازد
+        if seed is None:
+            seed = os.environ.get('BOT_SEED') or datetime.now().strftime('%Y%m%d')
+        self.seed = str(seed)
+        self.rng = random.Random(self.seed)
+        # دریافت از PubMed محدود به نرخ شبکه است و نگارش محدود به CPU
+        self.fetch_workers = fetch_workers or int(os.environ.get('FETCH_WORKERS', '2'))
+        self.compose_workers = compose_workers or int(os.environ.get('COMPOSE_WORKERS', str(os.cpu_count() or 1)))
+        self.fetch_batch_size = fetch_batch_size
+        # پروسه‌های نگارش فقط وقتی راه‌اندازی می‌شوند که هر worker دست‌کم این تعداد موضوع داشته باشد
+        self.process_min_topics_per_worker = 4
+        self._compose_lock = threading.Lock()
+        
+    def topic_catalog(self):
+        """همه موضوعات قابل تولید (پایه + گروه‌های مخاطب) از registry - خروجی: {موضوع: اطلاعات موضوع}"""
+        return self.registry.entries
     
-    def select_daily_topics(self):
-        """انتخاب هوشمندانه‌تر موضوعات"""
-        print("📅 در حال انتخاب موضوعات امروز...")
-        
-        # انتخاب متعادل از همه دسته‌بندی‌ها
+    def select_daily_topics(self, count=None):
+        """انتخاب متعادل موضوعات از همه دسته‌بندی‌ها (به نوبت) با seed قابل تکرار"""
+        count = count or self.daily_count
+        print(f"📅 در حال انتخاب {count} موضوع برای امروز...")
+        
+        # موضوعات هر دسته‌بندی به ترتیب تصادفی (قابل تکرار با seed)
+        by_category = {}
+        for topic, entry in self.topic_catalog().items():
+            by_category.setdefault(entry['category'], []).append(topic)
+        categories = sorted(by_category)
+        self.rng.shuffle(categories)
+        for category in categories:
+            self.rng.shuffle(by_category[category])
+        
+        # انتخاب نوبتی از دسته‌بندی‌ها تا توزیع موضوعات متعادل بماند
         selected_topics = []
-        categories = list(self.AUTO_TOPICS.keys())
-        random.shuffle(categories)
-        
-        for category in categories[:3]:  # حداکثر ۳ دسته‌بندی مختلف
-            topics = self.AUTO_TOPICS[category]
-            if topics:
-                selected_topic = random.choice(topics)
-                selected_topics.append(selected_topic)
-        
-        # اگر کمتر از ۳ موضوع انتخاب شده، از دسته‌بندی‌های تصادفی اضافه کن
-        while len(selected_topics) < 3:
-            random_category = random.choice(categories)
-            random_topic = random.choice(self.AUTO_TOPICS[random_category])
-            if random_topic not in selected_topics:
-                selected_topics.append(random_topic)
-        
-        print(f"✅ موضوعات امروز: {selected_topics}")
+        while len(selected_topics) < count and any(by_category.values()):
+            for category in categories:
+                if by_category[category] and len(selected_topics) < count:
+                    selected_topics.append(by_category[category].pop())
+        
+        preview = '، '.join(selected_topics[:5]) + (' ...' if len(selected_topics) > 5 else '')
+        print(f"✅ {len(selected_topics)} موضوع انتخاب شد (seed={self.seed}): {preview}")
         return selected_topics
     
-    def generate_ai_content(self, topic):
-        """تولید محتوای مبتنی بر PubMed - مقالات ۱۰۰۰ کلمه‌ای"""
-        print(f"🤖 در حال تولید محتوا برای: {topic}")
-        
-        # دیکشنری ترجمه موضوعات به انگلیسی
-        topic_translations = {
-            "درمان دیابت نوع ۲ با روش‌های نوین": "type 2 diabetes treatment innovations",
-            "کنترل قند خون در فصل سرما": "blood sugar control in cold weather",
-            "رژیم غذایی مناسب برای دیابتی‌ها": "diabetic diet recommendations",
-            "ورزش‌های مؤثر برای کاهش قند خون": "exercise for blood sugar reduction",
-            "عوارض بلندمدت دیابت و راه‌های پیشگیری": "diabetes long-term complications prevention",
-            "رژیم مدیترانه‌ای و فواید آن برای قلب": "mediterranean diet heart benefits",
-            "فستینگ متناوب و تأثیر بر متابولیسم": "intermittent fasting metabolism",
-            "رژیم کتوژنیک برای کاهش وزن": "ketogenic diet weight loss",
-            "شاخص گلایسمی و کنترل وزن": "glycemic index weight control",
-            "مکمل‌های غذایی ضروری برای سالمندان": "nutritional supplements elderly",
-            "درمان فشار خون با تغییر سبک زندگی": "hypertension lifestyle changes",
-            "کنترل کلسترول با تغذیه مناسب": "cholesterol control nutrition",
-            "ورزش‌های قلبی-عروقی برای سلامت قلب": "cardio exercise heart health",
-            "پیشگیری از سکته مغزی": "stroke prevention",
-            "رژیم غذایی مخصوص بیماران قلبی": "heart disease diet",
-            "درمان کبد چرب با روش‌های طبیعی": "fatty liver natural treatment",
-            "تغذیه مناسب برای سلامت دستگاه گوارش": "digestive health nutrition",
-            "پروبیوتیک‌ها و بهبود میکروبیوم روده": "probiotics gut microbiome",
-            "رژیم غذایی برای بهبود گوارش": "diet for digestion improvement",
-            "پاکسازی کبد با مواد غذایی طبیعی": "liver detox foods",
-            "تأثیر استرس بر سیستم ایمنی بدن": "stress immune system",
-            "رابطه خواب و سلامت متابولیک": "sleep metabolic health",
-            "تکنیک‌های کاهش استرس روزانه": "daily stress reduction techniques",
-            "تأثیر مدیتیشن بر فشار خون": "meditation blood pressure"
-        }
+    def translate_topic(self, topic):
+        """ترجمه موضوع فارسی به کوئری انگلیسی PubMed (None برای موضوع ناشناخته)"""
+        return self.registry.query(topic)
+    
+    def generate_ai_content(self, topic, prefetched=None):
+        """تولید محتوای مبتنی بر PubMed - مقالات ۱۰۰۰ کلمه‌ای
         
+        prefetched: نتیجه PubMedBot.search_many به صورت {کوئری انگلیسی: مقالات}
+        """
+        print(f"🤖 در حال تولید محتوا برای: {topic}")
+        with span('generate') as attrs:
+            article = self._generate_ai_content(topic, prefetched)
+            attrs['source'] = article['source']
+        count('generate.pubmed' if article['source'] == "PubMed Comprehensive Analysis" else 'generate.fallback')
+        count('generate.words', article['word_count'])
+        return article
+    
+    def _generate_ai_content(self, topic, prefetched):
         # تبدیل موضوع به انگلیسی
-        english_topic = topic_translations.get(topic, topic)
-        
-        # جستجو در PubMed
-        pubmed_bot = PubMedBot()
-        articles = pubmed_bot.search_meta_analysis(english_topic)
+        english_topic = self.translate_topic(topic)
+        
+        # جستجو در PubMed (یا استفاده از نتایج جستجوی دسته‌ای)
+        # PubMedBot فقط در صورت نیاز ساخته می‌شود تا workerهای نگارش سبک بمانند
+        pubmed_bot = None
+        if english_topic is None:
+            print("   ⚠️ موضوع در فهرست موضوعات (topics.json) نیست - جستجوی PubMed انجام نمی‌شود")
+            articles = None
+        elif prefetched is not None and english_topic in prefetched:
+            articles = prefetched[english_topic]
+        else:
+            pubmed_bot = PubMedBot()
+            articles = pubmed_bot.search_meta_analysis(english_topic)
         
         if articles:
             # تولید مقاله کامل ۱۰۰۰ کلمه‌ای
-            content = pubmed_bot.generate_comprehensive_article(topic, articles)
+            content = (pubmed_bot or PubMedBot(cache=False, local_db=False)).generate_comprehensive_article(topic, articles)
             quality_score = 10  # کیفیت عالی
             source = "PubMed Comprehensive Analysis"
             word_count = len(content.split())
@@ -144,255 +140,38 @@ class AutoMedicalContentBot:
         }
     
     def generate_detailed_fallback_content(self, topic):
-        """تولید محتوای مفصل ۱۰۰۰+ کلمه‌ای وقتی PubMed جواب نده"""
-        
-        # ساختار مقاله کامل
-        article_parts = []
-        
-        # ۱. مقدمه (۲۵۰-۳۰۰ کلمه)
-        introduction = self._generate_detailed_introduction(topic)
-        article_parts.append(("مقدمه", introduction))
-        
-        # ۲. روش‌های بررسی (۳۰۰-۳۵۰ کلمه)
-        methodology = self._generate_detailed_methodology()
-        article_parts.append(("روش‌های بررسی", methodology))
-        
-        # ۳. نتایج (۳۰۰-۳۵۰ کلمه)
-        results = self._generate_detailed_results(topic)
-        article_parts.append(("نتایج", results))
-        
-        # ۴. بحث و نتیجه‌گیری (۲۵۰-۳۰۰ کلمه)
-        discussion = self._generate_detailed_discussion(topic)
-        article_parts.append(("بحث و نتیجه‌گیری", discussion))
-        
-        # ترکیب بخش‌ها
-        full_article = ""
-        for section, content in article_parts:
-            full_article += f"## {section}\n\n{content}\n\n"
-        
-        # اضافه کردن منابع
-        references = self._generate_detailed_references()
-        full_article += f"## منابع\n\n{references}"
-        
-        return full_article
-    
-    def _generate_detailed_introduction(self, topic):
-        """تولید مقدمه مفصل"""
-        intro_templates = [
-            f"{topic} یکی از چالش‌های مهم در حوزه سلامت جهانی محسوب می‌شود که در دهه‌های اخیر توجه بسیاری از پژوهشگران و متخصصان مراقبت‌های سلامت را به خود جلب کرده است. ",
-            f"در عصر حاضر، {topic} به عنوان یک مسئله بهداشتی با اولویت بالا در سراسر جهان شناخته می‌شود که پیامدهای گسترده‌ای برای سیستم‌های سلامت و اقتصاد ملی دارد. ",
-            f"با توجه به افزایش شیوع و بروز {topic} در جمعیت‌های مختلف، درک عمیق‌تر این پدیده و یافتن راهکارهای مؤثر برای مدیریت آن از اهمیت حیاتی برخوردار است. "
-        ]
-        
-        introduction = random.choice(intro_templates)
-        
-        # بسط بیشتر مقدمه
-        intro_expansions = [
-            f"مطالعات اپیدمیولوژیک نشان می‌دهند که شیوع {topic.split()[0]} در دو دهه گذشته روند صعودی چشمگیری داشته و این روند همچنان ادامه دارد. ",
-            f"تخمین زده می‌شود که بیش از ۱۵۰ میلیون نفر در سراسر جهان با چالش‌های مرتبط با {topic.split()[0]} دست و پنجه نرم می‌کنند. ",
-            f"هزینه‌های مستقیم و غیرمستقیم ناشی از {topic.split()[0]} سالانه به صدها میلیارد دلار می‌رسد که بار اقتصادی سنگینی بر سیستم‌های سلامت تحمیل می‌کند. "
-        ]
-        
-        introduction += "".join(random.sample(intro_expansions, 2))
-        
-        # هدف مطالعه
-        study_goals = [
-            f"این مقاله مروری جامع با هدف بررسی عمیق جنبه‌های مختلف {topic} و ارائه تحلیل دقیقی از جدیدترین شواهد علمی تهیه شده است. ",
-            f"هدف اصلی از تدوین این مرور سیستماتیک، ارائه دیدگاهی همه‌جانبه در مورد {topic} و معرفی راهکارهای مبتنی بر شواهد برای مدیریت مؤثر آن می‌باشد. ",
-            f"این مطالعه با اتکا به متدولوژی علمی دقیق، به تحلیل جامع مطالعات منتشر شده در زمینه {topic} و استخراج یافته‌های کلیدی می‌پردازد. "
-        ]
-        
-        introduction += random.choice(study_goals)
-        
-        # ساختار مقاله
-        structure = "مقاله حاضر در چهار بخش اصلی سازماندهی شده است: بخش مقدمه به بیان مسئله و اهمیت موضوع می‌پردازد، بخش روش‌شناسی رویکردهای تحلیلی را تشریح می‌کند، بخش نتایج یافته‌های کلیدی را ارائه می‌دهد، و در نهایت بخش بحث و نتیجه‌گیری به تفسیر نتایج و ارائه راهکارها اختصاص یافته است."
-        
-        introduction += " " + structure
-        
-        return introduction
-    
-    def _generate_detailed_methodology(self):
-        """تولید بخش روش‌شناسی مفصل"""
-        methodology = "در این مطالعه از روش‌شناسی مرور سیستماتیک و متا-آنالیز با رعایت اصول استاندارد گزارش‌دهی (PRISMA) استفاده شده است. "
-        
-        # استراتژی جستجو
-        search_strategy = [
-            "جستجوی جامع در پایگاه‌های داده علمی معتبر شامل PubMed, Scopus, Web of Science و Cochrane Library با استفاده از کلیدواژه‌های مرتبط و عملگرهای بولی انجام شد. ",
-            "استراتژی جستجو توسط دو پژوهشگر مستقل طراحی و اجرا گردید و اختلاف نظرها از طریق بحث و تبادل نظر با پژوهشگر سوم حل و فصل شد. ",
-            "محدوده زمانی جستجو از سال ۲۰۱۰ تا ۲۰۲۴ در نظر گرفته شد تا جدیدترین شواهد علمی در تحلیل گنجانده شوند. "
-        ]
-        
-        methodology += "".join(random.sample(search_strategy, 2))
-        
-        # معیارهای ورود و خروج
-        criteria = [
-            "معیارهای ورود شامل مطالعات کارآزمایی بالینی تصادفی‌شده، مطالعات کوهورت آینده‌نگر، مطالعات مورد-شاهدی و متا-آنالیزهای منتشر شده در مجلات معتبر بود. ",
-            "مطالعات با حجم نمونه کمتر از ۵۰ شرکت‌کننده، مقالات بدون متن کامل و مطالعات با کیفیت روش‌شناسی پایین از تحلیل نهایی حذف شدند. ",
-            "فرآیند غربالگری مطالعات در دو مرحله بررسی عنوان و چکیده و سپس ارزیابی متن کامل توسط دو ارزیاب مستقل انجام پذیرفت. "
-        ]
-        
-        methodology += "".join(random.sample(criteria, 2))
-        
-        # استخراج داده‌ها
-        data_extraction = [
-            "فرآیند استخراج داده‌ها با استفاده از فرم استاندارد شامل اطلاعات دموگرافیک، ویژگی‌های مداخله، outcomes اولیه و ثانویه، و یافته‌های آماری انجام شد. ",
-            "کیفیت روش‌شناسی مطالعات با ابزارهای استاندارد مانند Risk of Bias tool برای کارآزمایی‌های بالینی و Newcastle-Ottawa Scale برای مطالعات مشاهده‌ای ارزیابی گردید. ",
-            "آنالیزهای آماری با نرم‌افزارهای تخصصی متا-آنالیز (RevMan, Stata) و با استفاده از مدل‌های اثرات تصادفی انجام پذیرفت. "
-        ]
-        
-        methodology += "".join(random.sample(data_extraction, 2))
-        
-        # ارزیابی کیفیت
-        quality_assessment = [
-            "همگونی بین مطالعات با آماره I² و آزمون کای-دو ارزیابی شد و در صورت وجود ناهمگونی معنادار، آنالیزهای زیرگروه و رگرسیون متا انجام گرفت. ",
-            "سوگرایی انتشار با نمودار قیفی و آزمون‌های آماری رسمی بررسی شد و در صورت لزوم از مدل‌های آماری اصلاحی استفاده گردید. ",
-            "تمامی مراحل آنالیز با در نظر گرفتن اصول اخلاق پژوهش و با تأیید کمیته اخلاق دانشگاه انجام شده است. "
-        ]
-        
-        methodology += random.choice(quality_assessment)
-        
-        return methodology
-    
-    def _generate_detailed_results(self, topic):
-        """تولید بخش نتایج مفصل"""
-        results = "نتایج حاصل از تجمیع و تحلیل داده‌های مطالعات واجد شرایط نشان داد که "
-        
-        # یافته‌های اصلی
-        main_findings = [
-            f"مداخلات و راهکارهای مورد بررسی در زمینه {topic} تأثیرات بالینی معنادار و قابل توجهی بر بهبود شاخص‌های سلامت داشته‌اند. ",
-            f"رویکردهای نوین در مدیریت {topic} در مقایسه با روش‌های مرسوم، outcomes بالینی بهتری را به همراه داشته‌اند. ",
-            f"شواهد قوی و مستدلی از اثربخشی استراتژی‌های مختلف در مواجهه با چالش‌های {topic} به دست آمده است. "
-        ]
-        
-        results += random.choice(main_findings)
-        
-        # آمارهای کمی
-        quantitative_stats = [
-            f"میانگین کاهش در شاخص اصلی برابر با {random.randint(18, 42)}٪ (۹۵٪ فاصله اطمینان: {random.randint(15, 25)}-{random.randint(45, 55)}٪) گزارش شد. ",
-            f"نسبت شانس (Odds Ratio) بهبود بالینی معادل {random.uniform(1.8, 3.2):.1f} (۹۵٪ فاصله اطمینان: {random.uniform(1.3, 1.8):.1f}-{random.uniform(3.5, 4.5):.1f}) به دست آمد. ",
-            f"تفاوت میانگین استانداردشده (Standardized Mean Difference) برابر با {random.uniform(0.45, 1.15):.2f} (۹۵٪ فاصله اطمینان: {random.uniform(0.25, 0.4):.2f}-{random.uniform(1.2, 1.5):.2f}) محاسبه شد. "
-        ]
-        
-        results += "".join(random.sample(quantitative_stats, 2))
-        
-        # آنالیزهای زیرگروه
-        subgroup_analyses = [
-            f"در آنالیزهای زیرگroup بر اساس سن، جنسیت و شدت بیماری، تفاوت‌های معناداری در پاسخ به مداخلات مشاهده گردید. ",
-            f"اثربخشی مداخلات در جمعیت‌های خاص از جمله سالمندان و افراد با بیماری‌های همراه به طور قابل توجهی بالاتر بود. ",
-            f"عوامل تعدیل‌کننده‌ای مانند مدت بیماری، شاخص توده بدنی و سطح فعالیت فیزیکی بر outcomes نهایی تأثیرگذار بودند. "
-        ]
-        
-        results += random.choice(subgroup_analyses)
-        
-        # نتایج ثانویه
-        secondary_outcomes = [
-            f"در زمینه outcomes ثانویه شامل کیفیت زندگی، رضایت بیمار و هزینه-اثربخشی، نتایج مثبت و امیدوارکننده‌ای ثبت شده است. ",
-            f"پیگیری‌های بلندمدت نشان داد که اثرات مداخلات تا {random.randint(6, 24)} ماه پس از اتمام دوره درمان پایدار مانده‌اند. ",
-            f"هیچ عارضه جانبی جدی یا رویداد نامطلوب شدیدی در ارتباط با مداخلات گزارش نشده است. "
-        ]
-        
-        results += "".join(random.sample(secondary_outcomes, 2))
-        
-        # ارزیابی کیفیت شواهد
-        evidence_quality = [
-            "ارزیابی کیفیت شواهد با استفاده از سیستم GRADE نشان داد که سطح کلی شواهد برای outcomes اولیه در حد متوسط تا بالا قرار دارد. ",
-            "حساسیت آنالیزها با حذف مطالعات با ریسک سوگرایی بالا، نتایج اصلی را تأیید کرد و از استحکام یافته‌ها حمایت نمود. ",
-            "هیچ ناهمگونی معناداری بین مطالعات از نظر geographical distribution یا methodological characteristics مشاهده نشد. "
-        ]
-        
-        results += random.choice(evidence_quality)
-        
-        return results
+        """تولید محتوای مفصل ۱۰۰۰+ کلمه‌ای وقتی PubMed جواب نده (از بانک قالب‌های کامپایل‌شده)"""
+        return DEFAULT_BANK.render(topic)
     
-    def _generate_detailed_discussion(self, topic):
-        """تولید بخش بحث و نتیجه‌گیری مفصل"""
-        discussion = "یافته‌های این مرور سیستماتیک و متا-آنالیز حاکی از آن است که "
-        
-        # تفسیر اصلی
-        main_interpretation = [
-            f"رویکردهای جامع و چندوجهی در مدیریت {topic} می‌توانند outcomes بالینی را به طور معنادار و پایدار بهبود بخشند. ",
-            f"شواهد قانع‌کننده‌ای از اثربخشی مداخلات ساختاریافته و مبتنی بر شواهد در زمینه {topic} وجود دارد. ",
-            f"استراتژی‌های شخصی‌سازی شده با توجه به ویژگی‌های فردی بیماران می‌توانند نتایج بهتری در مدیریت {topic} به همراه داشته باشند. "
-        ]
-        
-        discussion += random.choice(main_interpretation)
-        
-        # مقایسه با مطالعات قبلی
-        comparison = [
-            "این یافته‌ها با نتایج متا-آنالیزهای قبلی همسو هستند اما از طریق inclusion مطالعات جدیدتر و با کیفیت روش‌شناسی بالاتر، شواهد قوی‌تری ارائه می‌دهند. ",
-            "برخی تفاوت‌ها با مطالعات گذشته ممکن است ناشی از تفاوت در معیارهای ورود، روش‌های آنالیز آماری یا ویژگی‌های جمعیت‌های مورد مطالعه باشد. ",
-            "مطالعه حاضر از طریق آنالیزهای حساسیت گسترده و ارزیابی دقیق کیفیت شواهد، اعتبار و قابلیت تعمیم‌پذیری یافته‌ها را افزایش داده است. "
-        ]
-        
-        discussion += random.choice(comparison)
-        
-        # مکانیسم‌های عمل
-        mechanisms = [
-            "مکانیسم‌های احتمالی تأثیر مداخلات ممکن است شامل بهبود پارامترهای متابولیک، تعدیل پاسخ‌های التهابی و تنظیم مسیرهای سیگنالینگ سلولی باشد. ",
-            "تغییرات سبک زندگی از طریق تأثیر بر فاکتورهای خطر قابل اصلاح و ارتقای سلامت عمومی می‌توانند outcomes را بهبود بخشند. ",
-            "رویکردهای چندوجهی احتمالاً از طریق اثرات سینرژیستیک بر سیستم‌های مختلف بدن عمل می‌کنند. "
-        ]
-        
-        discussion += random.choice(mechanisms)
-        
-        # محدودیت‌ها
-        limitations = [
-            "از محدودیت‌های این مطالعه می‌توان به ناهمگونی در روش‌های اندازه‌گیری outcomes، تفاوت در پروتکل‌های مداخله و تنوع در دوره‌های پیگیری اشاره کرد. ",
-            "تعداد محدود مطالعات در برخی زیرگروه‌های خاص و عدم دسترسی به داده‌های خام مطالعات از دیگر محدودیت‌های این تحلیل محسوب می‌شوند. ",
-            "احتمال سوگرایی انتشار در برخی outcomes نمی‌تواند به طور کامل رد شود، اگرچه از روش‌های آماری برای بررسی آن استفاده شد. "
-        ]
-        
-        discussion += "".join(random.sample(limitations, 2))
-        
-        # کاربردهای بالینی
-        clinical_applications = [
-            f"این یافته‌ها می‌توانند در تدوین راهنماهای بالینی ملی و بین‌المللی برای مدیریت {topic} مورد استفاده قرار گیرند. ",
-            "پزشکان و ارائه‌دهندگان مراقبت‌های سلامت می‌توانند از این شواهد برای تصمیم‌گیری‌های درمانی مبتنی بر شواهد و شخصی‌سازی مراقبت‌ها بهره ببرند. ",
-            "سیستم‌های سلامت می‌توانند با به کارگیری یافته‌های این مطالعه، برنامه‌ریزی بهتری برای تخصیص منابع و طراحی خدمات بهداشتی داشته باشند. "
-        ]
-        
-        discussion += "".join(random.sample(clinical_applications, 2))
-        
-        # توصیه‌ها برای تحقیقات آینده
-        future_research = [
-            "انجام کارآزمایی‌های بالینی با طراحی robust و دوره‌های پیگیری طولانی‌تر برای تأیید یافته‌های حاضر ضروری به نظر می‌رسد. ",
-            "مطالعات future می‌توانند بر شناسایی عوامل پیش‌بینیکننده پاسخ به درمان و توسعه مدل‌های پیش‌آگهی متمرکز شوند. ",
-            "بررسی cost-effectiveness مداخلات در settings مختلف و در جمعیت‌های متنوع از اولویت‌های تحقیقاتی آینده است. "
-        ]
-        
-        discussion += random.choice(future_research)
-        
-        # نتیجه‌گیری نهایی
-        final_conclusion = [
-            f"در جمع‌بندی نهایی، این مرور سیستماتیک و متا-آنالیز شواهد معتبر و قانع‌کننده‌ای را در حمایت از اثربخشی مداخلات مورد بررسی در زمینه {topic} ارائه می‌دهد. ",
-            f"به طور خلاصه، یافته‌های این مطالعه بر اهمیت اتخاذ رویکردی جامع، مبتنی بر شواهد و شخصی‌سازی شده در مدیریت {topic} تأکید می‌کنند. ",
-            f"در پایان، می‌توان نتیجه گرفت که استراتژی‌های مورد بررسی در این تحلیل می‌توانند به عنوان بخشی از برنامه جامع مراقبت‌های سلامت برای افراد مبتلا به {topic.split()[0]} مورد استفاده قرار گیرند. "
-        ]
-        
-        discussion += random.choice(final_conclusion)
-        
-        return discussion
+    def generate_fallback_batch(self, topics):
+        """تولید دسته‌ای محتوای جایگزین برای چند موضوع در یک فراخوانی"""
+        return DEFAULT_BANK.render_many(topics)
     
-    def _generate_detailed_references(self):
-        """تولید بخش منابع"""
-        references = "## منابع\n\n"
-        references += "۱. Smith J, et al. Global burden of disease study 2023. Lancet. 2023;401(10387):P1234-1245.\n\n"
-        references += "۲. Johnson M, et al. Clinical practice guidelines for management. JAMA. 2024;331(15):P1345-1356.\n\n"
-        references += "۳. Brown K, et al. Meta-analysis of randomized controlled trials. NEJM. 2023;388(22):P2056-2067.\n\n"
-        references += "۴. Wilson R, et al. Systematic review of observational studies. BMJ. 2024;384:e075432.\n\n"
-        references += "۵. Davis S, et al. Cost-effectiveness analysis in healthcare. Health Econ. 2023;32(4):P789-801.\n\n"
-        references += "۶. Anderson L, et al. Patient-reported outcomes and quality of life. Qual Life Res. 2024;33(2):P345-356.\n\n"
-        references += "۷. Thompson P, et al. Long-term follow-up studies. Circulation. 2023;147(18):P1423-1435.\n\n"
-        references += "۸. Martinez G, et al. Novel therapeutic approaches. Nat Med. 2024;30(3):P456-468.\n\n"
-        
-        return references
+    def ensure_unique(self, article, db, max_attempts=3):
+        """بازتولید محتوای جایگزین تا وقتی تقریباً تکراری آرشیو نباشد
+        
+        مقالات مبتنی بر PubMed بازتولید نمی‌شوند و در save_articles فقط علامت‌گذاری می‌شوند.
+        ردیف امروز با همین عنوان (که upsert آن را بازنویسی می‌کند) تکراری حساب نمی‌شود.
+        """
+        existing_id = db.article_id(article['title'])
+        for attempt in range(1, max_attempts + 1):
+            matches = db.find_near_duplicates(article['content'], limit=1, exclude=existing_id)
+            if not matches:
+                return article
+            if article['source'] != "AI Detailed Generated":
+                break
+            print(f"   ♻️ '{article['title']}' مشابه مقاله {matches[0]['id']} است "
+                  f"(شباهت {matches[0]['similarity']:.2f}) - بازتولید {attempt}/{max_attempts}")
+            rng = random.Random(topic_seed(self.seed, f"{article['title']}#{attempt}"))
+            article['content'] = DEFAULT_BANK.render(article['title'], rng)
+            article['word_count'] = len(article['content'].split())
+            article['reading_time'] = f"{max(5, article['word_count'] // 150)} دقیقه"
+        return article
     
     def detect_category(self, topic):
         """تشخیص دسته‌بندی موضوع"""
-        for category, topics in self.AUTO_TOPICS.items():
-            if topic in topics:
-                return category
-        return "عمومی"
+        entry = self.registry.lookup(topic)
+        return entry['category'] if entry else "عمومی"
     
     def auto_generate_daily_content(self):
         """تولید محتوای روزانه - مقالات ۱۰۰۰+ کلمه‌ای"""
@@ -402,26 +181,117 @@ class AutoMedicalContentBot:
         # انتخاب موضوعات روز
         daily_topics = self.select_daily_topics()
         
+        # جستجوی دسته‌ای همه موضوعات در PubMed با چند درخواست
+        queries = [self.translate_topic(topic) for topic in daily_topics]
+        prefetched = PubMedBot().search_many([query for query in queries if query])
+        
         # تولید محتوا برای هر موضوع
         articles = []
         for i, topic in enumerate(daily_topics, 1):
             print(f"📝 در حال تولید مقاله {i}/{len(daily_topics)}: {topic}")
             
-            article = self.generate_ai_content(topic)
+            random.seed(topic_seed(self.seed, topic))
+            article = self.generate_ai_content(topic, prefetched)
             articles.append(article)
             
-            # تأخیر بیشتر برای مقالات مفصل
-            time.sleep(8)
-            
             source_icon = "🔬" if article['source'] == 'PubMed Comprehensive Analysis' else "🤖"
             print(f"   ✅ تولید شد: {source_icon} {article['title']} ({article['word_count']} کلمه - کیفیت: {article['quality_score']}/10)")
         
         return articles
     
-    def save_daily_report(self, articles):
-        """ذخیره گزارش روزانه"""
+    def compose_pool_size(self, topic_count):
+        """تعداد پروسه‌های نگارش برای topic_count موضوع - ۱ یعنی نگارش در همین پروسه
+        
+        راه‌اندازی هر پروسه spawn (import دوباره ماژول‌ها) از نگارش چند مقاله گران‌تر است، پس دسته‌های
+        کوچک (مثلاً ۳ موضوع پیش‌فرض روزانه روی runner دو هسته‌ای) در همین پروسه نوشته می‌شوند.
+        """
+        if self.compose_workers > 1 and topic_count >= self.process_min_topics_per_worker * self.compose_workers:
+            return self.compose_workers
+        return 1
+    
+    def run_daily_pipeline(self, db, website, topics=None, queue_size=4):
+        """تولید روزانه به صورت pipeline: دریافت ← نگارش ← ذخیره ← انتشار
+        
+        دریافت از PubMed (محدود به شبکه) در threadها و به صورت دسته‌ای انجام می‌شود و
+        نگارش (محدود به CPU) در صورت وجود چند هسته در ProcessPoolExecutor.
+        هر مقاله با seed ثابت خودش نوشته می‌شود، پس خروجی به ترتیب اجرا وابسته نیست.
+        خروجی: (مقالات به ترتیب موضوعات، گزارش زمان، عمق صف و توان عملیاتی)
+        """
+        print("🚀 شروع تولید خودکار محتوای روزانه (pipeline)")
+        print(f"🕒 زمان شروع: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        topics = topics or self.select_daily_topics()
+        pubmed_bot = PubMedBot()
+        
+        # ورودی pipeline دسته‌های موضوع است تا هر دسته با یک جستجوی دسته‌ای دریافت شود
+        indexed = list(enumerate(topics))
+        batches = [indexed[i:i + self.fetch_batch_size] for i in range(0, len(indexed), self.fetch_batch_size)]
+        
+        def fetch(batch):
+            queries = [self.translate_topic(topic) for _, topic in batch]
+            prefetched = pubmed_bot.search_many([query for query in queries if query])
+            for (index, topic), english_topic in zip(batch, queries):
+                yield index, topic, {english_topic: prefetched.get(english_topic) or []} if english_topic else {}
+        
+        executor = None
+        compose_workers = self.compose_pool_size(len(topics))
+        if compose_workers > 1:
+            # spawn: workerها از وضعیت threadهای پروسه اصلی (قفل‌ها، اتصال‌ها) ارث نمی‌برند
+            executor = ProcessPoolExecutor(max_workers=compose_workers,
+                                           mp_context=multiprocessing.get_context('spawn'))
+        
+        def compose(item):
+            index, topic, prefetched = item
+            seed = topic_seed(self.seed, topic)
+            if executor is not None:
+                return index, executor.submit(compose_article, topic, prefetched, seed).result()
+            # در حالت تک‌پروسه random سراسری بین threadها مشترک است
+            with self._compose_lock:
+                random.seed(seed)
+                return index, self.generate_ai_content(topic, prefetched)
+        
+        def persist(item):
+            self.ensure_unique(item[1], db)
+            db.save_articles([item[1]])
+            return item
+        
+        def publish(item):
+            # مقاله در همان تراکنش ذخیره وارد صف انتشار شده است
+            website.drain_outbox(db, max_batches=1)
+            return item
+        
+        pipeline = Pipeline([
+            Stage('fetch', fetch, workers=self.fetch_workers, fan_out=True),
+            Stage('compose', compose, workers=compose_workers),
+            Stage('persist', persist),
+            Stage('publish', publish),
+        ], queue_size=max(queue_size, compose_workers * 2))
+        try:
+            results = pipeline.run(batches)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        report = pipeline.print_report()
+        
+        wall = report['wall_seconds']
+        report['throughput'] = {
+            'topics': len(topics),
+            'articles': len(results),
+            'fetch_workers': self.fetch_workers,
+            'compose_workers': compose_workers,
+            'compose_mode': 'process' if executor is not None else 'thread',
+            'articles_per_minute': len(results) / wall * 60 if wall else 0.0
+        }
+        print(f"⚡ توان عملیاتی: {len(results)} مقاله در {wall:.1f} ثانیه "
+              f"({report['throughput']['articles_per_minute']:.1f} مقاله در دقیقه، "
+              f"{compose_workers} worker نگارش)")
+        
+        articles = [article for _, article in sorted(results, key=lambda item: item[0])]
+        return articles, report
+    
+    def save_daily_report(self, articles, pipeline_report=None):
+        """ذخیره گزارش روزانه (به همراه زمان‌بندی مراحل pipeline در صورت وجود)"""
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"auto_articles_{timestamp}.json"
+        filename = f"auto_articles_{timestamp}.json.gz"
         
         report = {
             "meta": {
@@ -434,9 +304,12 @@ class AutoMedicalContentBot:
             },
             "articles": articles
         }
+        if pipeline_report:
+            report["pipeline"] = pipeline_report
         
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(report, f, ensure_ascii=False, indent=2)
+        # بدون تورفتگی و با gzip: متن کامل مقالات در artifact چند برابر کوچک‌تر می‌شود
+        with gzip.open(filename, 'wt', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, separators=(',', ':'))
         
         return filename
     
@@ -464,39 +337,21 @@ class AutoMedicalContentBot:
             print(f"   {i}. {source_icon} {article['title']}")
             print(f"      📊 {article['word_count']} کلمه | ⭐ {article['quality_score']}/10 | ⏱️ {article['reading_time']}")
 
-def main():
+def run_daily():
+    """اجرای کامل روزانه - خروجی: دیتابیس استفاده‌شده"""
     print("="*80)
     print("🤖 ربات تولید خودکار محتوای پزشکی - نسخه مقالات جامع ۱۰۰۰+ کلمه‌ای")
     print("="*80)
     
     # ایجاد ربات
     bot = AutoMedicalContentBot()
+    db = MedicalDatabase()
+    website = WebsiteAutoPoster()
     
-    # تولید خودکار محتوای روزانه
-    articles = bot.auto_generate_daily_content()
+    # تولید، ذخیره و انتشار همزمان مقالات (هر مقاله به محض آماده شدن ذخیره و ارسال می‌شود)
+    articles, pipeline_report = bot.run_daily_pipeline(db, website)
     
     if articles:
-        # 💾 ذخیره در دیتابیس
-        print("\n💾 در حال ذخیره در دیتابیس...")
-        try:
-            db = MedicalDatabase()
-            db.save_articles(articles)
-            print("✅ مقالات با موفقیت در دیتابیس ذخیره شد")
-        except Exception as e:
-            print(f"❌ خطا در ذخیره دیتابیس: {e}")
-        
-        # 🌐 ارسال به وبسایت
-        print("\n🌐 در حال ارسال به وبسایت...")
-        try:
-            website = WebsiteAutoPoster()
-            website_results = website.post_multiple_articles(articles)
-            
-            # نمایش نتایج ارسال
-            success_count = sum(1 for r in website_results if r['success'])
-            print(f"✅ {success_count}/{len(articles)} مقاله به وبسایت ارسال شد")
-        except Exception as e:
-            print(f"❌ خطا در ارسال به وبسایت: {e}")
-        
         # 📊 تولید داشبورد
         print("\n📊 در حال تولید داشبورد...")
         try:
@@ -507,6 +362,13 @@ def main():
         except Exception as e:
             print(f"❌ خطا در تولید داشبورد: {e}")
         
+        # 🗂️ به‌روزرسانی افزایشی صفحات سایت (فقط صفحات تغییر کرده)
+        try:
+            from site_builder import StaticSiteBuilder
+            StaticSiteBuilder().build()
+        except Exception as e:
+            print(f"❌ خطا در ساخت سایت ایستا: {e}")
+        
         # 📈 تولید گزارش هفتگی
         print("\n📈 در حال تولید گزارش‌های آنالیز...")
         try:
@@ -518,7 +380,7 @@ def main():
             print(f"❌ خطا در تولید گزارش‌های آنالیز: {e}")
         
         # 📄 ذخیره گزارش روزانه
-        filename = bot.save_daily_report(articles)
+        filename = bot.save_daily_report(articles, pipeline_report)
         
         # 📋 نمایش خلاصه
         bot.show_daily_summary(articles)
@@ -537,6 +399,24 @@ def main():
             print(f"   بخشی از محتوا: {sample_article['content'][:200]}...")
     else:
         print("❌ هیچ مقاله‌ای تولید نشد!")
+    return db
+
+def main():
+    """اجرای روزانه با تله‌متری: جدول خلاصه و ذخیره معیارها در دیتابیس
+    
+    خطوط JSON فقط وقتی نوشته می‌شوند که مسیر فایل در TELEMETRY_LOG تعیین شده باشد.
+    
+    با BOT_QUIET=1 پیام‌های کنسول خاموش می‌شوند و فقط جدول خلاصه چاپ می‌شود.
+    """
+    run = telemetry.start_run()
+    with telemetry.quiet(telemetry.quiet_enabled()):
+        db = run_daily()
+    summary = run.print_summary()
+    run.close()
+    try:
+        db.save_run_metrics(summary)
+    except Exception as e:
+        print(f"❌ خطا در ذخیره معیارهای اجرا: {e}")
 
 if __name__ == "__main__":
     main()
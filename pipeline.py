@@ -0,0 +1,152 @@
+import queue
+import threading
+import time
+from telemetry import observe
+
+# نشانه پایان جریان بین مراحل
+_DONE = object()
+
+class Stage:
+    """یک مرحله از pipeline: تابعی که هر ورودی را به یک خروجی تبدیل می‌کند
+
+    خروجی None یعنی این مورد به مرحله بعد نمی‌رود. خطای یک مورد فقط همان مورد را حذف می‌کند.
+    """
+
+    def __init__(self, name, func, workers=1, fan_out=False):
+        self.name = name
+        self.func = func
+        self.workers = workers
+        # با fan_out=True خروجی تابع یک iterable است و هر عضو آن جدا به مرحله بعد می‌رود
+        self.fan_out = fan_out
+        self.lock = threading.Lock()
+        self.items = 0
+        self.errors = 0
+        self.dropped = 0
+        self.busy = 0.0
+        self.max_latency = 0.0
+        self.queue_samples = 0
+        self.queue_total = 0
+        self.queue_max = 0
+
+    def record(self, latency, outcome, depth):
+        with self.lock:
+            self.items += 1
+            self.busy += latency
+            self.max_latency = max(self.max_latency, latency)
+            if outcome == 'error':
+                self.errors += 1
+            elif outcome == 'dropped':
+                self.dropped += 1
+            # عمق صف ورودی همین مرحله هنگام برداشتن هر مورد
+            self.queue_samples += 1
+            self.queue_total += depth
+            self.queue_max = max(self.queue_max, depth)
+
+    def report(self):
+        return {
+            'stage': self.name,
+            'workers': self.workers,
+            'items': self.items,
+            'errors': self.errors,
+            'dropped': self.dropped,
+            'avg_ms': self.busy / self.items * 1000 if self.items else 0.0,
+            'max_ms': self.max_latency * 1000,
+            'busy_seconds': self.busy,
+            'avg_queue': self.queue_total / self.queue_samples if self.queue_samples else 0.0,
+            'max_queue': self.queue_max
+        }
+
+class Pipeline:
+    """pipeline چندمرحله‌ای با صف‌های محدود بین مراحل
+
+    هر مرحله threadهای خودش را دارد و به محض آماده شدن هر مورد آن را به مرحله
+    بعد می‌دهد، پس زمان کل به کندترین مرحله نزدیک است نه به مجموع مراحل.
+    صف‌های محدود (queue_size) جلوی جلو افتادن بیش از حد مراحل سریع را می‌گیرند.
+    """
+
+    def __init__(self, stages, queue_size=4):
+        self.stages = stages
+        self.queue_size = queue_size
+        self.wall_seconds = 0.0
+
+    def _worker(self, stage, inbox, outbox):
+        while True:
+            depth = inbox.qsize()
+            item = inbox.get()
+            if item is _DONE:
+                # نشانه پایان برای workerهای دیگر همین مرحله برگردانده می‌شود
+                inbox.put(_DONE)
+                return
+            start = time.perf_counter()
+            try:
+                result = stage.func(item)
+                if stage.fan_out and result is not None:
+                    result = list(result)
+                outcome = 'ok' if result is not None else 'dropped'
+            except Exception as e:
+                print(f"❌ خطا در مرحله {stage.name}: {e}")
+                result = None
+                outcome = 'error'
+            latency = time.perf_counter() - start
+            stage.record(latency, outcome, depth)
+            observe(f"stage.{stage.name}", latency, outcome == 'error')
+            if result is None:
+                continue
+            for output in (result if stage.fan_out else (result,)):
+                if output is not None:
+                    outbox.put(output)
+
+    def run(self, items):
+        """اجرای pipeline روی ورودی‌ها - خروجی: لیست خروجی‌های مرحله آخر"""
+        start = time.perf_counter()
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in self.stages]
+        results = queue.Queue()
+        outboxes = queues[1:] + [results]
+
+        groups = []
+        for stage, inbox, outbox in zip(self.stages, queues, outboxes):
+            threads = [
+                threading.Thread(target=self._worker, args=(stage, inbox, outbox), daemon=True)
+                for _ in range(stage.workers)
+            ]
+            for thread in threads:
+                thread.start()
+            groups.append(threads)
+
+        for item in items:
+            queues[0].put(item)
+        queues[0].put(_DONE)
+
+        # پایان هر مرحله = پایان ورودی مرحله بعد
+        for threads, outbox in zip(groups, outboxes):
+            for thread in threads:
+                thread.join()
+            outbox.put(_DONE)
+
+        self.wall_seconds = time.perf_counter() - start
+        output = []
+        while True:
+            item = results.get()
+            if item is _DONE:
+                return output
+            output.append(item)
+
+    def report(self):
+        """گزارش هر مرحله به همراه زمان کل اجرا"""
+        return {
+            'wall_seconds': self.wall_seconds,
+            'sum_of_stages_seconds': sum(stage.busy for stage in self.stages),
+            'stages': [stage.report() for stage in self.stages]
+        }
+
+    def print_report(self):
+        report = self.report()
+        print("\n⏱️ گزارش pipeline:")
+        print(f"{'مرحله':<10} {'worker':>6} {'تعداد':>6} {'خطا':>5} {'میانگین ms':>11} {'بیشینه ms':>10} "
+              f"{'مشغول s':>8} {'صف میانگین':>11} {'صف بیشینه':>10}")
+        for r in report['stages']:
+            print(f"{r['stage']:<10} {r['workers']:>6} {r['items']:>6} {r['errors']:>5} {r['avg_ms']:>11.1f} "
+                  f"{r['max_ms']:>10.1f} {r['busy_seconds']:>8.2f} {r['avg_queue']:>11.1f} {r['max_queue']:>10}")
+        print(f"🕒 زمان کل: {report['wall_seconds']:.2f} ثانیه "
+              f"(مجموع زمان مراحل: {report['sum_of_stages_seconds']:.2f} ثانیه)")
+        return report
@@ -4,18 +4,158 @@ from datetime import datetime
 import time
 import re
 import random
+import os
+import threading
 import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+from pubmed_cache import cache_from_env
+from article_synthesis import synthesize_article
+from pubmed_parser import iter_pubmed_articles
+from rate_limiter import TokenBucket
+from telemetry import count, span
+from topic_registry import get_registry
 
 class PubMedBot:
-    def __init__(self):
-        self.base_url = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/"
+    def __init__(self, cache=None, base_url=None, rate_limiter=None, max_workers=4, local_db=None, registry=None):
+        self.base_url = base_url or os.environ.get('PUBMED_BASE_URL', "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/")
         self.searches_today = 0
         self.max_searches_per_day = 100  # افزایش محدودیت
         self.email = "your-email@example.com"  # ضروری برای PubMed
-        self.api_key = None  # اگر داری اضافه کن
+        self.api_key = os.environ.get('NCBI_API_KEY')  # اگر داری اضافه کن
+        # اتصال‌های HTTP بین درخواست‌ها و threadها بازاستفاده می‌شوند
+        self.session = requests.Session()
+        self.rate_limiter = rate_limiter
+        self.max_workers = max_workers
+        self.max_retries = 3
+        self._counter_lock = threading.Lock()
+        # کش پاسخ‌ها روی دیسک (با cache=False یا PUBMED_CACHE=0 غیرفعال می‌شود)
+        if cache is None:
+            cache = cache_from_env()
+        self.cache = cache or None
+        self.efetch_batch_size = 200  # حداکثر مقاله در هر efetch دسته‌ای
+        # کوئری‌های شناخته‌شده با اصطلاحات MeSH گسترش داده می‌شوند
+        self.registry = registry or get_registry()
+        # دیتابیس محلی مقالات: همه مقالات دریافتی و وارد شده از baseline
+        # اختیاری است (local_db یا PUBMED_LOCAL_DB) تا PubMedBot() دیتابیس اصلی را باز و تغییر ندهد
+        if local_db is None:
+            local_db = os.environ.get('PUBMED_LOCAL_DB')
+        if local_db:
+            from database_handler import MedicalDatabase
+            self.local_store = MedicalDatabase(local_db)
+        else:
+            self.local_store = None
+        # نتایج محلی فقط وقتی جایگزین esearch می‌شوند که کافی و تازه باشند
+        self.local_min_hits = 3
+        self.local_max_age_days = 30
+    
+    def _fetch(self, endpoint, params, timeout, method='get', use_cache=True):
+        """ارسال درخواست به eutils با استفاده از کش - خروجی: (کد وضعیت، متن پاسخ)"""
+        # اضافه کردن API Key اگر موجود باشد
+        if self.api_key:
+            params['api_key'] = self.api_key
+        
+        cache = self.cache if use_cache else None
+        if cache is not None:
+            cached = cache.get(endpoint, params)
+            if cached is not None:
+                print(f"💾 پاسخ {endpoint} از کش خوانده شد")
+                count('pubmed.cache_hits')
+                return 200, cached
+            if cache.offline:
+                print(f"📴 حالت آفلاین - پاسخ {endpoint} در کش نیست")
+                return None, None
+        
+        url = f"{self.base_url}{endpoint}.fcgi"
+        with span('pubmed.http', endpoint=endpoint) as attrs:
+            for attempt in range(self.max_retries + 1):
+                # نرخ درخواست با سطل توکن مشترک کنترل می‌شود، نه با sleep ثابت
+                self._get_rate_limiter().acquire()
+                if method == 'post':
+                    # لیست‌های طولانی شناسه در بدنه درخواست ارسال می‌شوند
+                    response = self.session.post(url, data=params, timeout=timeout)
+                else:
+                    response = self.session.get(url, params=params, timeout=timeout)
+                count('pubmed.requests')
+                if response.status_code != 429 or attempt == self.max_retries:
+                    break
+                retry_after = response.headers.get('Retry-After', '')
+                delay = float(retry_after) if retry_after.isdigit() else 2 ** attempt
+                print(f"⏳ محدودیت نرخ PubMed (429) - تلاش مجدد پس از {delay} ثانیه")
+                count('pubmed.retries')
+                time.sleep(delay)
+            # متن پاسخ یک بار decode می‌شود (requests در هر دسترسی به text دوباره decode می‌کند)؛
+            # حجم از بایت‌های دریافتی خوانده می‌شود، نه با encode دوباره متن
+            body = response.text
+            count('pubmed.bytes', len(response.content))
+            attrs.update(status=response.status_code, attempts=attempt + 1)
+        
+        if endpoint == 'esearch':
+            with self._counter_lock:
+                self.searches_today += 1
         
+        if response.status_code == 200 and cache is not None:
+            cache.set(endpoint, params, body)
+        return response.status_code, body
+    
+    def _get_rate_limiter(self):
+        """سطل توکن مشترک: ۳ درخواست در ثانیه (۱۰ با api_key) طبق قوانین NCBI"""
+        if self.rate_limiter is not None:
+            return self.rate_limiter
+        return TokenBucket.shared(10 if self.api_key else 3)
+    
+    def _search_params(self, topic, retmax=5):
+        """پارامترهای جستجوی بهینه‌شده متا-آنالیز"""
+        return {
+            'db': 'pubmed',
+            'term': f'{self.registry.expand(topic)} AND (meta-analysis[pt] OR systematic review[pt])',
+            'retmax': retmax,  # افزایش تعداد نتایج
+            'retmode': 'json',
+            'sort': 'relevance',
+            'field': 'title,abstract',
+            'datetype': 'pdat',
+            'reldate': 3650,  # مقالات ۱۰ سال اخیر
+            'email': self.email
+        }
+        
+    def _store_articles(self, articles):
+        """ذخیره مقالات دریافتی از شبکه در ایندکس محلی برای جستجوهای بعدی"""
+        if self.local_store is None or not articles:
+            return
+        try:
+            self.local_store.save_pubmed_articles(articles, source_file='eutils')
+        except Exception as e:
+            print(f"⚠️ خطا در ذخیره مقالات در ایندکس محلی: {e}")
+    
+    def search_local(self, topic, limit=5):
+        """جستجوی آفلاین در ایندکس محلی (FTS5 با رتبه‌بندی BM25)"""
+        if self.local_store is None:
+            return None
+        articles = self.local_store.search_pubmed_articles(topic, limit=limit)
+        if articles:
+            print(f"🗄️ {len(articles)} مقاله از دیتابیس محلی PubMed پیدا شد")
+            return articles
+        return None
+    
+    def _local_is_fresh(self, articles):
+        """حداقل local_min_hits نتیجه که دست‌کم یکی در local_max_age_days روز اخیر ذخیره یا تازه شده باشد"""
+        if len(articles) < self.local_min_hits:
+            return False
+        ages = [article['age_days'] for article in articles if article.get('age_days') is not None]
+        return bool(ages) and min(ages) <= self.local_max_age_days
+    
     def search_meta_analysis(self, topic):
-        """جستجوی متا-آنالیز از PubMed - نسخه تصحیح شده"""
+        """جستجوی متا-آنالیز از PubMed - نسخه تصحیح شده
+
+        نتایج کافی و تازه دیتابیس محلی بدون شبکه برگردانده می‌شوند؛ در غیر این صورت esearch
+        اجرا می‌شود تا مرورهای جدیدتر هم دریافت شوند و نتایج محلی فقط در صورت شکست شبکه استفاده می‌شوند.
+        """
+        local_articles = self.search_local(topic)
+        if local_articles and self._local_is_fresh(local_articles):
+            return local_articles
+        return self._search_network(topic) or local_articles
+    
+    def _search_network(self, topic):
+        """جستجوی متا-آنالیز با esearch و دریافت جزئیات با efetch"""
         try:
             if self.searches_today >= self.max_searches_per_day:
                 print("⚠️ محدودیت استفاده روزانه از PubMed رسیده")
@@ -24,31 +164,17 @@ class PubMedBot:
             print(f"🔍 در حال جستجوی متا-آنالیز برای: {topic}")
             
             # جستجوی بهینه‌شده
-            search_url = f"{self.base_url}esearch.fcgi"
-            params = {
-                'db': 'pubmed',
-                'term': f'{topic} AND (meta-analysis[pt] OR systematic review[pt])',
-                'retmax': 5,  # افزایش تعداد نتایج
-                'retmode': 'json',
-                'sort': 'relevance',
-                'field': 'title,abstract',
-                'datetype': 'pdat',
-                'reldate': 3650,  # مقالات ۱۰ سال اخیر
-                'email': self.email
-            }
-            
-            # اضافه کردن API Key اگر موجود باشد
-            if self.api_key:
-                params['api_key'] = self.api_key
+            params = self._search_params(topic)
                 
             print(f"📡 در حال ارسال درخواست به PubMed...")
-            response = requests.get(search_url, params=params, timeout=30)
-            self.searches_today += 1
+            status_code, body = self._fetch('esearch', params, timeout=30)
+            if status_code is None:
+                return None
             
-            print(f"📊 وضعیت پاسخ: {response.status_code}")
+            print(f"📊 وضعیت پاسخ: {status_code}")
             
-            if response.status_code == 200:
-                data = response.json()
+            if status_code == 200:
+                data = json.loads(body)
                 article_ids = data.get('esearchresult', {}).get('idlist', [])
                 
                 print(f"🔍 تعداد مقالات یافت شده: {len(article_ids)}")
@@ -68,8 +194,8 @@ class PubMedBot:
                     return None
                     
             else:
-                print(f"❌ خطا در جستجوی PubMed: {response.status_code}")
-                print(f"📄 متن خطا: {response.text[:200]}")
+                print(f"❌ خطا در جستجوی PubMed: {status_code}")
+                print(f"📄 متن خطا: {body[:200]}")
                 return None
                 
         except requests.exceptions.Timeout:
@@ -82,37 +208,182 @@ class PubMedBot:
             print(f"❌ خطای ناشناخته: {e}")
             return None
     
+    def search_many(self, topics, retmax=5):
+        """جستجوی دسته‌ای چند موضوع با history server (WebEnv) - خروجی: {موضوع: مقالات}
+        
+        مانند search_meta_analysis فقط نتایج کافی و تازه دیتابیس محلی جای جستجوی شبکه را می‌گیرند؛
+        نتایج قدیمی یا کم فقط وقتی برگردانده می‌شوند که شبکه (یا کش آفلاین) مقاله‌ای نداشته باشد.
+        """
+        topics = list(topics)
+        local = {topic: self.search_local(topic, limit=retmax) for topic in topics}
+        results = {
+            topic: articles if articles and self._local_is_fresh(articles) else None
+            for topic, articles in local.items()
+        }
+        pending = [topic for topic in topics if not results[topic]]
+        if pending:
+            results.update(self._search_many_network(pending, retmax))
+        return {topic: articles or local[topic] for topic, articles in results.items()}
+    
+    def _search_many_network(self, topics, retmax):
+        """esearch همزمان موضوعات و دریافت دسته‌ای مقالات - خروجی: {موضوع: مقالات یا None}"""
+        results = {topic: None for topic in topics}
+        # در حالت آفلاین esearch و efetch فقط از کش خوانده می‌شوند
+        offline = self.cache is not None and self.cache.offline
+        
+        try:
+            pending = topics
+            print(f"🔍 جستجوی دسته‌ای {len(pending)} موضوع در PubMed...")
+            
+            # ۱. یک esearch برای هر موضوع به صورت همزمان (پاسخ‌ها کش می‌شوند)
+            allowed = max(0, self.max_searches_per_day - self.searches_today)
+            if allowed < len(pending):
+                print("⚠️ محدودیت استفاده روزانه از PubMed رسیده")
+            
+            def search_ids(topic):
+                status_code, body = self._fetch('esearch', self._search_params(topic, retmax), timeout=30)
+                if status_code is None:
+                    return None
+                if status_code != 200:
+                    print(f"❌ خطا در جستجوی '{topic}': {status_code}")
+                    return None
+                return json.loads(body).get('esearchresult', {}).get('idlist', [])
+            
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                id_lists = list(executor.map(search_ids, pending[:allowed]))
+            topic_ids = {
+                topic: ids for topic, ids in zip(pending[:allowed], id_lists) if ids is not None
+            }
+            
+            all_ids = list(dict.fromkeys(pmid for ids in topic_ids.values() for pmid in ids))
+            if not all_ids:
+                print("📭 هیچ مقاله‌ای برای موضوعات پیدا نشد")
+                return results
+            
+            # ۲. دسته‌های efetch قبلی از کش خوانده می‌شوند (کلید همان get_article_details)
+            batches = {
+                start: all_ids[start:start + self.efetch_batch_size]
+                for start in range(0, len(all_ids), self.efetch_batch_size)
+            }
+            bodies = {}
+            if self.cache is not None:
+                for start, batch in batches.items():
+                    body = self.cache.get('efetch', self._details_params(batch))
+                    if body is not None:
+                        count('pubmed.cache_hits')
+                        bodies[start] = body
+            missing = [start for start in batches if start not in bodies]
+            if missing and offline:
+                print(f"📴 حالت آفلاین - {len(missing)} دسته efetch در کش نیست")
+            elif missing:
+                # ۳. دسته‌های ناموجود با یک epost و efetch همزمان دریافت می‌شوند
+                bodies.update(self._fetch_batches(all_ids, {start: batches[start] for start in missing}))
+            
+            by_pmid = {}
+            for body in bodies.values():
+                for article in self.parse_complete_articles(body) or []:
+                    by_pmid[article['pmid']] = article
+            if missing and not offline:
+                self._store_articles(list(by_pmid.values()))
+            
+            # ۴. برگرداندن مقالات به موضوع مربوطه با حفظ ترتیب ارتباط
+            for topic, ids in topic_ids.items():
+                articles = [by_pmid[pmid] for pmid in ids if pmid in by_pmid]
+                results[topic] = articles or None
+            
+            found = sum(1 for articles in results.values() if articles)
+            print(f"✅ جستجوی دسته‌ای: {len(by_pmid)} مقاله برای {found}/{len(topics)} موضوع")
+            return results
+            
+        except requests.exceptions.Timeout:
+            print("❌ timeout در اتصال به PubMed")
+            return results
+        except requests.exceptions.ConnectionError:
+            print("❌ خطای اتصال به اینترنت")
+            return results
+        except Exception as e:
+            print(f"❌ خطای ناشناخته در جستجوی دسته‌ای: {e}")
+            return results
+    
+    def _fetch_batches(self, all_ids, batches):
+        """ثبت شناسه‌ها در history server با یک epost و دریافت دسته‌های خواسته‌شده با efetch همزمان
+        
+        batches: {retstart: شناسه‌های دسته} - خروجی: {retstart: XML}. هر پاسخ با کلید شناسه‌های
+        دسته کش می‌شود تا اجرای بعدی (و حالت آفلاین) بدون شبکه به مقالات برسد.
+        """
+        status_code, body = self._fetch('epost', {
+            'db': 'pubmed',
+            'id': ','.join(all_ids),
+            'email': self.email
+        }, timeout=30, method='post', use_cache=False)
+        if status_code != 200:
+            print(f"❌ خطا در ثبت شناسه‌ها در history server: {status_code}")
+            return {}
+        
+        post_root = ET.fromstring(body)
+        webenv = post_root.findtext('WebEnv')
+        query_key = post_root.findtext('QueryKey')
+        
+        # دریافت مقالات با query_key در یک یا چند efetch همزمان
+        def fetch_batch(start):
+            status_code, body = self._fetch('efetch', {
+                'db': 'pubmed',
+                'WebEnv': webenv,
+                'query_key': query_key,
+                'retstart': start,
+                'retmax': self.efetch_batch_size,
+                'retmode': 'xml',
+                'rettype': 'abstract',
+                'email': self.email
+            }, timeout=60, method='post', use_cache=False)
+            if status_code != 200:
+                print(f"❌ خطا در دریافت جزئیات: {status_code}")
+                return None
+            if self.cache is not None:
+                self.cache.set('efetch', self._details_params(batches[start]), body)
+            return body
+        
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            bodies = dict(zip(batches, executor.map(fetch_batch, batches)))
+        return {start: body for start, body in bodies.items() if body is not None}
+    
+    def _details_params(self, article_ids):
+        """پارامترهای efetch با شناسه - شناسه‌ها مرتب می‌شوند تا کلید کش به ترتیب نتایج وابسته نباشد"""
+        return {
+            'db': 'pubmed',
+            'id': ','.join(sorted(article_ids)),
+            'retmode': 'xml',
+            'rettype': 'abstract',
+            'email': self.email
+        }
+    
     def get_article_details(self, article_ids):
         """دریافت جزئیات کامل مقالات - نسخه بهبود یافته"""
         try:
             if not article_ids:
                 return None
                 
-            fetch_url = f"{self.base_url}efetch.fcgi"
-            params = {
-                'db': 'pubmed',
-                'id': ','.join(article_ids),
-                'retmode': 'xml',
-                'rettype': 'abstract',
-                'email': self.email
-            }
-            
-            if self.api_key:
-                params['api_key'] = self.api_key
+            params = self._details_params(article_ids)
                 
             print(f"📥 دریافت جزئیات {len(article_ids)} مقاله...")
-            response = requests.get(fetch_url, params=params, timeout=45)
+            status_code, body = self._fetch('efetch', params, timeout=45)
+            if status_code is None:
+                return None
             
-            if response.status_code == 200:
-                articles = self.parse_complete_articles(response.text)
+            if status_code == 200:
+                articles = self.parse_complete_articles(body)
                 if articles:
+                    # ترتیب ارتباط esearch حفظ می‌شود (شناسه‌ها مرتب‌شده ارسال شده‌اند)
+                    order = {pmid: i for i, pmid in enumerate(article_ids)}
+                    articles.sort(key=lambda article: order.get(article['pmid'], len(order)))
                     print(f"✅ موفقیت آمیز: {len(articles)} مقاله پردازش شد")
+                    self._store_articles(articles)
                     return articles
                 else:
                     print("❌ مشکل در پردازش مقالات")
                     return None
             else:
-                print(f"❌ خطا در دریافت جزئیات: {response.status_code}")
+                print(f"❌ خطا در دریافت جزئیات: {status_code}")
                 return None
                 
         except Exception as e:
@@ -120,90 +391,17 @@ class PubMedBot:
             return None
     
     def parse_complete_articles(self, xml_content):
-        """پردازش کامل مقالات - نسخه مقاوم به خطا"""
+        """پردازش کامل مقالات - نسخه مقاوم به خطا (پردازش جریانی با iterparse)"""
         try:
-            articles = []
-            
-            # پاکسازی XML
-            clean_xml = re.sub(r'xmlns="[^"]+"', '', xml_content)
-            root = ET.fromstring(clean_xml)
-            
-            for article in root.findall('.//PubmedArticle'):
-                try:
-                    # عنوان مقاله
-                    title_elem = article.find('.//ArticleTitle')
-                    title = title_elem.text if title_elem is not None else "بدون عنوان"
-                    
-                    # چکیده کامل
-                    abstract_text = ""
-                    abstract_elems = article.findall('.//AbstractText')
-                    for elem in abstract_elems:
-                        if elem is not None and elem.text:
-                            label = elem.get('Label', '')
-                            if label:
-                                abstract_text += f"{label}: {elem.text} "
-                            else:
-                                abstract_text += elem.text + " "
-                    
-                    abstract = abstract_text.strip() if abstract_text else "چکیده کامل موجود نیست"
-                    
-                    # فقط مقالات با چکیده کامل
-                    if len(abstract) < 100:  # چکیده خیلی کوتاه
-                        continue
-                    
-                    # نویسندگان
-                    authors = []
-                    for author in article.findall('.//Author'):
-                        last_name = author.find('LastName')
-                        fore_name = author.find('ForeName')
-                        if last_name is not None and last_name.text:
-                            full_name = last_name.text
-                            if fore_name is not None and fore_name.text:
-                                full_name = f"{fore_name.text} {full_name}"
-                            authors.append(full_name)
-                    
-                    # سال انتشار
-                    pub_year = "نامشخص"
-                    year_elem = article.find('.//PubDate/Year')
-                    if year_elem is not None and year_elem.text:
-                        pub_year = year_elem.text
-                    else:
-                        # روش جایگزین برای تاریخ
-                        medline_date = article.find('.//PubDate/MedlineDate')
-                        if medline_date is not None and medline_date.text:
-                            pub_year = medline_date.text[:4]
-                    
-                    # مجله
-                    journal_elem = article.find('.//Journal/Title')
-                    journal = journal_elem.text if journal_elem is not None else "نامشخص"
-                    
-                    # DOI
-                    doi = "نامشخص"
-                    doi_elems = article.findall('.//ArticleId')
-                    for elem in doi_elems:
-                        if elem.get('IdType') == 'doi' and elem.text:
-                            doi = elem.text
-                            break
-                    
-                    articles.append({
-                        'title': title,
-                        'abstract': abstract,
-                        'authors': authors[:3],  # ۳ نویسنده اول
-                        'year': pub_year,
-                        'journal': journal,
-                        'doi': doi,
-                        'source': 'PubMed',
-                        'word_count': len(abstract.split())
-                    })
-                    
-                except Exception as e:
-                    print(f"⚠️ خطا در پردازش یک مقاله: {e}")
-                    continue
-            
+            with span('pubmed.parse'):
+                articles = list(iter_pubmed_articles(xml_content))
+            count('pubmed.articles_parsed', len(articles))
             return articles
             
         except Exception as e:
             print(f"❌ خطا در پردازش XML: {e}")
             return None
 
-    # بقیه متدها مانند قبل می‌مانند...
+    def generate_comprehensive_article(self, topic, articles):
+        """مقاله جامع ساختاریافته (حدود ۱۰۰۰ کلمه) از چکیده‌های PubMed با منابع واقعی - بدون شبکه"""
+        return synthesize_article(topic, articles, query=self.registry.query(topic))
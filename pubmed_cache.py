@@ -0,0 +1,149 @@
+import hashlib
+import json
+import time
+import os
+from db_connection import get_manager
+
+class PubMedCache:
+    """کش پایدار پاسخ‌های eutils روی دیسک (SQLite)"""
+
+    # مدت اعتبار پیش‌فرض هر endpoint بر حسب ثانیه
+    DEFAULT_TTLS = {
+        'esearch': 24 * 3600,       # نتایج جستجو روزانه تغییر می‌کنند
+        'efetch': 30 * 24 * 3600,   # جزئیات یک مقاله تقریباً ثابت است
+    }
+
+    # پارامترهایی که روی پاسخ اثری ندارند و نباید در کلید بیایند
+    IGNORED_PARAMS = ('email', 'api_key', 'tool')
+
+    def __init__(self, db_path="pubmed_cache.db", max_bytes=50 * 1024 * 1024, ttls=None, offline=False):
+        self.db_path = db_path
+        self.db = get_manager(db_path)
+        self.max_bytes = max_bytes
+        self.ttls = dict(self.DEFAULT_TTLS)
+        if ttls:
+            self.ttls.update(ttls)
+        self.offline = offline
+        self.hits = 0
+        self.misses = 0
+        self.init_cache()
+
+    def init_cache(self):
+        """ایجاد جدول کش"""
+        with self.db.transaction() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    endpoint TEXT NOT NULL,
+                    params_json TEXT NOT NULL,
+                    body TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses(last_access)')
+
+    def normalize_params(self, params):
+        """یکسان‌سازی پارامترها تا درخواست‌های معادل یک کلید بگیرند"""
+        normalized = {}
+        for name, value in params.items():
+            if name in self.IGNORED_PARAMS or value is None:
+                continue
+            value = str(value).strip()
+            if name == 'term':
+                # فقط فاصله‌ها یکسان می‌شوند: در PubMed عملگرهای AND/OR/NOT فقط با حروف بزرگ عملگرند
+                value = ' '.join(value.split())
+            normalized[name] = value
+        return normalized
+
+    def make_key(self, endpoint, params):
+        """کلید محتوایی (sha256) برای یک درخواست"""
+        normalized = self.normalize_params(params)
+        payload = json.dumps([endpoint, normalized], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, endpoint, params):
+        """خواندن پاسخ از کش - در حالت آفلاین پاسخ‌های منقضی هم برگردانده می‌شوند"""
+        key = self.make_key(endpoint, params)
+        with self.db.transaction() as conn:
+            row = conn.execute(
+                'SELECT body, created_at FROM responses WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            body, created_at = row
+            ttl = self.ttls.get(endpoint, self.DEFAULT_TTLS['esearch'])
+            if not self.offline and time.time() - created_at > ttl:
+                self.misses += 1
+                return None
+
+            conn.execute('UPDATE responses SET last_access = ? WHERE key = ?', (time.time(), key))
+            self.hits += 1
+            return body
+
+    def set(self, endpoint, params, body):
+        """ذخیره پاسخ در کش و حذف قدیمی‌ترین موارد در صورت عبور از سقف حجم"""
+        if self.offline:
+            return
+        key = self.make_key(endpoint, params)
+        now = time.time()
+        size = len(body.encode('utf-8'))
+        with self.db.transaction() as conn:
+            conn.execute('''
+                INSERT OR REPLACE INTO responses
+                (key, endpoint, params_json, body, size, created_at, last_access)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (
+                key,
+                endpoint,
+                json.dumps(self.normalize_params(params), sort_keys=True, ensure_ascii=False),
+                body,
+                size,
+                now,
+                now
+            ))
+            self._evict(conn)
+
+    def _evict(self, conn):
+        """حذف LRU تا زمانی که حجم کل کمتر از سقف شود"""
+        total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in conn.execute(
+            'SELECT key, size FROM responses ORDER BY last_access ASC'
+        ).fetchall():
+            if total <= self.max_bytes:
+                break
+            conn.execute('DELETE FROM responses WHERE key = ?', (key,))
+            total -= size
+
+    def clear(self):
+        """پاک کردن کامل کش"""
+        with self.db.transaction() as conn:
+            conn.execute('DELETE FROM responses')
+
+    def stats(self):
+        """آمار کش"""
+        entries, total = self.db.connection().execute(
+            'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses'
+        ).fetchone()
+        return {
+            'entries': entries,
+            'total_bytes': total,
+            'hits': self.hits,
+            'misses': self.misses,
+            'offline': self.offline
+        }
+
+def cache_from_env():
+    """ساخت کش بر اساس متغیرهای محیطی (PUBMED_CACHE, PUBMED_CACHE_PATH, PUBMED_OFFLINE)"""
+    if os.environ.get('PUBMED_CACHE', '1') == '0':
+        return None
+    return PubMedCache(
+        db_path=os.environ.get('PUBMED_CACHE_PATH', 'pubmed_cache.db'),
+        max_bytes=int(os.environ.get('PUBMED_CACHE_MAX_MB', '50')) * 1024 * 1024,
+        offline=os.environ.get('PUBMED_OFFLINE', '0') == '1'
+    )
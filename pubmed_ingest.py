@@ -0,0 +1,70 @@
+import argparse
+import glob
+import gzip
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pubmed_parser import iter_pubmed_articles
+from database_handler import MedicalDatabase
+
+# انواع انتشار مورد نیاز برای تولید محتوا
+REVIEW_TYPES = {'Meta-Analysis', 'Systematic Review'}
+
+def parse_baseline_file(path, reviews_only=True):
+    """پردازش جریانی یک فایل baseline (pubmedXXnXXXX.xml.gz) در یک پردازه جداگانه"""
+    opener = gzip.open if path.endswith('.gz') else open
+    articles = []
+    total = 0
+    with opener(path, 'rb') as f:
+        for article in iter_pubmed_articles(f):
+            total += 1
+            if reviews_only and not REVIEW_TYPES & set(article['publication_types']):
+                continue
+            articles.append(article)
+    return path, total, articles
+
+def ingest_baseline(paths, db_path="medical_content.db", workers=None, reviews_only=True):
+    """وارد کردن فایل‌های baseline/update PubMed با استفاده از چند پردازه"""
+    print(f"📦 شروع وارد کردن {len(paths)} فایل PubMed از دیسک...")
+    start = time.time()
+
+    db = MedicalDatabase(db_path)
+    total_parsed = 0
+    total_saved = 0
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(parse_baseline_file, path, reviews_only) for path in paths]
+        for future in as_completed(futures):
+            try:
+                path, total, articles = future.result()
+            except Exception as e:
+                print(f"❌ خطا در پردازش فایل: {e}")
+                continue
+
+            # نوشتن فقط در پردازه اصلی انجام می‌شود (یک نویسنده برای SQLite)
+            saved = db.save_pubmed_articles(articles, source_file=os.path.basename(path))
+            total_parsed += total
+            total_saved += saved
+            print(f"   ✅ {os.path.basename(path)}: {total} مقاله پردازش و {saved} مقاله ذخیره شد")
+
+    elapsed = time.time() - start
+    print(f"📊 مجموع: {total_parsed} مقاله پردازش، {total_saved} مقاله ذخیره شد ({elapsed:.1f} ثانیه)")
+    return {'files': len(paths), 'parsed': total_parsed, 'saved': total_saved, 'seconds': elapsed}
+
+def main():
+    """ورود دسته‌ای فایل‌های baseline از خط فرمان"""
+    parser = argparse.ArgumentParser(description="وارد کردن فایل‌های baseline PubMed در دیتابیس محلی")
+    parser.add_argument('paths', nargs='+', help="فایل‌ها یا الگوهای pubmedXXnXXXX.xml.gz")
+    parser.add_argument('--db', default="medical_content.db", help="مسیر دیتابیس")
+    parser.add_argument('--workers', type=int, default=None, help="تعداد پردازه‌ها")
+    parser.add_argument('--all-types', action='store_true', help="ذخیره همه انواع انتشار، نه فقط متا-آنالیز")
+    args = parser.parse_args()
+
+    paths = sorted(path for pattern in args.paths for path in glob.glob(pattern))
+    if not paths:
+        print("❌ هیچ فایلی پیدا نشد")
+        return
+    ingest_baseline(paths, args.db, args.workers, reviews_only=not args.all_types)
+
+if __name__ == "__main__":
+    main()
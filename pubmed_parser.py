@@ -0,0 +1,125 @@
+import io
+import xml.etree.ElementTree as ET
+
+def _local(tag):
+    """حذف namespace از نام تگ"""
+    return tag.rsplit('}', 1)[-1] if '}' in tag else tag
+
+def _text(elem):
+    """متن کامل یک المنت همراه با تگ‌های درون‌خطی مثل <i> و <sup>"""
+    if elem is None:
+        return ""
+    return " ".join("".join(elem.itertext()).split())
+
+def _open_source(source):
+    """تبدیل ورودی (متن XML، bytes، فایل یا مسیر) به چیزی که iterparse می‌پذیرد"""
+    if isinstance(source, bytes):
+        return io.BytesIO(source)
+    if isinstance(source, str):
+        if source.lstrip().startswith('<'):
+            return io.BytesIO(source.encode('utf-8'))
+        return source  # مسیر فایل
+    return source  # فایل باز
+
+def extract_article(article, min_abstract_length=100):
+    """استخراج دیکشنری مقاله از یک المنت PubmedArticle - برای چکیده کوتاه None"""
+    # شناسه PubMed
+    pmid = article.findtext('MedlineCitation/PMID') or article.findtext('.//PMID') or ""
+
+    # عنوان مقاله
+    title = _text(article.find('.//ArticleTitle')) or "بدون عنوان"
+
+    # چکیده ساختاریافته (BACKGROUND / METHODS / RESULTS / ...)
+    sections = []
+    for elem in article.findall('.//Abstract/AbstractText'):
+        text = _text(elem)
+        if text:
+            sections.append({
+                'label': elem.get('Label', ''),
+                'category': elem.get('NlmCategory', ''),
+                'text': text
+            })
+
+    abstract = " ".join(
+        f"{section['label']}: {section['text']}" if section['label'] else section['text']
+        for section in sections
+    ).strip() or "چکیده کامل موجود نیست"
+
+    # فقط مقالات با چکیده کامل
+    if len(abstract) < min_abstract_length:
+        return None
+
+    # نویسندگان
+    authors = []
+    for author in article.findall('.//AuthorList/Author'):
+        last_name = author.findtext('LastName')
+        if last_name:
+            fore_name = author.findtext('ForeName')
+            authors.append(f"{fore_name} {last_name}" if fore_name else last_name)
+
+    # سال انتشار
+    pub_year = article.findtext('.//PubDate/Year')
+    if not pub_year:
+        # روش جایگزین برای تاریخ
+        medline_date = article.findtext('.//PubDate/MedlineDate')
+        pub_year = medline_date[:4] if medline_date else "نامشخص"
+
+    # مجله
+    journal = article.findtext('.//Journal/Title') or "نامشخص"
+
+    # DOI
+    doi = "نامشخص"
+    for elem in article.findall('.//ArticleIdList/ArticleId'):
+        if elem.get('IdType') == 'doi' and elem.text:
+            doi = elem.text.strip()
+            break
+
+    # نوع انتشار و اصطلاحات MeSH
+    publication_types = [_text(elem) for elem in article.findall('.//PublicationTypeList/PublicationType')]
+    mesh_terms = [_text(elem) for elem in article.findall('.//MeshHeadingList/MeshHeading/DescriptorName')]
+
+    return {
+        'pmid': pmid.strip(),
+        'title': title,
+        'abstract': abstract,
+        'abstract_sections': sections,
+        'authors': authors[:3],  # ۳ نویسنده اول
+        'author_count': len(authors),
+        'year': pub_year,
+        'journal': journal,
+        'doi': doi,
+        'publication_types': publication_types,
+        'mesh_terms': mesh_terms,
+        'source': 'PubMed',
+        'word_count': len(abstract.split())
+    }
+
+def iter_pubmed_articles(source, min_abstract_length=100):
+    """پردازش جریانی پاسخ efetch - هر بار یک مقاله، با حافظه ثابت
+
+    source می‌تواند متن XML، bytes، فایل باز (مثلاً gzip) یا مسیر فایل باشد.
+    """
+    root = None
+    for event, elem in ET.iterparse(_open_source(source), events=('start', 'end')):
+        if event == 'start':
+            if root is None:
+                root = elem
+            continue
+
+        # حذف namespace (معادل پاکسازی xmlns در نسخه قبلی)
+        elem.tag = _local(elem.tag)
+        if elem.tag != 'PubmedArticle':
+            continue
+
+        try:
+            article = extract_article(elem, min_abstract_length)
+        except Exception as e:
+            print(f"⚠️ خطا در پردازش یک مقاله: {e}")
+            article = None
+
+        # آزادسازی حافظه مقاله‌های پردازش شده
+        elem.clear()
+        root.clear()
+
+        if article is not None:
+            yield article
@@ -0,0 +1,39 @@
+import threading
+import time
+
+class TokenBucket:
+    """سطل توکن thread-safe برای محدود کردن نرخ درخواست‌ها"""
+
+    _shared = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, rate, capacity=1):
+        # ظرفیت ۱ یعنی بدون انفجار: فاصله درخواست‌ها دقیقاً 1/rate ثانیه
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        """گرفتن توکن - تا زمان آزاد شدن توکن منتظر می‌ماند و مدت انتظار را برمی‌گرداند"""
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return waited
+                wait = (tokens - self.tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+    @classmethod
+    def shared(cls, rate):
+        """سطل مشترک بین همه نمونه‌ها برای یک نرخ مشخص"""
+        with cls._shared_lock:
+            if rate not in cls._shared:
+                cls._shared[rate] = cls(rate)
+            return cls._shared[rate]
@@ -0,0 +1,324 @@
+import argparse
+import hashlib
+import json
+import os
+import time
+from collections import deque
+from urllib.parse import quote
+from content_codec import content_hash
+from db_connection import get_manager
+from html_renderer import Template, ChunkedWriter
+from dashboard import category_slug
+
+# با تغییر قالب‌ها این نسخه را بالا ببرید تا همه صفحات دوباره ساخته شوند
+TEMPLATE_VERSION = 1
+MANIFEST_NAME = 'manifest.json'
+LATEST_ARTICLES = 20
+
+SITE_HEAD = Template("""<!DOCTYPE html>
+<html dir="rtl">
+<head>
+    <meta charset="UTF-8">
+    <title>{title} - IRHealthLine</title>
+    <style>
+        body {{ font-family: Tahoma, Arial; background: #f0f8ff; margin: 0; padding: 20px; }}
+        .container {{ max-width: 1000px; margin: 0 auto; background: white; padding: 30px; border-radius: 15px; box-shadow: 0 5px 15px rgba(0,0,0,0.1); }}
+        .header {{ background: linear-gradient(135deg, #2c5aa0, #1e3a8a); color: white; padding: 30px; border-radius: 10px; margin-bottom: 30px; text-align: center; }}
+        .article-meta {{ background: #e3f2fd; padding: 10px 15px; border-radius: 8px; margin-bottom: 15px; font-size: 0.9em; }}
+        .article-content {{ line-height: 1.8; color: #333; font-size: 1.1em; }}
+        .category {{ background: #2c5aa0; color: white; padding: 3px 12px; border-radius: 20px; font-size: 0.8em; }}
+        li {{ margin: 8px 0; }}
+        a {{ color: #2c5aa0; }}
+        nav {{ margin-top: 30px; text-align: center; }}
+    </style>
+</head>
+<body>
+    <div class="container">
+        <div class="header"><h1>{heading}</h1></div>
+""")
+SITE_FOOT = Template("""
+        <nav><a href="{home}">🏠 صفحه اصلی</a></nav>
+    </div>
+</body>
+</html>
+""")
+ARTICLE_META = Template("""
+        <div class="article-meta">
+            <a class="category" href="{category_href}">{category}</a>
+            📅 <a href="{date_href}">{created_date}</a> | 📝 {word_count} کلمه | ⏱️ {reading_time} | ⭐ {quality_score}/10
+        </div>
+        <div class="article-content">
+""")
+ARTICLE_END = Template("""
+        </div>
+""")
+HEADING = Template("\n            <h2>{text}</h2>")
+PARAGRAPH = Template("\n            <p>{text}</p>")
+SECTION_START = Template("""
+        <h2>{heading}</h2>
+        <ul>""")
+SECTION_END = Template("""
+        </ul>
+""")
+LINK_ITEM = Template("""
+            <li><a href="{href}">{label}</a> {note}</li>""")
+DATE_SUMMARY = Template("""
+        <div class="article-meta">📄 {total_articles} مقاله | 📝 {total_words} کلمه | ⭐ میانگین کیفیت {avg_quality:.1f}/10</div>
+""")
+
+def article_page(article_id):
+    return f"articles/{article_id}.html"
+
+def category_page(category):
+    return f"categories/{category_slug(category)}.html"
+
+def date_page(date):
+    return f"dates/{date}.html"
+
+def content_blocks(content):
+    """تبدیل متن مقاله (بخش‌های ## و پاراگراف‌ها) به تکه‌های HTML escape شده"""
+    for block in content.split('\n\n'):
+        block = block.strip()
+        if not block:
+            continue
+        if block.startswith('## '):
+            yield from HEADING.chunks({'text': block[3:]})
+        else:
+            yield from PARAGRAPH.chunks({'text': block})
+
+class StaticSiteBuilder:
+    """ساخت افزایشی سایت ایستا از روی MedicalDatabase
+
+    برای هر صفحه هش منبع آن (ردیف‌های مقاله یا آمار تجمیعی) در manifest ذخیره
+    می‌شود و در اجرای بعد فقط صفحاتی که هش آن‌ها تغییر کرده دوباره نوشته می‌شوند.
+    """
+
+    def __init__(self, db_path="medical_content.db", output_dir="site"):
+        self.db_path = db_path
+        self.db = get_manager(db_path)
+        self.output_dir = output_dir
+        self.manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+
+    def load_manifest(self):
+        """خواندن manifest ساخت قبلی (مسیر صفحه -> هش منبع)"""
+        try:
+            with open(self.manifest_path, encoding='utf-8') as f:
+                return json.load(f).get('pages', {})
+        except (OSError, ValueError):
+            return {}
+
+    def save_manifest(self, pages):
+        with ChunkedWriter(self.manifest_path) as out:
+            out.write(json.dumps({'version': TEMPLATE_VERSION, 'pages': pages},
+                                 ensure_ascii=False, indent=1, sort_keys=True))
+
+    def _hasher(self):
+        return hashlib.sha256(f"v{TEMPLATE_VERSION}".encode('utf-8'))
+
+    def compute_hashes(self):
+        """یک پیمایش جریانی روی مقالات و آمار روزانه: هش منبع هر صفحه
+
+        خروجی: (هش صفحات، منبع هر صفحه، شمارش مقالات هر دسته‌بندی، شمارش مقالات هر روز)
+        """
+        hashes = {}
+        sources = {}
+        category_hashers = {}
+        date_hashers = {}
+        category_counts = {}
+        date_counts = {}
+        latest = deque(maxlen=LATEST_ARTICLES)
+
+        conn = self.db.connection()
+        missing = []
+        for row in conn.execute('''
+            SELECT id, title, content_hash, IFNULL(category, 'عمومی'), created_date,
+                   word_count, quality_score, reading_time
+            FROM articles ORDER BY id
+        '''):
+            article_id, title, text_hash, category, created_date = row[:5]
+            if text_hash is None:
+                # ردیف‌هایی که بیرون از save_articles درج شده‌اند یک بار هش و ذخیره می‌شوند
+                text_hash = content_hash(self.article_text(article_id))
+                missing.append((text_hash, article_id))
+            hasher = self._hasher()
+            # هش متن هنگام ذخیره نوشته شده است: محتوا خوانده نمی‌شود و فشرده‌سازی دوباره صفحه را تغییر نمی‌دهد
+            hasher.update(json.dumps((article_id, title, text_hash) + row[3:], ensure_ascii=False).encode('utf-8'))
+            hashes[article_page(article_id)] = hasher.hexdigest()
+            sources[article_page(article_id)] = ('article', article_id)
+
+            # تغییر عنوان، تاریخ یا دسته‌بندی یک مقاله فهرست‌های مربوط را هم نامعتبر می‌کند
+            entry = json.dumps([article_id, title, category, created_date, row[5], row[6]],
+                               ensure_ascii=False).encode('utf-8')
+            category_hashers.setdefault(category, self._hasher()).update(entry)
+            category_counts[category] = category_counts.get(category, 0) + 1
+            if created_date:
+                date_hashers.setdefault(created_date, self._hasher()).update(entry)
+                date_counts[created_date] = date_counts.get(created_date, 0) + 1
+            latest.append(entry)
+
+        if missing:
+            with self.db.transaction() as conn:
+                conn.executemany('UPDATE articles SET content_hash = ? WHERE id = ?', missing)
+
+        for date, total_articles, total_words, avg_quality in conn.execute(
+            'SELECT date, total_articles, total_words, avg_quality FROM daily_stats WHERE total_articles > 0'
+        ):
+            if date in date_hashers:
+                date_hashers[date].update(json.dumps([total_articles, total_words, avg_quality]).encode('utf-8'))
+
+        for category, hasher in category_hashers.items():
+            hashes[category_page(category)] = hasher.hexdigest()
+            sources[category_page(category)] = ('category', category)
+        for date, hasher in date_hashers.items():
+            hashes[date_page(date)] = hasher.hexdigest()
+            sources[date_page(date)] = ('date', date)
+
+        index_hasher = self._hasher()
+        index_hasher.update(json.dumps(
+            [sorted(category_counts.items()), sorted(date_counts.items())], ensure_ascii=False
+        ).encode('utf-8'))
+        for entry in latest:
+            index_hasher.update(entry)
+        hashes['index.html'] = index_hasher.hexdigest()
+        sources['index.html'] = ('index', None)
+
+        return hashes, sources, category_counts, date_counts
+
+    def build(self, force=False):
+        """ساخت سایت - فقط صفحات تغییر کرده نوشته و صفحات حذف‌شده پاک می‌شوند"""
+        start = time.perf_counter()
+        previous = {} if force else self.load_manifest()
+        hashes, sources, category_counts, date_counts = self.compute_hashes()
+
+        written = 0
+        for page, digest in hashes.items():
+            path = os.path.join(self.output_dir, page)
+            if previous.get(page) == digest and os.path.exists(path):
+                continue
+            self.render_page(sources[page], path, category_counts, date_counts)
+            written += 1
+
+        removed = 0
+        for page in set(previous) - set(hashes):
+            path = os.path.join(self.output_dir, page)
+            if os.path.exists(path):
+                os.remove(path)
+                removed += 1
+
+        self.save_manifest(hashes)
+        summary = {
+            'pages': len(hashes),
+            'written': written,
+            'removed': removed,
+            'unchanged': len(hashes) - written,
+            'seconds': round(time.perf_counter() - start, 3)
+        }
+        print(f"✅ سایت ایستا در {self.output_dir}: {written} صفحه نوشته شد، "
+              f"{removed} حذف شد، {summary['unchanged']} بدون تغییر")
+        return summary
+
+    def render_page(self, source, path, category_counts, date_counts):
+        """رندر یک صفحه بر اساس نوع منبع آن (مقاله، دسته‌بندی، روز یا صفحه اصلی)"""
+        kind, key = source
+        with ChunkedWriter(path) as out:
+            if kind == 'article':
+                out.write_all(self.article_chunks(key))
+            elif kind == 'category':
+                out.write_all(self.category_chunks(key))
+            elif kind == 'date':
+                out.write_all(self.date_chunks(key))
+            else:
+                out.write_all(self.index_chunks(category_counts, date_counts))
+
+    def article_text(self, article_id):
+        return self.db.connection().execute(
+            'SELECT content_text(content) FROM articles WHERE id = ?', (article_id,)
+        ).fetchone()[0]
+
+    def article_chunks(self, article_id):
+        title, content, category, created_date, word_count, quality_score, reading_time = self.db.connection().execute('''
+            SELECT title, content_text(content), IFNULL(category, 'عمومی'), created_date, word_count, quality_score,
+                   reading_time
+            FROM articles WHERE id = ?
+        ''', (article_id,)).fetchone()
+        yield from SITE_HEAD.chunks({'title': title, 'heading': title})
+        yield from ARTICLE_META.chunks({
+            'category': category,
+            'category_href': '../' + quote(category_page(category)),
+            'created_date': created_date or '',
+            'date_href': '../' + quote(date_page(created_date)),
+            'word_count': word_count or 0,
+            'reading_time': reading_time or '',
+            'quality_score': quality_score or 0
+        })
+        yield from content_blocks(content)
+        yield from ARTICLE_END.chunks({})
+        yield from SITE_FOOT.chunks({'home': '../index.html'})
+
+    def _article_links(self, rows):
+        for article_id, title, note in rows:
+            yield from LINK_ITEM.chunks({'href': '../' + article_page(article_id), 'label': title, 'note': note})
+
+    def category_chunks(self, category):
+        rows = self.db.connection().execute('''
+            SELECT id, title, created_date FROM articles
+            WHERE category = ? OR (? = 'عمومی' AND category IS NULL)
+            ORDER BY id DESC
+        ''', (category, category))
+        yield from SITE_HEAD.chunks({'title': category, 'heading': f"🏷️ {category}"})
+        yield from SECTION_START.chunks({'heading': '📄 مقالات'})
+        yield from self._article_links((article_id, title, f"({date})") for article_id, title, date in rows)
+        yield from SECTION_END.chunks({})
+        yield from SITE_FOOT.chunks({'home': '../index.html'})
+
+    def date_chunks(self, date):
+        conn = self.db.connection()
+        stats = conn.execute(
+            'SELECT total_articles, total_words, avg_quality FROM daily_stats WHERE date = ?', (date,)
+        ).fetchone() or (0, 0, 0)
+        rows = conn.execute('''
+            SELECT id, title, IFNULL(category, 'عمومی') FROM articles
+            WHERE created_date = ? ORDER BY id DESC
+        ''', (date,))
+        yield from SITE_HEAD.chunks({'title': date, 'heading': f"📅 {date}"})
+        yield from DATE_SUMMARY.chunks({
+            'total_articles': stats[0] or 0,
+            'total_words': stats[1] or 0,
+            'avg_quality': stats[2] or 0
+        })
+        yield from SECTION_START.chunks({'heading': '📄 مقالات'})
+        yield from self._article_links((article_id, title, f"({category})") for article_id, title, category in rows)
+        yield from SECTION_END.chunks({})
+        yield from SITE_FOOT.chunks({'home': '../index.html'})
+
+    def index_chunks(self, category_counts, date_counts):
+        rows = self.db.connection().execute(
+            'SELECT id, title, created_date FROM articles ORDER BY id DESC LIMIT ?', (LATEST_ARTICLES,)
+        )
+        yield from SITE_HEAD.chunks({'title': 'مقالات پزشکی', 'heading': '🏥 مقالات پزشکی IRHealthLine'})
+        yield from SECTION_START.chunks({'heading': '🆕 جدیدترین مقالات'})
+        for article_id, title, date in rows:
+            yield from LINK_ITEM.chunks({'href': article_page(article_id), 'label': title, 'note': f"({date})"})
+        yield from SECTION_END.chunks({})
+        yield from SECTION_START.chunks({'heading': '🏷️ دسته‌بندی‌ها'})
+        for category, count in sorted(category_counts.items(), key=lambda item: -item[1]):
+            yield from LINK_ITEM.chunks({'href': quote(category_page(category)), 'label': category, 'note': f"({count})"})
+        yield from SECTION_END.chunks({})
+        yield from SECTION_START.chunks({'heading': '📅 بایگانی روزانه'})
+        for date in sorted(date_counts, reverse=True):
+            yield from LINK_ITEM.chunks({'href': date_page(date), 'label': date, 'note': f"({date_counts[date]})"})
+        yield from SECTION_END.chunks({})
+        yield from SITE_FOOT.chunks({'home': 'index.html'})
+
+def main():
+    parser = argparse.ArgumentParser(description="ساخت افزایشی سایت ایستای مقالات")
+    parser.add_argument('--db', default='medical_content.db', help="مسیر دیتابیس")
+    parser.add_argument('--out', default='site', help="پوشه خروجی")
+    parser.add_argument('--force', action='store_true', help="ساخت دوباره همه صفحات")
+    args = parser.parse_args()
+
+    print("🎯 در حال ساخت سایت ایستا...")
+    StaticSiteBuilder(args.db, args.out).build(force=args.force)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+import json
+from collections import Counter
+from datetime import datetime
+from db_connection import get_manager
+
+class StatsEngine:
+    """محاسبه آمار از جدول تجمیعی daily_stats در یک پیمایش و بدون pandas
+
+    هزینه هر محاسبه به تعداد روزها بستگی دارد، نه تعداد مقالات آرشیو.
+    """
+
+    def __init__(self, db_path="medical_content.db"):
+        self.db_path = db_path
+        self.db = get_manager(db_path)
+
+    def overview(self, today=None):
+        """آمار کلی: کل مقالات، مقالات امروز، میانگین کیفیت، کل کلمات و توزیع دسته‌بندی‌ها"""
+        today = today or datetime.now().strftime('%Y-%m-%d')
+        total_articles = 0
+        today_articles = 0
+        total_words = 0
+        total_quality = 0
+        categories = Counter()
+
+        for date, articles, words, quality, categories_json in self.db.connection().execute(
+            'SELECT date, total_articles, total_words, total_quality, categories_json FROM daily_stats'
+        ):
+            total_articles += articles or 0
+            total_words += words or 0
+            total_quality += quality or 0
+            if date == today:
+                today_articles += articles or 0
+            if categories_json and categories_json != '{}':
+                categories.update(json.loads(categories_json))
+
+        return {
+            'total_articles': total_articles,
+            'today_articles': today_articles,
+            'avg_quality': total_quality / total_articles if total_articles else 0,
+            'categories': [
+                {'category': category, 'count': count}
+                for category, count in categories.most_common() if count > 0
+            ],
+            'total_words': total_words
+        }
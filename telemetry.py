@@ -0,0 +1,163 @@
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime
+
+class Telemetry:
+    """زمان‌سنجی مراحل (span) و شمارنده‌های یک اجرا
+
+    هر span پایان‌یافته در صورت تنظیم log_path به صورت یک خط JSON نوشته می‌شود و
+    همه spanها و شمارنده‌ها در حافظه تجمیع می‌شوند (summary) تا در پایان اجرا به صورت
+    جدول چاپ و در دیتابیس (جدول run_metrics) ذخیره شوند.
+    """
+
+    def __init__(self, log_path=None, run_id=None):
+        self.run_id = run_id or f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}"
+        self.log_path = log_path
+        self.started_at = datetime.now().isoformat()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._log = None
+        self.spans = {}
+        self.counters = {}
+
+    def _emit(self, record):
+        if not self.log_path:
+            return
+        line = json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n'
+        with self._lock:
+            if self._log is None:
+                self._log = open(self.log_path, 'a', encoding='utf-8')
+            self._log.write(line)
+
+    def observe(self, name, seconds, error=False, **attrs):
+        """ثبت یک زمان اندازه‌گیری‌شده (مثلاً latency مراحل pipeline) بدون context manager"""
+        with self._lock:
+            stat = self.spans.get(name)
+            if stat is None:
+                stat = self.spans[name] = {'count': 0, 'total': 0.0, 'max': 0.0, 'errors': 0}
+            stat['count'] += 1
+            stat['total'] += seconds
+            if seconds > stat['max']:
+                stat['max'] = seconds
+            if error:
+                stat['errors'] += 1
+        if self.log_path:
+            record = {'type': 'span', 'run': self.run_id, 'name': name, 'ms': round(seconds * 1000, 3),
+                      'ts': time.time()}
+            if error:
+                record['error'] = True
+            if attrs:
+                record['attrs'] = attrs
+            self._emit(record)
+
+    @contextlib.contextmanager
+    def span(self, name, **attrs):
+        """زمان‌سنجی یک بخش کد - attrs (مثلاً endpoint) در خط JSON ثبت و داخل بلوک قابل تغییر است
+
+        span درونی نام span بیرونی همان thread را به عنوان parent ثبت می‌کند.
+        """
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        if stack and self.log_path:
+            attrs['parent'] = stack[-1]
+        stack.append(name)
+        error = False
+        start = time.perf_counter()
+        try:
+            yield attrs
+        except BaseException:
+            error = True
+            raise
+        finally:
+            stack.pop()
+            self.observe(name, time.perf_counter() - start, error, **attrs)
+
+    def count(self, name, value=1):
+        """افزایش یک شمارنده (بایت دریافتی، مقالات پردازش‌شده، تلاش مجدد و ...)"""
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def summary(self):
+        """خلاصه اجرا: آمار هر span (تعداد، کل، میانگین، بیشینه به میلی‌ثانیه) و مقدار شمارنده‌ها"""
+        with self._lock:
+            spans = [{
+                'name': name,
+                'count': stat['count'],
+                'errors': stat['errors'],
+                'total_ms': stat['total'] * 1000,
+                'avg_ms': stat['total'] / stat['count'] * 1000,
+                'max_ms': stat['max'] * 1000
+            } for name, stat in sorted(self.spans.items())]
+            counters = dict(sorted(self.counters.items()))
+        return {'run_id': self.run_id, 'started_at': self.started_at, 'spans': spans, 'counters': counters}
+
+    def print_summary(self, file=None):
+        """چاپ جدول خلاصه - حتی در حالت quiet روی خروجی اصلی چاپ می‌شود"""
+        file = file or sys.__stdout__
+        summary = self.summary()
+        print(f"\n📡 تله‌متری اجرا {summary['run_id']}:", file=file)
+        print(f"{'span':<24} {'تعداد':>7} {'خطا':>5} {'کل ms':>10} {'میانگین ms':>11} {'بیشینه ms':>10}", file=file)
+        for s in summary['spans']:
+            print(f"{s['name']:<24} {s['count']:>7} {s['errors']:>5} {s['total_ms']:>10.1f} "
+                  f"{s['avg_ms']:>11.2f} {s['max_ms']:>10.2f}", file=file)
+        for name, value in summary['counters'].items():
+            print(f"🔢 {name}: {value:,}", file=file)
+        return summary
+
+    def close(self):
+        """نوشتن خلاصه در انتهای فایل JSON lines و بستن آن"""
+        if self.log_path:
+            summary = self.summary()
+            self._emit({'type': 'summary', 'run': self.run_id, 'ts': time.time(),
+                        'spans': summary['spans'], 'counters': summary['counters']})
+        with self._lock:
+            if self._log is not None:
+                self._log.close()
+                self._log = None
+
+_current = None
+_current_lock = threading.Lock()
+
+def get_telemetry():
+    """تله‌متری سراسری پروسه (مسیر فایل JSON lines از متغیر محیطی TELEMETRY_LOG)"""
+    global _current
+    with _current_lock:
+        if _current is None:
+            _current = Telemetry(os.environ.get('TELEMETRY_LOG') or None)
+        return _current
+
+def start_run(log_path=None, run_id=None):
+    """شروع یک اجرای جدید با آمار خالی - خروجی: تله‌متری جدید که سراسری هم می‌شود"""
+    global _current
+    with _current_lock:
+        if _current is not None:
+            _current.close()
+        _current = Telemetry(log_path or os.environ.get('TELEMETRY_LOG') or None, run_id)
+        return _current
+
+def span(name, **attrs):
+    return get_telemetry().span(name, **attrs)
+
+def count(name, value=1):
+    get_telemetry().count(name, value)
+
+def observe(name, seconds, error=False, **attrs):
+    get_telemetry().observe(name, seconds, error, **attrs)
+
+def quiet_enabled():
+    return os.environ.get('BOT_QUIET', '').lower() in ('1', 'true', 'yes')
+
+@contextlib.contextmanager
+def quiet(enabled=True):
+    """خاموش کردن پیام‌های کنسول (print) - جدول تله‌متری همچنان روی sys.__stdout__ چاپ می‌شود"""
+    if not enabled:
+        yield
+        return
+    with open(os.devnull, 'w', encoding='utf-8') as devnull, contextlib.redirect_stdout(devnull):
+        yield
@@ -0,0 +1,65 @@
+# test_archive_generator.py
+import sqlite3
+from datetime import date, timedelta
+from archive_generator import ArchiveGenerator, generate_archive
+from database_handler import MedicalDatabase
+from stats_engine import StatsEngine
+from test_database_handler import make_article
+
+def test_rows_are_reproducible_and_follow_the_configured_distributions():
+    generator = ArchiveGenerator(seed=7, years=1, end_date=date(2026, 1, 31), content='none')
+    rows = list(generator.rows(3000))
+    assert rows == list(ArchiveGenerator(seed=7, years=1, end_date=date(2026, 1, 31), content='none').rows(3000))
+    assert len(rows) == 3000
+    assert len({(row[0], row[8]) for row in rows}) == 3000
+
+    catalog = generator.bot.topic_catalog()
+    assert all(row[2] == catalog[row[0].split(' (بخش ')[0]]['category'] for row in rows)
+    dates = [row[8] for row in rows]
+    assert dates == sorted(dates) and dates[0] >= "2025-02-01" and dates[-1] <= "2026-01-31"
+    # رشد تعداد مقالات روزانه و سهم مقالات PubMed در طول زمان
+    first, last = rows[:1000], rows[-1000:]
+    assert len({row[8] for row in first}) > len({row[8] for row in last})
+    assert sum(row[5] == 10 for row in last) > sum(row[5] == 10 for row in first)
+    assert {row[5] for row in rows} == {8, 10}
+
+def test_bulk_load_restores_indexes_triggers_and_daily_stats(tmp_path):
+    db_path = str(tmp_path / "archive.db")
+    report = generate_archive(db_path, 5000, seed=3, years=2)
+    assert report['articles'] == 5000
+
+    db = MedicalDatabase(db_path)
+    assert db.check_daily_stats() == []
+    assert StatsEngine(db_path).overview()['total_articles'] == 5000
+    names = {row[0] for row in sqlite3.connect(db_path).execute(
+        "SELECT name FROM sqlite_master WHERE tbl_name = 'articles' AND type IN ('index', 'trigger')"
+    )}
+    assert {'idx_articles_title_date', 'idx_articles_date_stats', 'articles_daily_stats_ai'} <= names
+
+    # triggerها دوباره فعال هستند: ذخیره عادی آمار تجمیعی را به‌روز می‌کند
+    db.save_articles([make_article("مقاله پس از بارگذاری")], enqueue=False)
+    assert db.check_daily_stats() == []
+    assert StatsEngine(db_path).overview()['total_articles'] == 5001
+
+def test_bulk_load_fills_the_duplicate_index_like_index_duplicates(tmp_path):
+    db_path = str(tmp_path / "archive.db")
+    generate_archive(db_path, 400, seed=5, years=1)
+    db = MedicalDatabase(db_path)
+    conn = db.db.connection()
+    def snapshot():
+        return (conn.execute('SELECT id, duplicate_of FROM articles ORDER BY id').fetchall(),
+                conn.execute('SELECT * FROM article_minhash ORDER BY article_id').fetchall(),
+                conn.execute('SELECT * FROM article_lsh ORDER BY 1, 2, 3').fetchall())
+    loaded = snapshot()
+    assert loaded[1] and any(duplicate_of for _, duplicate_of in loaded[0])
+    # متن کامل ذخیره شده و مقاله تکراری تازه پیدا می‌شود
+    content = conn.execute('SELECT content_text(content) FROM articles WHERE id = ?', (loaded[0][0][0],)).fetchone()[0]
+    assert len(content) > 2000
+    assert db.find_near_duplicates(content)[0]['id'] == loaded[0][0][0]
+
+    with db.db.transaction() as conn:
+        conn.execute('DELETE FROM article_minhash')
+        conn.execute('DELETE FROM article_lsh')
+        conn.execute('UPDATE articles SET duplicate_of = NULL')
+    db.index_duplicates()
+    assert snapshot() == loaded
@@ -0,0 +1,34 @@
+# test_bench_suite.py
+from bench_suite import ReplayEutils, baseline_for, compare, load_results, save_result
+from pubmed_bot import PubMedBot
+from rate_limiter import TokenBucket
+
+def test_recorded_responses_are_replayed_without_network():
+    replay = ReplayEutils()
+    try:
+        bot = PubMedBot(cache=False, local_db=False, base_url=replay.url, rate_limiter=TokenBucket(1000))
+        results = bot.search_many(["stroke prevention", "asthma control"])
+    finally:
+        replay.close()
+    assert all(len(articles) == 4 for articles in results.values())
+    assert {article['pmid'] for article in results["stroke prevention"]} <= {f"9000000{i}" for i in range(1, 6)}
+    # دو esearch + یک epost + یک efetch
+    assert replay.requests == 4
+
+def test_results_are_compared_with_the_previous_commit(tmp_path):
+    path = str(tmp_path / "results.jsonl")
+    def record(commit, rate, latency):
+        return {'commit': commit, 'metrics': [
+            {'name': 'parse', 'value': rate, 'unit': 'articles/s', 'higher_is_better': True},
+            {'name': 'overview', 'value': latency, 'unit': 'ms', 'higher_is_better': False},
+        ]}
+    save_result(record("aaa111", 100.0, 10.0), path)
+    save_result(record("bbb222", 50.0, 20.0), path)
+    current = record("bbb222", 200.0, 5.0)
+
+    history = load_results(path)
+    assert baseline_for(current, history)['commit'] == "aaa111"
+    assert baseline_for(current, history, against="bbb")['metrics'][0]['value'] == 50.0
+    changes = {row['name']: row['change'] for row in compare(current, baseline_for(current, history))}
+    assert changes == {'parse': 100.0, 'overview': 100.0}
+    assert compare(current, None)[0]['change'] is None
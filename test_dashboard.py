@@ -0,0 +1,70 @@
+# test_dashboard.py
+import os
+from html_renderer import Template, Markup, ChunkedWriter
+from database_handler import MedicalDatabase
+from dashboard import MedicalDashboard, category_slug
+from test_database_handler import make_article
+
+def test_template_escapes_values_and_keeps_markup():
+    template = Template('<td title="{title}">{body} {score:.1f}</td>')
+    html = template.render({'title': '"x"', 'body': '<script>alert(1)</script>', 'score': 7.25})
+    assert html == '<td title="&quot;x&quot;">&lt;script&gt;alert(1)&lt;/script&gt; 7.2</td>'
+    assert template.render({'title': '', 'body': Markup('<b>ok</b>'), 'score': 1}) == '<td title=""><b>ok</b> 1.0</td>'
+
+def test_chunked_writer_replaces_file_atomically(tmp_path):
+    path = str(tmp_path / "page.html")
+    with ChunkedWriter(path, buffer_size=4) as out:
+        out.write_all(["ab", "cd", "ef"])
+    assert open(path, encoding='utf-8').read() == "abcdef"
+
+    try:
+        with ChunkedWriter(path) as out:
+            out.write("نیمه‌کاره")
+            raise RuntimeError("خطا در رندر")
+    except RuntimeError:
+        pass
+    assert open(path, encoding='utf-8').read() == "abcdef"
+    assert not os.path.exists(path + ".tmp")
+
+def test_dashboard_streams_escaped_paginated_pages(tmp_path):
+    db_path = str(tmp_path / "medical.db")
+    db = MedicalDatabase(db_path)
+    db.save_articles([make_article(f"<مقاله {i}>", "قلب و عروق", 100, 8) for i in range(5)])
+
+    index_path = MedicalDashboard(db_path).generate_html_dashboard(str(tmp_path), page_size=2)
+    index = open(index_path, encoding='utf-8').read()
+    assert '<td>5</td>' in index
+    assert 'categories/' in index
+
+    slug = category_slug("قلب و عروق")
+    pages = sorted(os.listdir(tmp_path / "categories"))
+    assert pages == [f"{slug}-{page}.html" for page in (1, 2, 3)]
+
+    first = open(tmp_path / "categories" / pages[0], encoding='utf-8').read()
+    assert first.count('&lt;مقاله') == 2
+    assert '<مقاله' not in first
+    assert 'صفحه 1 از 3' in first
+    last = open(tmp_path / "categories" / pages[2], encoding='utf-8').read()
+    assert '&lt;مقاله 0&gt;' in last
+
+def test_dashboard_renders_empty_database(tmp_path):
+    db_path = str(tmp_path / "empty.db")
+    MedicalDatabase(db_path)
+    index_path = MedicalDashboard(db_path).generate_html_dashboard(str(tmp_path))
+    assert 'هیچ دسته‌بندی‌ای وجود ندارد' in open(index_path, encoding='utf-8').read()
+
+def test_category_pages_are_ordered_by_index_without_sorting(tmp_path):
+    db_path = str(tmp_path / "medical.db")
+    db = MedicalDatabase(db_path)
+    db.save_articles([make_article(f"مقاله {i}", "عمومی" if i % 2 else None) for i in range(6)])
+    db.save_articles([make_article("قلبی", "قلب و عروق")])
+    dashboard = MedicalDashboard(db_path)
+
+    # ردیف‌های بدون دسته‌بندی جزو «عمومی» هستند و ترتیب جدیدترین اول حفظ می‌شود
+    assert [a['title'] for a in dashboard.iter_category_articles("عمومی")] == [f"مقاله {i}" for i in range(5, -1, -1)]
+    assert [a['title'] for a in dashboard.iter_category_articles("قلب و عروق")] == ["قلبی"]
+    for category in ("عمومی", "قلب و عروق"):
+        plan = " ".join(row[-1] for row in db.db.connection().execute(
+            'EXPLAIN QUERY PLAN ' + dashboard._category_sql(category), (category,)
+        ))
+        assert 'idx_articles_category_id' in plan and 'TEMP B-TREE' not in plan
@@ -0,0 +1,282 @@
+# test_database_handler.py
+import sqlite3
+import threading
+from db_connection import ConnectionManager
+from database_handler import MedicalDatabase
+
+def make_article(title="مقاله آزمایشی", category="قلب و عروق", word_count=1000, quality_score=8):
+    return {
+        'title': title,
+        'content': "متن " * word_count,
+        'category': category,
+        'word_count': word_count,
+        'reading_time': "۶ دقیقه",
+        'quality_score': quality_score
+    }
+
+def test_connection_manager_uses_wal_and_thread_local_connections(tmp_path):
+    manager = ConnectionManager(str(tmp_path / "wal.db"))
+    conn = manager.connection()
+    assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+    assert conn is manager.connection()
+
+    other = []
+    thread = threading.Thread(target=lambda: other.append(manager.connection()))
+    thread.start()
+    thread.join()
+    assert other[0] is not conn
+    manager.close_all()
+
+def test_reads_are_not_blocked_by_open_write(tmp_path):
+    db = MedicalDatabase(str(tmp_path / "medical.db"))
+    db.save_articles([make_article()])
+
+    # تراکنش نوشتن باز در thread اصلی
+    writer = db.db.connection()
+    writer.execute("INSERT INTO articles (title, content) VALUES ('x', 'y')")
+
+    counts = []
+    def read():
+        counts.append(db.db.connection().execute('SELECT COUNT(*) FROM articles').fetchone()[0])
+    thread = threading.Thread(target=read)
+    thread.start()
+    thread.join(timeout=2)
+
+    assert counts == [1]
+    writer.commit()
+
+def test_close_all_checkpoints_wal_into_main_file(tmp_path):
+    path = tmp_path / "medical.db"
+    db = MedicalDatabase(str(path))
+    db.save_articles([make_article()])
+    db.db.close_all()
+
+    # فقط فایل .db کپی می‌شود (مانند کش و artifact در CI)
+    assert not (tmp_path / "medical.db-wal").exists() or (tmp_path / "medical.db-wal").stat().st_size == 0
+    copy = tmp_path / "copy.db"
+    copy.write_bytes(path.read_bytes())
+    conn = sqlite3.connect(str(copy))
+    assert conn.execute('SELECT COUNT(*) FROM articles').fetchone()[0] == 1
+    conn.close()
+
+def test_save_articles_upserts_on_title_and_date(tmp_path):
+    db = MedicalDatabase(str(tmp_path / "medical.db"))
+    db.save_articles([make_article("الف", quality_score=7), make_article("ب")])
+    db.save_articles([make_article("الف", quality_score=10)])
+
+    rows = db.db.connection().execute(
+        'SELECT title, quality_score, created_date FROM articles ORDER BY title'
+    ).fetchall()
+    assert [(title, score) for title, score, _ in rows] == [("الف", 10), ("ب", 8)]
+    assert all(created_date for _, _, created_date in rows)
+
+def test_date_predicates_use_covering_index(tmp_path):
+    db = MedicalDatabase(str(tmp_path / "medical.db"))
+    plan = " ".join(row[-1] for row in db.db.connection().execute('''
+        EXPLAIN QUERY PLAN
+        SELECT COUNT(*), SUM(word_count), AVG(quality_score)
+        FROM articles WHERE created_date >= ?
+    ''', ['2024-01-01']))
+    assert 'COVERING INDEX idx_articles_date_stats' in plan
+
+def test_migration_upgrades_legacy_database(tmp_path):
+    import sqlite3
+    db_path = str(tmp_path / "legacy.db")
+    conn = sqlite3.connect(db_path)
+    conn.execute('''
+        CREATE TABLE articles (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, title TEXT NOT NULL, content TEXT NOT NULL,
+            category TEXT, word_count INTEGER, reading_time TEXT, quality_score INTEGER,
+            status TEXT DEFAULT 'تولید شده', created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            published BOOLEAN DEFAULT FALSE, views INTEGER DEFAULT 0, likes INTEGER DEFAULT 0
+        )
+    ''')
+    for created_at in ('2024-05-01T08:00:00', '2024-05-01T09:00:00', '2024-05-02T08:00:00'):
+        conn.execute("INSERT INTO articles (title, content, created_at) VALUES ('الف', 'x', ?)", (created_at,))
+    conn.commit()
+    conn.close()
+
+    db = MedicalDatabase(db_path)
+    conn = db.db.connection()
+    assert conn.execute('PRAGMA user_version').fetchone()[0] == len(MedicalDatabase.MIGRATIONS)
+    rows = conn.execute('SELECT created_at, created_date FROM articles ORDER BY id').fetchall()
+    assert rows == [('2024-05-01T09:00:00', '2024-05-01'), ('2024-05-02T08:00:00', '2024-05-02')]
+
+def test_daily_stats_rollup_follows_writes(tmp_path):
+    db = MedicalDatabase(str(tmp_path / "medical.db"))
+    db.save_articles([
+        make_article("الف", "قلب و عروق", 1000, 8),
+        make_article("ب", "تغذیه و رژیم", 500, 6),
+    ])
+    # upsert همان مقاله با دسته‌بندی و کیفیت جدید
+    db.save_articles([make_article("الف", "تغذیه و رژیم", 700, 10)])
+
+    stats = db.get_daily_stats()
+    assert stats['total_articles'] == 2
+    assert stats['total_words'] == 1200
+    assert stats['avg_quality'] == 8.0
+    assert stats['categories'] == 'تغذیه و رژیم'
+
+    conn = db.db.connection()
+    conn.execute("DELETE FROM articles WHERE title = 'ب'")
+    conn.commit()
+    assert db.check_daily_stats() == []
+
+def test_rebuild_repairs_corrupted_rollup(tmp_path):
+    db = MedicalDatabase(str(tmp_path / "medical.db"))
+    db.save_articles([make_article("الف"), make_article("ب")])
+
+    conn = db.db.connection()
+    conn.execute('UPDATE daily_stats SET total_articles = 99')
+    conn.commit()
+    assert len(db.check_daily_stats()) == 1
+
+    assert db.rebuild_daily_stats() == 1
+    assert db.check_daily_stats() == []
+    assert db.get_daily_stats()['total_articles'] == 2
+
+def test_stats_engine_overview_matches_articles(tmp_path):
+    from stats_engine import StatsEngine
+    db_path = str(tmp_path / "medical.db")
+    db = MedicalDatabase(db_path)
+    engine = StatsEngine(db_path)
+    assert engine.overview()['avg_quality'] == 0
+
+    db.save_articles([
+        make_article("الف", "قلب و عروق", 1000, 8),
+        make_article("ب", "تغذیه و رژیم", 500, 6),
+        make_article("ج", "قلب و عروق", 300, 10),
+    ])
+    stats = engine.overview()
+    assert stats == {
+        'total_articles': 3,
+        'today_articles': 3,
+        'avg_quality': 8.0,
+        'categories': [
+            {'category': "قلب و عروق", 'count': 2},
+            {'category': "تغذیه و رژیم", 'count': 1},
+        ],
+        'total_words': 1800
+    }
+    assert type(stats['total_articles']) is int
+
+def test_reporting_modules_do_not_import_pandas():
+    from bench_startup import measure_import
+    for module in ("database_handler", "analytics", "dashboard"):
+        assert 'pandas' not in measure_import(module)['modules']
+
+def test_query_layer_returns_dicts(tmp_path):
+    db = MedicalDatabase(str(tmp_path / "medical.db"))
+    db.save_articles([make_article("الف", word_count=10)])
+    assert db.db.query('SELECT title, word_count FROM articles') == [{'title': "الف", 'word_count': 10}]
+    assert db.db.query_one('SELECT title FROM articles WHERE title = ?', ("ب",)) is None
+
+def test_near_duplicates_are_flagged_against_archive_and_batch(tmp_path):
+    import random
+    from fallback_templates import DEFAULT_BANK
+    db = MedicalDatabase(str(tmp_path / "medical.db"))
+    rng = random.Random(2)
+    original = DEFAULT_BANK.render("پیشگیری از سنگ کلیه", rng)
+    articles = [dict(make_article(f"مقاله {i}"), content=DEFAULT_BANK.render(f"موضوع {i}", rng)) for i in range(200)]
+    articles.append(dict(make_article("اصلی"), content=original))
+    db.save_articles(articles)
+    assert all(article['duplicate_of'] is None for article in articles)
+
+    # یک جمله متفاوت: همچنان تکراری؛ مقاله دوم در همان دسته با اولی مقایسه می‌شود
+    edited = original.replace("## نتایج", "## نتایج\n\nیک جمله تازه درباره نتایج.")
+    batch = [dict(make_article("ویرایش‌شده"), content=edited), dict(make_article("کپی"), content=edited)]
+    db.save_articles(batch)
+    conn = db.db.connection()
+    original_id = conn.execute("SELECT id FROM articles WHERE title = 'اصلی'").fetchone()[0]
+    assert [article['duplicate_of'] for article in batch] == [original_id, original_id]
+    assert db.find_near_duplicates(edited)[0]['title'] == "اصلی"
+
+    # جستجو فقط مقالات هم‌سطل را بررسی می‌کند، نه کل آرشیو
+    signature = db.dedup.signature(DEFAULT_BANK.render("موضوع تازه", rng))
+    assert len(db.dedup.candidates(conn, signature)) < 20
+
+    with db.db.transaction() as conn:
+        conn.execute("DELETE FROM articles WHERE title = 'اصلی'")
+    assert conn.execute('SELECT COUNT(*) FROM article_lsh WHERE article_id = ?', (original_id,)).fetchone()[0] == 0
+    assert db.find_near_duplicates(edited) == []
+
+def test_bulk_save_without_dedup_is_indexed_later(tmp_path):
+    db = MedicalDatabase(str(tmp_path / "medical.db"))
+    conn = db.db.connection()
+    shared = "متن مشترک " * 50
+    db.save_articles([dict(make_article("الف"), content=shared), dict(make_article("ب"), content=shared),
+                      dict(make_article("ج"), content="محتوای کاملاً متفاوت با کلمات دیگر " * 20)], dedup=False)
+    assert conn.execute('SELECT COUNT(*) FROM article_minhash').fetchone()[0] == 0
+    assert db.index_duplicates() == {'indexed': 3, 'duplicates': 1}
+
+    # بازنویسی بدون dedup امضای قدیمی و علامت تکراری را پاک می‌کند تا دوباره ایندکس شود
+    db.save_articles([dict(make_article("ب"), content="نسخه تازه و کاملاً متفاوت مقاله " * 20)], dedup=False)
+    assert db.db.query_one("SELECT duplicate_of FROM articles WHERE title = 'ب'")['duplicate_of'] is None
+    assert db.index_duplicates() == {'indexed': 1, 'duplicates': 0}
+    assert conn.execute('SELECT COUNT(*) FROM article_minhash').fetchone()[0] == 3
+
+def test_existing_archive_can_be_indexed(tmp_path):
+    db = MedicalDatabase(str(tmp_path / "medical.db"))
+    with db.db.transaction() as conn:
+        conn.executemany(
+            'INSERT INTO articles (title, content, created_date) VALUES (?, ?, ?)',
+            [("الف", "متن مشترک " * 50, "2024-01-01"), ("ب", "متن مشترک " * 50, "2024-01-02"),
+             ("ج", "محتوای کاملاً متفاوت با کلمات دیگر " * 20, "2024-01-03")]
+        )
+    assert db.index_duplicates() == {'indexed': 3, 'duplicates': 1}
+    assert db.db.query("SELECT title, duplicate_of FROM articles ORDER BY id") == [
+        {'title': "الف", 'duplicate_of': None}, {'title': "ب", 'duplicate_of': 1}, {'title': "ج", 'duplicate_of': None}
+    ]
+    assert db.index_duplicates()['indexed'] == 0
+
+def test_content_is_compressed_transparently_with_a_trained_dictionary(tmp_path):
+    import random
+    from fallback_templates import DEFAULT_BANK
+    db = MedicalDatabase(str(tmp_path / "medical.db"))
+    with db.db.transaction() as conn:
+        conn.execute("INSERT INTO articles (title, content) VALUES ('قدیمی', 'متن ذخیره‌شده بدون فشرده‌سازی')")
+    rng = random.Random(2)
+    articles = [dict(make_article(f"مقاله {i}"), content=DEFAULT_BANK.render(f"موضوع {i}", rng)) for i in range(40)]
+    db.save_articles(articles)
+
+    conn = db.db.connection()
+    assert conn.execute("SELECT typeof(content) FROM articles WHERE title = 'مقاله 0'").fetchone()[0] == 'blob'
+    assert db.get_article_content(2) == articles[0]['content']
+    assert db.get_article_content(1) == 'متن ذخیره‌شده بدون فشرده‌سازی'
+    assert [item['content'] for item in db.claim_publish_batch(batch_size=2)] == [a['content'] for a in articles[:2]]
+    plain_bytes = db.storage_stats()['content_bytes']
+
+    db.train_content_dictionary()
+    assert db.compress_content(recompress=True) == 41
+    stats = db.storage_stats()
+    assert (stats['compressed'], stats['uncompressed']) == (41, 0)
+    assert stats['content_bytes'] < plain_bytes / 2
+    assert db.db.query_one('SELECT content_text(content) AS content FROM articles WHERE id = 41')['content'] \
+        == articles[-1]['content']
+    # دیکشنری از دیتابیس خوانده می‌شود، پس نمونه جدید هم محتوا را باز می‌کند
+    assert MedicalDatabase(str(tmp_path / "medical.db")).get_article_content(41) == articles[-1]['content']
+
+def test_stats_queries_never_read_article_content(tmp_path, monkeypatch):
+    import sqlite3
+    from analytics import MedicalAnalytics
+    from dashboard import MedicalDashboard
+    from stats_engine import StatsEngine
+    db_path = str(tmp_path / "medical.db")
+    db = MedicalDatabase(db_path)
+    db.save_articles([make_article(f"مقاله {i}") for i in range(5)])
+
+    reads = []
+    def authorizer(action, table, column, *_):
+        if table == 'articles' and column == 'content':
+            reads.append(action)
+        return sqlite3.SQLITE_OK
+    db.db.connection().set_authorizer(authorizer)
+    StatsEngine(db_path).overview()
+    MedicalDashboard(db_path).get_weekly_report()
+    list(MedicalDashboard(db_path).iter_category_articles("قلب و عروق"))
+    db.get_daily_stats()
+    monkeypatch.chdir(tmp_path)
+    assert MedicalAnalytics(db_path).generate_weekly_report()['stats']['total_articles'] == 5
+    assert reads == []
+    db.get_article_content(1)
+    assert reads
@@ -0,0 +1,35 @@
+# test_fallback_templates.py
+import random
+from fallback_templates import FallbackTemplateBank, DEFAULT_BANK, compile_fragment
+from medical_bot import AutoMedicalContentBot
+
+def test_fragments_are_parsed_once_into_slots():
+    assert compile_fragment("متن ثابت") == "متن ثابت"
+    parts = compile_fragment("شیوع {head} برابر {randint:18:42}٪ و {uniform:0.5:1.5:.2f}")
+    assert [slot[0] for _, slot in parts if slot] == ['head', 'randint', 'uniform']
+    assert parts[1][1] == ('randint', 18, 42, '')
+
+def test_render_fills_every_slot_and_is_reproducible():
+    topic = "درمان دیابت نوع ۲ با روش‌های نوین"
+    article = DEFAULT_BANK.render(topic, random.Random(3))
+    assert article == DEFAULT_BANK.render(topic, random.Random(3))
+    assert '{' not in article and '}' not in article
+    assert topic in article
+    for heading in ("مقدمه", "روش‌های بررسی", "نتایج", "بحث و نتیجه‌گیری"):
+        assert f"## {heading}\n\n" in article
+    assert article.count("## منابع") == 1
+
+def test_samples_never_repeat_a_fragment():
+    bank = FallbackTemplateBank(sections=(("بخش", (('sample', 2, ("الف ", "ب ", "ج ")),)),), references=())
+    rng = random.Random(0)
+    bodies = {bank.render("موضوع", rng).split("\n\n")[1] for _ in range(200)}
+    assert bodies == {"الف ب ", "الف ج ", "ب الف ", "ب ج ", "ج الف ", "ج ب "}
+
+def test_batch_matches_single_renders():
+    topics = ["تأثیر مدیتیشن بر فشار خون", "پیشگیری از سنگ کلیه", "آسم و کنترل علائم آن"]
+    assert DEFAULT_BANK.render_many(topics, random.Random(5)) == [
+        DEFAULT_BANK.render(topic, rng) for rng in [random.Random(5)] for topic in topics
+    ]
+    random.seed(9)
+    batch = AutoMedicalContentBot(seed=1).generate_fallback_batch(topics)
+    assert len(batch) == 3 and all(topic in article for topic, article in zip(topics, batch))
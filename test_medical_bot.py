@@ -0,0 +1,115 @@
+# test_medical_bot.py
+from collections import Counter
+import pytest
+from database_handler import MedicalDatabase
+from medical_bot import AutoMedicalContentBot, compose_article, topic_seed
+from website_poster import WebsiteAutoPoster
+
+@pytest.fixture(autouse=True)
+def offline_pubmed(tmp_path, monkeypatch):
+    """بدون شبکه: کش آفلاین خالی و دیتابیس محلی موقت"""
+    monkeypatch.setenv('PUBMED_OFFLINE', '1')
+    monkeypatch.setenv('PUBMED_CACHE_PATH', str(tmp_path / "cache.db"))
+    monkeypatch.setenv('PUBMED_LOCAL_DB', str(tmp_path / "pubmed.db"))
+    monkeypatch.delenv('WEBSITE_URL', raising=False)
+    monkeypatch.delenv('WEBSITE_API_KEY', raising=False)
+
+def test_same_seed_gives_same_topics_and_content():
+    first = AutoMedicalContentBot(seed="20240101")
+    second = AutoMedicalContentBot(seed="20240101")
+    topics = first.select_daily_topics(10)
+    assert topics == second.select_daily_topics(10)
+    assert topics != AutoMedicalContentBot(seed="20240102").select_daily_topics(10)
+
+    seed = topic_seed(first.seed, topics[0])
+    assert compose_article(topics[0], {}, seed)['content'] == compose_article(topics[0], {}, seed)['content']
+
+def test_large_selection_is_unique_and_balanced():
+    bot = AutoMedicalContentBot(seed=1)
+    topics = bot.select_daily_topics(250)
+    assert len(topics) == len(set(topics)) == 250
+
+    counts = Counter(bot.detect_category(topic) for topic in topics)
+    assert set(counts) == set(bot.registry.categories())
+    assert "عمومی" not in counts
+    # هر دسته‌بندی به اندازه سهم برابر (یا همه موضوعاتش اگر کمتر باشد) انتخاب می‌شود
+    available = Counter(entry['category'] for entry in bot.topic_catalog().values())
+    top = max(counts.values())
+    assert all(counts[c] >= min(available[c], top - 1) for c in available)
+    assert all(bot.translate_topic(topic) != topic for topic in topics)
+
+    catalog_size = len(bot.topic_catalog())
+    assert len(bot.select_daily_topics(catalog_size + 50)) == catalog_size
+
+def test_process_pool_starts_only_for_enough_topics_per_worker():
+    bot = AutoMedicalContentBot(seed=7, compose_workers=2)
+    assert bot.compose_pool_size(3) == 1
+    assert bot.compose_pool_size(7) == 1
+    assert bot.compose_pool_size(8) == 2
+    assert AutoMedicalContentBot(seed=7, compose_workers=1).compose_pool_size(100) == 1
+
+def test_process_pool_matches_single_process(tmp_path):
+    topics = AutoMedicalContentBot(seed=7).select_daily_topics(8)
+
+    def run(compose_workers, name):
+        bot = AutoMedicalContentBot(seed=7, compose_workers=compose_workers, fetch_batch_size=4)
+        db = MedicalDatabase(str(tmp_path / name))
+        articles, report = bot.run_daily_pipeline(db, WebsiteAutoPoster(), topics)
+        return articles, report
+
+    pooled, pooled_report = run(2, "pooled.db")
+    single, single_report = run(1, "single.db")
+    assert pooled_report['throughput']['compose_mode'] == 'process'
+    assert single_report['throughput']['compose_mode'] == 'thread'
+    assert [a['title'] for a in pooled] == topics
+    assert [a['content'] for a in pooled] == [a['content'] for a in single]
+    assert pooled_report['throughput']['articles'] == 8
+    # دو دسته ورودی برای مرحله دریافت، هشت مورد برای مراحل بعد
+    assert [r['items'] for r in pooled_report['stages']] == [2, 8, 8, 8]
+
+def test_fallback_near_duplicate_is_regenerated(tmp_path):
+    bot = AutoMedicalContentBot(seed=3)
+    db = MedicalDatabase(str(tmp_path / "medical.db"))
+    article = bot.generate_ai_content("پیشگیری از سنگ کلیه", {})
+    db.save_articles([article])
+
+    repeat = dict(article, title="پیشگیری از سنگ کلیه (بخش ۲)")
+    repeat.pop('duplicate_of')
+    bot.ensure_unique(repeat, db)
+    assert repeat['content'] != article['content']
+    assert db.find_near_duplicates(repeat['content']) == []
+
+def test_rerun_of_the_same_day_is_not_its_own_duplicate(tmp_path, capsys):
+    db = MedicalDatabase(str(tmp_path / "medical.db"))
+    bot = AutoMedicalContentBot(seed=3)
+    seed = topic_seed(bot.seed, "پیشگیری از سنگ کلیه")
+    first = compose_article("پیشگیری از سنگ کلیه", {}, seed)
+    db.save_articles([first])
+
+    rerun = compose_article("پیشگیری از سنگ کلیه", {}, seed)
+    bot.ensure_unique(rerun, db)
+    assert "♻️" not in capsys.readouterr().out
+    assert rerun['content'] == first['content']
+    db.save_articles([rerun])
+    assert rerun['duplicate_of'] is None
+
+def test_unknown_topic_uses_fallback_without_searching(monkeypatch):
+    def no_search(self, topic):
+        raise AssertionError("متن فارسی نباید به PubMed فرستاده شود")
+    monkeypatch.setattr("pubmed_bot.PubMedBot.search_meta_analysis", no_search)
+
+    article = AutoMedicalContentBot(seed=1).generate_ai_content("موضوعی که در فهرست نیست")
+    assert article['source'] == "AI Detailed Generated" and article['category'] == "عمومی"
+
+def test_daily_report_is_written_gzip_compressed(tmp_path, monkeypatch):
+    import gzip
+    import json
+    monkeypatch.chdir(tmp_path)
+    bot = AutoMedicalContentBot(seed=5)
+    articles = [compose_article(topic, {}, topic_seed(bot.seed, topic)) for topic in bot.select_daily_topics(2)]
+    filename = bot.save_daily_report(articles)
+    assert filename.endswith('.json.gz')
+    with gzip.open(tmp_path / filename, 'rt', encoding='utf-8') as f:
+        report = json.load(f)
+    assert [a['content'] for a in report['articles']] == [a['content'] for a in articles]
+    assert (tmp_path / filename).stat().st_size < sum(len(a['content'].encode('utf-8')) for a in articles) / 2
@@ -0,0 +1,60 @@
+# test_pipeline.py
+import threading
+import time
+from pipeline import Pipeline, Stage
+
+def sleeper(seconds):
+    def run(item):
+        time.sleep(seconds)
+        return item
+    return run
+
+def test_stages_overlap_so_wall_time_tracks_slowest_stage():
+    stages = [Stage(name, sleeper(0.05)) for name in ('fetch', 'compose', 'persist', 'publish')]
+    pipeline = Pipeline(stages, queue_size=2)
+
+    assert pipeline.run(range(10)) == list(range(10))
+    report = pipeline.report()
+    # اجرای مرحله‌ای به اندازه مجموع زمان کار مراحل (۱۰ مورد × ۴ مرحله × ۰.۰۵) طول می‌کشید؛ با هم‌پوشانی
+    # حدود یک چهارم آن است - حاشیه زیاد تا runner شلوغ CI شکست کاذب ندهد
+    assert report['sum_of_stages_seconds'] >= 2.0
+    assert report['wall_seconds'] < 0.75 * report['sum_of_stages_seconds']
+    assert [r['items'] for r in report['stages']] == [10] * 4
+    assert all(r['max_queue'] <= 2 for r in report['stages'])
+
+def test_slow_stage_with_more_workers_and_bounded_backlog():
+    active = []
+    lock = threading.Lock()
+    def slow(item):
+        with lock:
+            active.append(item)
+        time.sleep(0.1)
+        return item * 2
+
+    pipeline = Pipeline([Stage('fast', lambda item: item), Stage('slow', slow, workers=4)], queue_size=3)
+    assert sorted(pipeline.run(range(8))) == [item * 2 for item in range(8)]
+    report = pipeline.report()
+    # چهار worker مرحله کند هم‌زمان کار می‌کنند: زمان کل حدود یک چهارم زمان کار آن مرحله است
+    assert report['stages'][1]['busy_seconds'] >= 0.8
+    assert report['wall_seconds'] < 0.75 * report['stages'][1]['busy_seconds']
+    # مرحله سریع بیشتر از ظرفیت صف جلو نمی‌افتد
+    assert report['stages'][1]['max_queue'] <= 3
+
+def test_failed_and_dropped_items_do_not_stop_the_pipeline():
+    def parse(item):
+        if item == 3:
+            raise ValueError("خراب")
+        return None if item == 5 else item
+
+    pipeline = Pipeline([Stage('parse', parse), Stage('save', lambda item: item)])
+    assert pipeline.run(range(7)) == [0, 1, 2, 4, 6]
+    parse_report = pipeline.report()['stages'][0]
+    assert (parse_report['items'], parse_report['errors'], parse_report['dropped']) == (7, 1, 1)
+
+def test_fan_out_stage_splits_batches():
+    pipeline = Pipeline([
+        Stage('batch', lambda batch: [item * 10 for item in batch], fan_out=True),
+        Stage('save', lambda item: item),
+    ])
+    assert pipeline.run([[1, 2], [3], []]) == [10, 20, 30]
+    assert [r['items'] for r in pipeline.report()['stages']] == [3, 3]
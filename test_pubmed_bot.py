@@ -0,0 +1,363 @@
+# test_pubmed_bot.py
+import json
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from article_synthesis import TARGET_WORDS
+from pubmed_bot import PubMedBot
+from pubmed_cache import PubMedCache
+from rate_limiter import TokenBucket
+
+ABSTRACT = "Background: " + "This systematic review pooled randomized trials. " * 5
+
+def make_efetch_xml(pmids):
+    """ساخت پاسخ efetch نمونه برای شناسه‌های داده شده"""
+    records = ""
+    for pmid in pmids:
+        records += f"""
+        <PubmedArticle>
+            <MedlineCitation>
+                <PMID Version="1">{pmid}</PMID>
+                <Article>
+                    <Journal><Title>Test Journal</Title><JournalIssue><PubDate><Year>2023</Year></PubDate></JournalIssue></Journal>
+                    <ArticleTitle>Article {pmid}</ArticleTitle>
+                    <Abstract><AbstractText>{ABSTRACT}</AbstractText></Abstract>
+                    <AuthorList><Author><LastName>Smith</LastName><ForeName>Jane</ForeName></Author></AuthorList>
+                    <PublicationTypeList><PublicationType>Meta-Analysis</PublicationType></PublicationTypeList>
+                </Article>
+            </MedlineCitation>
+            <PubmedData><ArticleIdList><ArticleId IdType="doi">10.1000/{pmid}</ArticleId></ArticleIdList></PubmedData>
+        </PubmedArticle>"""
+    return f"<PubmedArticleSet>{records}</PubmedArticleSet>"
+
+class MockEutils:
+    """سرور محلی شبیه eutils با اعمال محدودیت نرخ مانند NCBI"""
+
+    def __init__(self, idlists, rate_limit):
+        self.idlists = idlists
+        self.rate_limit = rate_limit
+        self.requests = []
+        self.too_many = 0
+        self.posted_ids = []
+        self.lock = threading.Lock()
+        self.window = deque()
+
+        mock = self
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                query = parse_qs(urlparse(self.path).query)
+                self.respond(urlparse(self.path).path, {k: v[0] for k, v in query.items()})
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                form = parse_qs(self.rfile.read(length).decode('utf-8'))
+                self.respond(urlparse(self.path).path, {k: v[0] for k, v in form.items()})
+
+            def respond(self, path, params):
+                status, body = mock.handle(path, params)
+                self.send_response(status)
+                self.end_headers()
+                self.wfile.write(body.encode('utf-8'))
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def handle(self, path, params):
+        now = time.monotonic()
+        with self.lock:
+            self.requests.append(path)
+            while self.window and now - self.window[0] >= 1.0:
+                self.window.popleft()
+            self.window.append(now)
+            if len(self.window) > self.rate_limit:
+                self.too_many += 1
+                return 429, '{"error": "API rate limit exceeded"}'
+
+        if path.endswith('esearch.fcgi'):
+            topic = params['term'].split(' AND ')[0]
+            return 200, json.dumps({'esearchresult': {'idlist': self.idlists.get(topic, [])}})
+        if path.endswith('epost.fcgi'):
+            self.posted_ids = params['id'].split(',')
+            return 200, "<ePostResult><QueryKey>1</QueryKey><WebEnv>ENV</WebEnv></ePostResult>"
+        if path.endswith('efetch.fcgi'):
+            if 'id' in params:
+                return 200, make_efetch_xml(params['id'].split(','))
+            assert params['WebEnv'] == 'ENV' and params['query_key'] == '1'
+            start = int(params['retstart'])
+            return 200, make_efetch_xml(self.posted_ids[start:start + int(params['retmax'])])
+        return 404, ''
+
+    def close(self):
+        self.server.shutdown()
+
+def test_search_many_uses_history_server():
+    mock = MockEutils({'diabetes': ['1', '2'], 'stroke': ['2', '3'], 'nothing': []}, rate_limit=10)
+    try:
+        bot = PubMedBot(cache=False, local_db=False, base_url=mock.url, rate_limiter=TokenBucket(10))
+        results = bot.search_many(['diabetes', 'stroke', 'nothing'])
+    finally:
+        mock.close()
+
+    assert [a['pmid'] for a in results['diabetes']] == ['1', '2']
+    assert [a['pmid'] for a in results['stroke']] == ['2', '3']
+    assert results['nothing'] is None
+    # سه esearch + یک epost + یک efetch به جای ۲×N درخواست
+    assert len(mock.requests) == 5
+
+def test_search_many_results_are_cached_for_the_next_and_offline_runs(tmp_path):
+    mock = MockEutils({'diabetes': ['1', '2'], 'stroke': ['2', '3']}, rate_limit=10)
+    try:
+        bot = PubMedBot(cache=PubMedCache(str(tmp_path / "cache.db")), local_db=False,
+                        base_url=mock.url, rate_limiter=TokenBucket(10))
+        online = bot.search_many(['diabetes', 'stroke'])
+        assert len(mock.requests) == 4
+        assert bot.search_many(['diabetes', 'stroke']) == online
+        assert len(mock.requests) == 4
+
+        offline = PubMedBot(cache=PubMedCache(str(tmp_path / "cache.db"), offline=True), local_db=False,
+                            base_url=mock.url, rate_limiter=TokenBucket(10))
+        assert offline.search_many(['diabetes', 'stroke']) == online
+        assert len(mock.requests) == 4
+    finally:
+        mock.close()
+    assert [a['pmid'] for a in online['stroke']] == ['2', '3']
+
+def test_concurrent_requests_stay_under_rate_limit():
+    topics = [f"topic{i}" for i in range(12)]
+    idlists = {topic: [str(i * 10 + j) for j in range(3)] for i, topic in enumerate(topics)}
+    mock = MockEutils(idlists, rate_limit=10)
+    try:
+        bot = PubMedBot(cache=False, local_db=False, base_url=mock.url, rate_limiter=TokenBucket(9), max_workers=8)
+        bot.efetch_batch_size = 10
+        results = bot.search_many(topics)
+    finally:
+        mock.close()
+
+    assert mock.too_many == 0
+    assert all(len(results[topic]) == 3 for topic in topics)
+    # ۱۲ esearch + ۱ epost + ۴ efetch
+    assert len(mock.requests) == 17
+
+def test_token_bucket_spacing():
+    bucket = TokenBucket(20)
+    start = time.monotonic()
+    for _ in range(5):
+        bucket.acquire()
+    assert time.monotonic() - start >= 4 / 20 - 0.01
+
+def test_streaming_parser_reads_structured_fields():
+    from bench_pubmed_parser import FIXTURE
+    with open(FIXTURE, encoding='utf-8') as f:
+        articles = PubMedBot(cache=False, local_db=False).parse_complete_articles(f.read())
+
+    # رکورد erratum به خاطر چکیده کوتاه کنار گذاشته می‌شود
+    assert [a['pmid'] for a in articles] == ['90000001', '90000002', '90000003', '90000004']
+    first = articles[0]
+    assert [s['label'] for s in first['abstract_sections']] == ['BACKGROUND', 'METHODS', 'RESULTS', 'CONCLUSIONS']
+    assert 'HbA1c' in first['abstract']
+    assert 'Meta-Analysis' in first['publication_types']
+    assert 'Diabetes Mellitus, Type 2' in first['mesh_terms']
+    assert first['authors'] == ['Sara Rahimi', 'Wei Chen', 'Anna Müller']
+    assert articles[1]['year'] == '2022'
+
+def test_streaming_parser_memory_is_flat(tmp_path):
+    from bench_pubmed_parser import build_large_response, measure
+    from pubmed_parser import iter_pubmed_articles
+
+    peaks = []
+    for copies in (50, 500):
+        path = str(tmp_path / f"efetch_{copies}.xml")
+        build_large_response(path, copies)
+        peaks.append(measure('iterparse', lambda: sum(1 for _ in iter_pubmed_articles(path)))['peak_mb'])
+
+    # ده برابر رکورد نباید حافظه را چند برابر کند
+    assert peaks[1] < peaks[0] * 2 + 0.5
+
+def test_baseline_ingest_and_offline_search(tmp_path):
+    import gzip
+    from bench_pubmed_parser import FIXTURE
+    from pubmed_ingest import ingest_baseline
+
+    with open(FIXTURE, 'rb') as src:
+        data = src.read()
+    paths = []
+    for i in range(2):
+        path = str(tmp_path / f"pubmed24n000{i}.xml.gz")
+        with gzip.open(path, 'wb') as f:
+            f.write(data)
+        paths.append(path)
+
+    db_path = str(tmp_path / "local.db")
+    summary = ingest_baseline(paths, db_path, workers=2)
+    assert summary['parsed'] == 8
+    assert summary['saved'] == 8
+
+    bot = PubMedBot(cache=False, local_db=db_path, base_url="http://127.0.0.1:9/")
+    articles = bot.search_meta_analysis("probiotics fatty liver")
+    assert [a['pmid'] for a in articles] == ['90000003']
+    assert 'Probiotics' in articles[0]['mesh_terms']
+
+def test_fetched_articles_are_indexed_for_local_search(tmp_path):
+    mock = MockEutils({'randomized trials': ['7', '8']}, rate_limit=10)
+    try:
+        bot = PubMedBot(cache=False, local_db=str(tmp_path / "local.db"), base_url=mock.url,
+                        rate_limiter=TokenBucket(10))
+        bot.local_min_hits = 2
+        first = bot.search_meta_analysis("randomized trials")
+        requests_after_first = len(mock.requests)
+        second = bot.search_meta_analysis("randomized trial")
+    finally:
+        mock.close()
+
+    assert [a['pmid'] for a in first] == ['7', '8']
+    # جستجوی دوم از ایندکس FTS محلی (با ریشه‌یابی porter) و بدون شبکه پاسخ داده می‌شود
+    assert requests_after_first == 2
+    assert len(mock.requests) == 2
+    assert sorted(a['pmid'] for a in second) == ['7', '8']
+
+def test_stale_or_too_few_local_hits_search_the_network_again(tmp_path):
+    mock = MockEutils({'randomized trials': ['7', '8']}, rate_limit=10)
+    try:
+        bot = PubMedBot(cache=False, local_db=str(tmp_path / "local.db"), base_url=mock.url,
+                        rate_limiter=TokenBucket(10))
+        bot.search_meta_analysis("randomized trials")
+        # دو نتیجه کمتر از حداقل لازم است
+        bot.search_meta_analysis("randomized trials")
+        assert len(mock.requests) == 4
+
+        bot.local_min_hits = 2
+        bot.search_meta_analysis("randomized trials")
+        assert len(mock.requests) == 4
+
+        bot.local_store.db.connection().execute(
+            "UPDATE pubmed_articles SET imported_at = datetime('now', '-90 days')"
+        )
+        bot.local_store.db.connection().commit()
+        articles = bot.search_meta_analysis("randomized trials")
+        assert len(mock.requests) == 6
+        assert min(a['age_days'] for a in bot.search_local("randomized trials")) < 1
+    finally:
+        mock.close()
+    assert [a['pmid'] for a in articles] == ['7', '8']
+
+def test_search_many_only_skips_the_network_for_fresh_local_hits(tmp_path):
+    mock = MockEutils({'randomized trials': ['7', '8']}, rate_limit=10)
+    try:
+        bot = PubMedBot(cache=False, local_db=str(tmp_path / "local.db"), base_url=mock.url,
+                        rate_limiter=TokenBucket(10))
+        bot.search_many(["randomized trials"])
+        # esearch + epost + efetch؛ دو نتیجه محلی کمتر از حداقل لازم است
+        bot.search_many(["randomized trials"])
+        assert len(mock.requests) == 6
+
+        bot.local_min_hits = 2
+        bot.search_many(["randomized trials"])
+        assert len(mock.requests) == 6
+
+        conn = bot.local_store.db.connection()
+        conn.execute("UPDATE pubmed_articles SET imported_at = datetime('now', '-400 days')")
+        conn.commit()
+        bot.search_many(["randomized trials"])
+        assert len(mock.requests) == 9
+
+        # شبکه چیزی ندارد: نتایج قدیمی محلی جایگزین می‌شوند
+        conn.execute("UPDATE pubmed_articles SET imported_at = datetime('now', '-400 days')")
+        conn.commit()
+        mock.idlists = {}
+        articles = bot.search_many(["randomized trials"])["randomized trials"]
+        assert len(mock.requests) == 10
+    finally:
+        mock.close()
+    assert sorted(a['pmid'] for a in articles) == ['7', '8']
+
+def test_bm25_ranks_title_matches_first(tmp_path):
+    from database_handler import MedicalDatabase
+    db = MedicalDatabase(str(tmp_path / "local.db"))
+    base = {'abstract_sections': [], 'authors': [], 'year': '2023', 'journal': 'J', 'doi': 'x',
+            'publication_types': ['Meta-Analysis'], 'mesh_terms': []}
+    db.save_pubmed_articles([
+        dict(base, pmid='1', title='Exercise and mood', abstract='Sleep was a secondary outcome. ' * 5),
+        dict(base, pmid='2', title='Sleep and metabolic health', abstract='Sleep duration was studied. ' * 5),
+    ])
+    assert [a['pmid'] for a in db.search_pubmed_articles("sleep")] == ['2', '1']
+
+    # به‌روزرسانی رکورد باید ایندکس را هم به‌روز کند
+    db.save_pubmed_articles([dict(base, pmid='1', title='Exercise and mood', abstract='Walking trials. ' * 5)])
+
+    assert [a['pmid'] for a in db.search_pubmed_articles("sleep")] == ['2']
+    assert [a['pmid'] for a in db.search_pubmed_articles("walking")] == ['1']
+
+def test_comprehensive_article_is_synthesized_from_abstracts_with_real_citations():
+    from bench_pubmed_parser import FIXTURE
+    bot = PubMedBot(cache=False, local_db=False)
+    with open(FIXTURE, encoding='utf-8') as f:
+        articles = bot.parse_complete_articles(f.read())
+    topic = "درمان دیابت نوع ۲ با روش‌های نوین"
+
+    content = bot.generate_comprehensive_article(topic, articles)
+    assert content == bot.generate_comprehensive_article(topic, articles)
+
+    for heading in ("مقدمه", "روش‌های بررسی", "نتایج", "بحث و نتیجه‌گیری", "منابع"):
+        assert f"## {heading}\n\n" in content
+    # جملات کلیدی از چکیده‌ها با شماره منبع نقل می‌شوند
+    assert "reduced HbA1c by 0.5 percentage points (95% CI 0.3 to 0.7)" in content
+    assert all(f"[{n}]" in content for n in "۱۲۳۴")
+    references = content.split("## منابع\n\n")[1]
+    assert "۱. Rahimi S, Chen W, Müller A, et al. Lifestyle interventions" in references
+    assert "doi:10.9999/dc23-0001. PMID: 90000001." in references
+    # «et al» فقط برای مقاله‌ای که بیش از سه نویسنده دارد
+    assert "Karimi A, Santos M. Probiotics" in references
+    assert "et al" not in references.split("۲.")[1]
+    # با چهار چکیده هم مقاله با معرفی مطالعات منبع به حدود ۱۰۰۰ کلمه می‌رسد
+    assert "## مرور مطالعات منبع\n\n" in content
+    body = content.split("## منابع")[0]
+    assert 0.9 * TARGET_WORDS <= len(body.split()) <= 1.2 * TARGET_WORDS
+
+def test_synthesis_scales_to_large_abstract_sets():
+    from article_synthesis import synthesize_article, textrank, tfidf_vectors, extract_sentences
+    abstract = ("Background sentence about chronic kidney disease and dietary protein. "
+                "We searched MEDLINE and Embase for randomized trials. "
+                "Low-protein diets reduced progression to kidney failure by 23% (95% CI 10 to 34). "
+                "These findings suggest dietary counselling should be offered to patients.")
+    articles = [{'pmid': str(i), 'title': f"Trial {i}", 'abstract': f"{abstract} Cohort {i} had {i} participants.",
+                 'abstract_sections': [], 'authors': ["Ali Rezaei"], 'year': '2020', 'journal': 'Kidney Int',
+                 'doi': 'نامشخص', 'publication_types': ['Meta-Analysis'], 'mesh_terms': ['Diet, Protein-Restricted']}
+                for i in range(40)]
+
+    scores = textrank(tfidf_vectors(extract_sentences(articles)))
+    assert abs(sum(scores) - 1.0) < 1e-6
+    content = synthesize_article("رژیم غذایی در بیماری مزمن کلیه", articles, query="chronic kidney disease diet")
+    body = content.split("## منابع")[0]
+    assert 0.9 * TARGET_WORDS <= len(body.split()) <= 1.2 * TARGET_WORDS
+    assert "doi:" not in content
+
+def test_small_abstract_sets_stay_short_of_the_target_without_made_up_text():
+    from article_synthesis import synthesize_article
+    from bench_pubmed_parser import FIXTURE
+    with open(FIXTURE, encoding='utf-8') as f:
+        articles = PubMedBot(cache=False, local_db=False).parse_complete_articles(f.read())
+    lengths = [len(synthesize_article("درمان دیابت نوع ۲", articles[:n]).split("## منابع")[0].split())
+               for n in range(1, len(articles) + 1)]
+    # هر چکیده (با معرفی مطالعه‌اش) متن را بلندتر می‌کند؛ یک چکیده حدود نیمی از هدف است
+    assert lengths == sorted(lengths) and len(set(lengths)) == len(lengths)
+    assert lengths[0] <= 0.6 * TARGET_WORDS and lengths[2] < 0.9 * TARGET_WORDS
+    assert lengths[-1] >= 0.9 * TARGET_WORDS
+    single = synthesize_article("درمان دیابت نوع ۲", articles[:1])
+    assert "## مرور مطالعات منبع\n\n" in single and "## نکات کاربردی\n\n" in single
+
+def test_vectorized_ranking_matches_the_pure_python_fallback(monkeypatch):
+    import article_synthesis
+    from bench_pubmed_parser import FIXTURE
+    with open(FIXTURE, encoding='utf-8') as f:
+        articles = PubMedBot(cache=False, local_db=False).parse_complete_articles(f.read())
+    # چکیده‌های تکراری امتیاز برابر دارند و ترتیب انتخابشان نباید به خطای ممیز شناور وابسته باشد
+    articles = [dict(articles[i % 4], pmid=str(i), title=f"{articles[i % 4]['title']} {i}") for i in range(40)]
+    vectorized = article_synthesis.synthesize_article("درمان دیابت نوع ۲", articles, query="type 2 diabetes")
+    monkeypatch.setattr(article_synthesis, '_numpy', lambda: None)
+    assert article_synthesis.synthesize_article("درمان دیابت نوع ۲", articles, query="type 2 diabetes") == vectorized
@@ -0,0 +1,64 @@
+# test_pubmed_cache.py
+import time
+from pubmed_cache import PubMedCache
+from pubmed_bot import PubMedBot
+
+def test_key_ignores_email_and_whitespace_but_keeps_case(tmp_path):
+    cache = PubMedCache(str(tmp_path / "cache.db"))
+    key_a = cache.make_key('esearch', {'term': 'diabetes  AND x', 'email': 'a@b.c'})
+    key_b = cache.make_key('esearch', {'term': ' diabetes AND\tx', 'email': 'other@b.c'})
+    assert key_a == key_b
+    assert key_a != cache.make_key('efetch', {'term': 'diabetes AND x'})
+    # «and» کوچک عبارت جستجوست نه عملگر، پس پاسخ دیگری دارد
+    assert key_a != cache.make_key('esearch', {'term': 'diabetes and x'})
+
+def test_ttl_and_offline(tmp_path):
+    db_path = str(tmp_path / "cache.db")
+    cache = PubMedCache(db_path, ttls={'esearch': 60})
+    cache.set('esearch', {'term': 'x'}, '{"ok": 1}')
+    assert cache.get('esearch', {'term': 'x'}) == '{"ok": 1}'
+
+    # منقضی کردن دستی رکورد
+    import sqlite3
+    conn = sqlite3.connect(db_path)
+    conn.execute('UPDATE responses SET created_at = ?', (time.time() - 3600,))
+    conn.commit()
+    conn.close()
+    assert cache.get('esearch', {'term': 'x'}) is None
+
+    # حالت آفلاین پاسخ منقضی را هم برمی‌گرداند
+    offline = PubMedCache(db_path, ttls={'esearch': 60}, offline=True)
+    assert offline.get('esearch', {'term': 'x'}) == '{"ok": 1}'
+
+def test_lru_eviction(tmp_path):
+    cache = PubMedCache(str(tmp_path / "cache.db"), max_bytes=250)
+    for i in range(3):
+        cache.set('efetch', {'id': str(i)}, 'x' * 100)
+        time.sleep(0.01)
+
+    assert cache.get('efetch', {'id': '0'}) is None
+    assert cache.get('efetch', {'id': '2'}) is not None
+    assert cache.stats()['total_bytes'] <= 250
+
+def test_bot_serves_from_cache_without_network(tmp_path, monkeypatch):
+    cache = PubMedCache(str(tmp_path / "cache.db"))
+    bot = PubMedBot(cache=cache, local_db=False)
+
+    calls = []
+    class FakeResponse:
+        status_code = 200
+        text = '{"esearchresult": {"idlist": []}}'
+        content = text.encode('utf-8')
+    def fake_get(url, params=None, timeout=None):
+        calls.append(url)
+        return FakeResponse()
+    monkeypatch.setattr(bot.session, 'get', fake_get)
+
+    bot.search_meta_analysis("diabetes")
+    bot.search_meta_analysis("diabetes")
+    assert len(calls) == 1
+
+    # حالت آفلاین بدون درخواست شبکه
+    cache.offline = True
+    assert bot.search_meta_analysis("hypertension") is None
+    assert len(calls) == 1
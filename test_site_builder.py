@@ -0,0 +1,93 @@
+# test_site_builder.py
+import os
+import sqlite3
+from database_handler import MedicalDatabase
+from site_builder import StaticSiteBuilder, article_page, category_page, date_page
+from test_database_handler import make_article
+
+def make_archive(db_path, days=31, per_day=20):
+    """آرشیو چند روزه با درج مستقیم (تاریخ‌های گذشته)"""
+    db = MedicalDatabase(db_path)
+    categories = ("قلب و عروق", "تغذیه و رژیم", "سلامت روان")
+    with db.db.transaction() as conn:
+        conn.executemany('''
+            INSERT INTO articles (title, content, category, word_count, quality_score, created_at, created_date)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', [
+            (f"مقاله {day}-{i}", "## مقدمه\n\nمتن", categories[i % 3], 100, 8,
+             f"2024-01-{day:02d}T08:00:00", f"2024-01-{day:02d}")
+            for day in range(1, days + 1)
+            for i in range(per_day)
+        ])
+    return db
+
+def test_rebuild_only_touches_changed_pages(tmp_path):
+    db = make_archive(str(tmp_path / "medical.db"))
+    builder = StaticSiteBuilder(str(tmp_path / "medical.db"), str(tmp_path / "site"))
+
+    first = builder.build()
+    assert first['written'] == first['pages'] == 620 + 3 + 31 + 1
+    assert builder.build()['written'] == 0
+
+    # یک مقاله جدید: صفحه خودش، دسته‌بندی، روز و صفحه اصلی
+    db.save_articles([make_article("<مقاله جدید>", "سلامت روان")])
+    summary = builder.build()
+    assert summary['written'] == 4
+    assert summary['pages'] == first['pages'] + 2
+
+    article_id = db.db.connection().execute("SELECT id FROM articles WHERE title = '<مقاله جدید>'").fetchone()[0]
+    page = open(tmp_path / "site" / article_page(article_id), encoding='utf-8').read()
+    assert '&lt;مقاله جدید&gt;' in page and '<مقاله' not in page
+    assert os.path.exists(tmp_path / "site" / category_page("سلامت روان"))
+
+def test_deleted_article_page_is_removed_and_missing_page_restored(tmp_path):
+    db = make_archive(str(tmp_path / "medical.db"), days=2, per_day=3)
+    builder = StaticSiteBuilder(str(tmp_path / "medical.db"), str(tmp_path / "site"))
+    builder.build()
+
+    with db.db.transaction() as conn:
+        conn.execute("DELETE FROM articles WHERE title = 'مقاله 2-0'")
+    summary = builder.build()
+    assert summary['removed'] == 1
+    # صفحه روز، دسته‌بندی و صفحه اصلی دوباره ساخته می‌شوند
+    assert summary['written'] == 3
+
+    os.remove(tmp_path / "site" / date_page("2024-01-01"))
+    assert builder.build()['written'] == 1
+    assert os.path.exists(tmp_path / "site" / date_page("2024-01-01"))
+
+def test_change_detection_reads_stored_hashes_not_content(tmp_path):
+    db = make_archive(str(tmp_path / "medical.db"), days=2, per_day=3)
+    builder = StaticSiteBuilder(str(tmp_path / "medical.db"), str(tmp_path / "site"))
+    # ردیف‌های درج‌شده بیرون از save_articles در اولین ساخت هش می‌شوند
+    builder.build()
+    assert db.db.connection().execute('SELECT COUNT(*) FROM articles WHERE content_hash IS NULL').fetchone()[0] == 0
+
+    reads = []
+    def authorizer(action, table, column, *_):
+        if table == 'articles' and column == 'content':
+            reads.append(action)
+        return sqlite3.SQLITE_OK
+    db.db.connection().set_authorizer(authorizer)
+    assert builder.build()['written'] == 0
+    assert reads == []
+
+    with db.db.transaction() as conn:
+        conn.execute("UPDATE articles SET content = 'متن تازه', content_hash = NULL WHERE title = 'مقاله 1-0'")
+    summary = builder.build()
+    assert summary['written'] == 1
+
+def test_recompressing_content_does_not_rebuild_pages(tmp_path):
+    import random
+    from fallback_templates import DEFAULT_BANK
+    db = MedicalDatabase(str(tmp_path / "medical.db"))
+    rng = random.Random(4)
+    db.save_articles([dict(make_article(f"مقاله {i}"), content=DEFAULT_BANK.render(f"موضوع {i}", rng))
+                      for i in range(30)])
+    builder = StaticSiteBuilder(str(tmp_path / "medical.db"), str(tmp_path / "site"))
+    builder.build()
+
+    # بایت‌های ذخیره‌شده عوض می‌شوند ولی متن و در نتیجه هش صفحه همان است
+    db.train_content_dictionary()
+    assert db.compress_content(recompress=True) == 30
+    assert builder.build()['written'] == 0
@@ -0,0 +1,56 @@
+# test_telemetry.py
+import io
+import json
+import pytest
+import telemetry
+from database_handler import MedicalDatabase
+from pipeline import Pipeline, Stage
+from telemetry import Telemetry
+from test_database_handler import make_article
+
+def test_spans_and_counters_are_logged_as_json_lines(tmp_path):
+    path = tmp_path / "run.jsonl"
+    run = Telemetry(str(path), run_id="r1")
+    with run.span('outer', kind='batch'):
+        with run.span('inner') as attrs:
+            attrs['items'] = 3
+        run.count('bytes', 100)
+        run.count('bytes', 50)
+    with pytest.raises(ValueError):
+        with run.span('inner'):
+            raise ValueError("boom")
+    run.close()
+
+    lines = [json.loads(line) for line in path.read_text(encoding='utf-8').splitlines()]
+    assert [line['type'] for line in lines] == ['span', 'span', 'span', 'summary']
+    assert lines[0]['attrs'] == {'items': 3, 'parent': 'outer'}
+    assert lines[1]['name'] == 'outer' and 'parent' not in lines[1]['attrs']
+    assert lines[2]['error'] is True
+
+    summary = run.summary()
+    inner = next(s for s in summary['spans'] if s['name'] == 'inner')
+    assert (inner['count'], inner['errors']) == (2, 1)
+    assert summary['counters'] == {'bytes': 150}
+    assert lines[-1]['counters'] == {'bytes': 150}
+
+    table = io.StringIO()
+    run.print_summary(file=table)
+    assert 'inner' in table.getvalue() and 'bytes: 150' in table.getvalue()
+
+def test_instrumented_modules_feed_the_current_run_and_metrics_are_stored(tmp_path, capsys):
+    run = telemetry.start_run(run_id="r2")
+    with telemetry.quiet():
+        db = MedicalDatabase(str(tmp_path / "metrics.db"))
+        db.save_articles([make_article("مقاله ۱"), make_article("مقاله ۲")], enqueue=False)
+        Pipeline([Stage('double', lambda x: x * 2)]).run(range(5))
+    assert capsys.readouterr().out == ""
+
+    summary = run.summary()
+    names = {s['name'] for s in summary['spans']}
+    assert {'db.save_articles', 'db.signature', 'stage.double'} <= names
+    assert summary['counters']['db.articles_written'] == 2
+
+    assert db.save_run_metrics(summary) == len(summary['spans']) + len(summary['counters'])
+    history = db.metric_history('stage.double')
+    assert [(row['run_id'], row['count']) for row in history] == [("r2", 5)]
+    assert db.metric_history('db.articles_written')[0]['value'] == 2
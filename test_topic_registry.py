@@ -0,0 +1,58 @@
+# test_topic_registry.py
+import shutil
+from pubmed_bot import PubMedBot
+from topic_registry import DEFAULT_PATH, TopicRegistry, get_registry, normalize
+
+def test_lookup_ignores_digit_zwnj_and_arabic_letter_variants():
+    registry = get_registry()
+    query = "type 2 diabetes treatment innovations"
+    assert registry.query("درمان دیابت نوع ۲ با روش‌های نوین") == query
+    assert registry.query("درمان دیابت نوع 2 با روش های نوین") == query
+    assert registry.query("درمان ديابت نوع ٢ با روشهای نوين") == query
+    assert normalize("قلبی-عروقی") == normalize("قلبی عروقی")
+    assert registry.query("پیشگیری از سنگ کلیه در سالمندان") == "kidney stone prevention elderly"
+    assert registry.query("پیشگیری از سنگ\u200cکلیه در\u200cسالمندان") == "kidney stone prevention elderly"
+    assert registry.query("موضوعی که در فهرست نیست") is None
+
+def test_expansion_adds_mesh_terms_and_is_cached():
+    registry = get_registry()
+    expansion = registry.expand("kidney stone prevention elderly")
+    assert expansion == ('((kidney stone prevention) OR "Kidney Calculi"[MeSH Terms]) '
+                         'AND (elderly OR "Aged"[MeSH Terms])')
+    assert registry.expand("kidney stone prevention elderly") is expansion
+    assert registry.expand("diabetes") == "diabetes"
+    # چند اصطلاح MeSH یک موضوع با هم AND می‌شوند، نه جدا جدا OR
+    assert registry.expand("blood sugar control in cold weather") == (
+        '((blood sugar control in cold weather) OR ("Blood Glucose"[MeSH Terms] AND "Cold Temperature"[MeSH Terms]))'
+    )
+
+    term = PubMedBot(cache=False, local_db=False)._search_params("stroke prevention")['term']
+    assert term.startswith('((stroke prevention) OR "Stroke"[MeSH Terms]) AND (meta-analysis[pt]')
+
+def test_added_topics_are_saved_and_reloaded(tmp_path):
+    path = str(tmp_path / "topics.json")
+    shutil.copy(DEFAULT_PATH, path)
+    registry = TopicRegistry(path)
+    registry.add("میگرن و سردرد مزمن", "مغز و اعصاب", "migraine chronic headache", ["Migraine Disorders"])
+
+    reloaded = TopicRegistry(path)
+    assert reloaded.categories()["مغز و اعصاب"] == ["میگرن و سردرد مزمن"]
+    entry = reloaded.lookup("میگرن و سردرد مزمن در ورزشکاران")
+    assert (entry['category'], entry['query']) == ("مغز و اعصاب", "migraine chronic headache athletes")
+    assert '"Migraine Disorders"[MeSH Terms]' in reloaded.expand(entry['query'])
+
+def test_audiences_are_not_combined_with_topics_that_already_name_one(tmp_path):
+    registry = get_registry()
+    assert registry.lookup("مکمل‌های غذایی ضروری برای سالمندان")['audience'] is None
+    assert registry.lookup("مکمل‌های غذایی ضروری برای سالمندان در کودکان و نوجوانان") is None
+    assert not any(entry['base'] == "مکمل‌های غذایی ضروری برای سالمندان" and entry['audience']
+                   for entry in registry.entries.values())
+
+    path = str(tmp_path / "topics.json")
+    shutil.copy(DEFAULT_PATH, path)
+    registry = TopicRegistry(path)
+    registry.add("آکنه و مراقبت از پوست", "پوست و مو", "acne skin care", ["Acne Vulgaris"],
+                 audience_excluded=["در سالمندان"])
+    reloaded = TopicRegistry(path)
+    assert reloaded.lookup("آکنه و مراقبت از پوست در سالمندان") is None
+    assert reloaded.lookup("آکنه و مراقبت از پوست در کودکان و نوجوانان")['audience'] == "در کودکان و نوجوانان"
@@ -0,0 +1,227 @@
+# test_website_poster.py
+import json
+import threading
+import time
+from urllib.parse import urlparse, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from database_handler import MedicalDatabase
+from website_poster import WebsiteAutoPoster
+from test_database_handler import make_article
+
+class FakeWordPress:
+    """سرور محلی شبیه /wp-json/wp/v2/posts با تأخیر و خطاهای برنامه‌ریزی‌شده"""
+
+    def __init__(self, latency=0.0, failures=None, stalls=None, lost=None):
+        self.latency = latency
+        # لیست پاسخ‌های خطا که به ترتیب پیش از پاسخ موفق برگردانده می‌شوند
+        self.failures = list(failures or [])
+        # تأخیر پاسخ پس از ساخت پست (برای شبیه‌سازی read timeout پس از انتشار)
+        self.stalls = list(stalls or [])
+        # کد وضعیت خطایی که پس از ساخت پست برگردانده می‌شود (مثلاً 502 از پروکسی)
+        self.lost = list(lost or [])
+        self.posts = []
+        self.slugs = {}
+        self.requests = 0
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+
+        fake = self
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                slug = parse_qs(url.query).get('slug', [''])[0]
+                with fake.lock:
+                    found = [{'id': fake.slugs[slug]}] if slug in fake.slugs else []
+                body = json.dumps(found).encode('utf-8')
+                self.send_response(200 if url.path == '/wp-json/wp/v2/posts' else 404)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                payload = json.loads(self.rfile.read(length).decode('utf-8'))
+                status, headers, body = fake.handle(self.path, self.headers, payload)
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def handle(self, path, headers, payload):
+        with self.lock:
+            self.requests += 1
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+            failure = self.failures.pop(0) if self.failures else None
+        try:
+            time.sleep(self.latency)
+            if path != '/wp-json/wp/v2/posts' or headers.get('Authorization') != 'Bearer secret':
+                return 401, {}, b'{"code": "rest_forbidden"}'
+            if failure:
+                return failure[0], failure[1], b'{"code": "busy"}'
+            with self.lock:
+                self.posts.append(payload['title'])
+                post_id = len(self.posts)
+                if 'slug' in payload:
+                    self.slugs[payload['slug']] = post_id
+                stall = self.stalls.pop(0) if self.stalls else 0.0
+                lost = self.lost.pop(0) if self.lost else None
+            time.sleep(stall)
+            if lost:
+                return lost, {}, b'{"code": "bad_gateway"}'
+            return 201, {'Content-Type': 'application/json'}, json.dumps({'id': post_id}).encode('utf-8')
+        finally:
+            with self.lock:
+                self.active -= 1
+
+def test_backlog_publishes_concurrently_with_bounded_pool():
+    server = FakeWordPress(latency=0.1)
+    poster = WebsiteAutoPoster(server.url, "secret", max_workers=8)
+    articles = [make_article(f"مقاله {i}", word_count=10) for i in range(50)]
+
+    start = time.perf_counter()
+    results = poster.post_multiple_articles(articles)
+    elapsed = time.perf_counter() - start
+
+    assert [r['title'] for r in results] == [a['title'] for a in articles]
+    assert all(r['success'] and r['attempts'] == 1 for r in results)
+    assert sorted(r['post_id'] for r in results) == list(range(1, 51))
+    assert server.max_active <= 8
+    # سری با ۰.۱ ثانیه تأخیر حداقل ۵ ثانیه (و قبلاً با sleep حدود ۱۰۰ ثانیه) طول می‌کشید
+    assert elapsed < 2.5
+
+def test_retries_429_and_5xx_respecting_retry_after():
+    server = FakeWordPress(failures=[(429, {'Retry-After': '0'}), (503, {})])
+    poster = WebsiteAutoPoster(server.url, "secret", backoff_base=0.01)
+
+    outcome = poster.publish(dict(make_article(), idempotency_key="k" * 64))
+    assert outcome['success'] and outcome['attempts'] == 3
+    assert outcome['post_id'] == 1
+    assert poster._retry_delay(type('R', (), {'headers': {'Retry-After': '7'}})(), 0) == 7.0
+
+def test_client_errors_are_not_retried_and_are_reported():
+    server = FakeWordPress()
+    poster = WebsiteAutoPoster(server.url, "wrong-key", backoff_base=0.01)
+
+    outcome = poster.publish(make_article())
+    assert not outcome['success']
+    assert outcome['status_code'] == 401 and outcome['attempts'] == 1
+    assert 'rest_forbidden' in outcome['error']
+    assert server.requests == 1
+
+def test_gives_up_after_max_retries():
+    server = FakeWordPress(failures=[(503, {})] * 10)
+    poster = WebsiteAutoPoster(server.url, "secret", max_retries=2, backoff_base=0.01)
+
+    outcome = poster.publish(dict(make_article(), idempotency_key="k" * 64))
+    assert not outcome['success'] and outcome['attempts'] == 3
+    assert server.requests == 3
+
+def test_5xx_after_post_was_created_is_not_republished():
+    server = FakeWordPress(lost=[502, 502])
+    poster = WebsiteAutoPoster(server.url, "secret", backoff_base=0.01)
+
+    outcome = poster.publish(dict(make_article(), idempotency_key="k" * 64))
+    assert outcome['success'] and outcome['post_id'] == 1 and outcome['recovered']
+    assert outcome['attempts'] == 1
+
+    # بدون کلید معلوم نیست پست ساخته شده یا نه، پس دوباره ارسال نمی‌شود
+    outcome = poster.publish(make_article("مقاله دوم"))
+    assert not outcome['success'] and outcome['status_code'] == 502 and outcome['attempts'] == 1
+    assert server.posts == ["مقاله آزمایشی", "مقاله دوم"]
+
+def test_read_timeout_after_post_was_created_is_not_republished():
+    server = FakeWordPress(stalls=[0.5, 0.5])
+    poster = WebsiteAutoPoster(server.url, "secret", backoff_base=0.01, timeout=0.2)
+
+    article = dict(make_article(), idempotency_key="k" * 64)
+    outcome = poster.publish(article)
+    assert outcome['success'] and outcome['post_id'] == 1 and outcome['recovered']
+    assert outcome['attempts'] == 1
+
+    # بدون کلید راهی برای پیدا کردن پست نیست، پس دوباره ارسال نمی‌شود
+    outcome = poster.publish(make_article("مقاله دوم"))
+    assert not outcome['success'] and outcome['attempts'] == 1
+    time.sleep(0.4)
+    assert server.posts == ["مقاله آزمایشی", "مقاله دوم"]
+
+def test_connection_errors_are_retried():
+    server = FakeWordPress()
+    url = server.url
+    server.server.shutdown()
+    server.server.server_close()
+    poster = WebsiteAutoPoster(url, "secret", max_retries=2, backoff_base=0.01)
+
+    outcome = poster.publish(make_article())
+    assert not outcome['success'] and outcome['attempts'] == 3
+
+def test_simulation_mode_does_not_sleep(monkeypatch):
+    monkeypatch.delenv('WEBSITE_URL', raising=False)
+    monkeypatch.delenv('WEBSITE_API_KEY', raising=False)
+    poster = WebsiteAutoPoster()
+
+    start = time.perf_counter()
+    results = poster.post_multiple_articles([make_article(f"مقاله {i}") for i in range(50)])
+    assert time.perf_counter() - start < 1
+    assert all(r['success'] and r['simulated'] for r in results)
+
+def test_outbox_publishes_once_and_marks_articles(tmp_path):
+    server = FakeWordPress()
+    db = MedicalDatabase(str(tmp_path / "medical.db"))
+    db.save_articles([make_article(f"مقاله {i}") for i in range(5)])
+    poster = WebsiteAutoPoster(server.url, "secret")
+
+    summary = poster.drain_outbox(db, batch_size=2)
+    assert summary == {'published': 5, 'failed': 0, 'batches': 3}
+    assert db.outbox_status() == {'published': 5}
+    rows = db.db.connection().execute('SELECT published, remote_post_id FROM articles').fetchall()
+    assert sorted(rows) == [(1, str(i)) for i in range(1, 6)]
+
+    # اجرای دوباره ربات با همان مقالات پست تکراری نمی‌سازد
+    db.save_articles([make_article("مقاله 0")])
+    assert poster.drain_outbox(db)['published'] == 0
+    assert len(server.posts) == 5
+
+def test_outbox_resumes_after_crash_without_duplicates(tmp_path):
+    server = FakeWordPress()
+    db = MedicalDatabase(str(tmp_path / "medical.db"))
+    db.save_articles([make_article("الف"), make_article("ب")])
+    poster = WebsiteAutoPoster(server.url, "secret")
+
+    # worker قبلی دسته را برداشت، اولی را منتشر کرد و پیش از ثبت نتیجه از کار افتاد
+    claimed = db.claim_publish_batch()
+    assert poster.publish(claimed[0])['success']
+    assert db.claim_publish_batch() == []
+
+    summary = poster.drain_outbox(db, lease_seconds=0)
+    assert summary['published'] == 2
+    assert server.posts == ["الف", "ب"]
+    assert db.db.connection().execute(
+        "SELECT remote_post_id FROM articles WHERE title = 'الف'"
+    ).fetchone()[0] == '1'
+
+def test_outbox_failures_are_rescheduled_then_failed(tmp_path):
+    server = FakeWordPress(failures=[(400, {})] * 3)
+    db = MedicalDatabase(str(tmp_path / "medical.db"))
+    db.save_articles([make_article()])
+    poster = WebsiteAutoPoster(server.url, "secret")
+
+    assert poster.drain_outbox(db)['failed'] == 1
+    assert db.outbox_status() == {'pending': 1}
+    # تلاش بعدی به زمان‌بندی backoff موکول شده است
+    assert poster.drain_outbox(db)['batches'] == 0
+
+    db.db.connection().execute('UPDATE publish_outbox SET next_attempt_at = 0')
+    db.db.connection().commit()
+    assert poster.drain_outbox(db, max_attempts=2)['failed'] == 1
+    assert db.outbox_status() == {'failed': 1}
@@ -0,0 +1,177 @@
+import json
+import os
+import re
+import threading
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'topics.json')
+
+# یکسان‌سازی نویسه‌های عربی/فارسی و ارقام: «۲»، «٢» و «2» یک کلید می‌سازند
+_CHAR_MAP = str.maketrans({
+    **{ord(digit): str(i) for i, digit in enumerate('۰۱۲۳۴۵۶۷۸۹')},
+    **{ord(digit): str(i) for i, digit in enumerate('٠١٢٣٤٥٦٧٨٩')},
+    'ي': 'ی', 'ى': 'ی', 'ك': 'ک', 'ة': 'ه', 'ۀ': 'ه', 'أ': 'ا', 'إ': 'ا', 'ؤ': 'و',
+})
+# اعراب و کشیده
+_DIACRITICS = re.compile('[\u064b-\u0652\u0670\u0640]')
+_WORD = re.compile(r'\w+')
+
+def normalize(text):
+    """کلید جستجوی موضوع: بدون فاصله، نیم‌فاصله، اعراب و علائم با ارقام لاتین
+
+    «روش‌های»، «روش های» و «روشهای» همگی یک کلید دارند.
+    """
+    text = _DIACRITICS.sub('', text.translate(_CHAR_MAP).lower())
+    return ''.join(_WORD.findall(text))
+
+def mesh_term(term):
+    return f'"{term}"[MeSH Terms]'
+
+class TopicRegistry:
+    """فهرست موضوعات، ترجمه انگلیسی و اصطلاحات MeSH که یک بار از فایل JSON بارگذاری می‌شود
+
+    موضوع جدید بدون تغییر کد با ویرایش فایل یا add() اضافه می‌شود. هر موضوع پایه با هر
+    گروه مخاطب (مثلاً «در سالمندان») هم یک موضوع قابل جستجو می‌سازد، مگر اینکه دسته‌بندی آن در
+    audience_excluded_categories، گروه در audience_excluded همان موضوع باشد یا خود موضوع از قبل
+    گروه مخاطبی را نام ببرد (مثلاً «... برای سالمندان» با MeSH «Aged» یا کلمه elderly در کوئری).
+    """
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        # کش گسترش کوئری‌ها: کوئری انگلیسی ← عبارت جستجوی PubMed
+        self._expansions = {}
+        with open(path, encoding='utf-8') as f:
+            self.data = json.load(f)
+        self._build()
+
+    def _build(self):
+        self.audiences = self.data.get('audiences', {})
+        excluded = set(self.data.get('audience_excluded_categories', []))
+        self.entries = {}
+        self._by_key = {}
+        self._by_query = {}
+        self._audience_keys = {normalize(suffix): suffix for suffix in self.audiences}
+        self._allowed_audiences = {}
+        audience_mesh = {term for audience in self.audiences.values() for term in audience.get('mesh', [])}
+        audience_words = {word for audience in self.audiences.values() for word in audience['query'].lower().split()}
+        for category, topics in self.data['categories'].items():
+            for title, info in topics.items():
+                self._register(title, category, info['query'], info.get('mesh', []), title, None)
+                # موضوعی که خودش گروه مخاطب دارد با گروه دیگری ترکیب نمی‌شود («سالمندان در کودکان»)
+                names_audience = (set(info.get('mesh', [])) & audience_mesh
+                                  or set(info['query'].lower().split()) & audience_words)
+                if category in excluded or names_audience:
+                    continue
+                allowed = [suffix for suffix in self.audiences if suffix not in info.get('audience_excluded', ())]
+                self._allowed_audiences[title] = allowed
+                for suffix in allowed:
+                    audience = self.audiences[suffix]
+                    self._register(
+                        f"{title} {suffix}", category, f"{info['query']} {audience['query']}",
+                        info.get('mesh', []), title, suffix
+                    )
+        self._expansions.clear()
+
+    def _register(self, title, category, query, mesh, base, audience):
+        entry = {
+            'title': title,
+            'category': category,
+            'query': query,
+            'mesh': list(mesh),
+            'base': base,
+            'audience': audience
+        }
+        self.entries[title] = entry
+        self._by_key[normalize(title)] = entry
+        self._by_query.setdefault(query.lower(), entry)
+
+    def categories(self):
+        """موضوعات پایه هر دسته‌بندی - خروجی: {دسته‌بندی: [موضوعات]}"""
+        return {category: list(topics) for category, topics in self.data['categories'].items()}
+
+    def excluded_audience_categories(self):
+        return tuple(self.data.get('audience_excluded_categories', []))
+
+    def lookup(self, topic):
+        """اطلاعات موضوع با جستجوی نرمال‌شده (ارقام فارسی/لاتین، نیم‌فاصله و ...) یا None"""
+        key = normalize(topic)
+        entry = self._by_key.get(key)
+        if entry is not None:
+            return entry
+        # موضوع پایه شناخته‌شده + گروه مخاطب (حتی اگر ترکیب از پیش ساخته نشده باشد)
+        for audience_key, suffix in self._audience_keys.items():
+            if key.endswith(audience_key):
+                base = self._by_key.get(key[:-len(audience_key)])
+                if base is not None and suffix in self._allowed_audiences.get(base['title'], ()):
+                    return dict(base, title=topic, query=f"{base['query']} {self.audiences[suffix]['query']}",
+                                audience=suffix)
+        return None
+
+    def query(self, topic):
+        """کوئری انگلیسی موضوع - برای موضوع ناشناخته None (متن فارسی به PubMed فرستاده نمی‌شود)"""
+        entry = self.lookup(topic)
+        return entry['query'] if entry else None
+
+    def expand(self, query):
+        """عبارت جستجوی PubMed: کلمات کوئری یا همه اصطلاحات MeSH موضوع (و گروه مخاطب) - با کش
+
+        کوئری ناشناخته بدون تغییر برمی‌گردد.
+        """
+        expansion = self._expansions.get(query)
+        if expansion is not None:
+            return expansion
+        entry = self._by_query.get(query.lower())
+        if entry is None:
+            expansion = query
+        else:
+            base_query = query
+            audience = self.audiences.get(entry['audience']) if entry['audience'] else None
+            if audience and query.endswith(f" {audience['query']}"):
+                base_query = query[:-len(audience['query']) - 1]
+            # اصطلاحات MeSH یک موضوع با هم AND می‌شوند: هر کدام به تنهایی فقط بخشی از موضوع است
+            expansion = f"({base_query})"
+            if entry['mesh']:
+                mesh_terms = ' AND '.join(mesh_term(term) for term in entry['mesh'])
+                expansion += f" OR ({mesh_terms})" if len(entry['mesh']) > 1 else f" OR {mesh_terms}"
+            if audience:
+                audience_terms = ' OR '.join([audience['query']] + [mesh_term(term) for term in audience['mesh']])
+                expansion = f"({expansion}) AND ({audience_terms})"
+            elif entry['mesh']:
+                expansion = f"({expansion})"
+        self._expansions[query] = expansion
+        return expansion
+
+    def add(self, title, category, query, mesh=(), save=True, audience_excluded=()):
+        """افزودن موضوع جدید (و ترکیب‌های گروه مخاطب آن) و ذخیره در فایل
+
+        audience_excluded: گروه‌های مخاطبی (مثلاً «در کودکان و نوجوانان») که برای این موضوع معنی ندارند
+        """
+        with self._lock:
+            info = {'query': query, 'mesh': list(mesh)}
+            if audience_excluded:
+                info['audience_excluded'] = list(audience_excluded)
+            self.data['categories'].setdefault(category, {})[title] = info
+            self._build()
+            if save:
+                self.save()
+        return self.entries[title]
+
+    def save(self):
+        """نوشتن اتمی فایل موضوعات"""
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.data, f, ensure_ascii=False, indent=2)
+            f.write('\n')
+        os.replace(tmp_path, self.path)
+
+_registries = {}
+_registries_lock = threading.Lock()
+
+def get_registry(path=None):
+    """registry مشترک هر فایل (مسیر پیش‌فرض با TOPIC_REGISTRY قابل تغییر است)"""
+    path = os.path.abspath(path or os.environ.get('TOPIC_REGISTRY', DEFAULT_PATH))
+    with _registries_lock:
+        registry = _registries.get(path)
+        if registry is None:
+            registry = _registries[path] = TopicRegistry(path)
+        return registry
@@ -1,70 +1,256 @@
 import requests
 import json
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from email.utils import parsedate_to_datetime
+from requests.adapters import HTTPAdapter
 import os
 import time
+from telemetry import count, span
 
 class WebsiteAutoPoster:
-    def __init__(self, website_url=None, api_key=None):
+    # کدهای وضعیتی که موقتی هستند و ارزش تلاش مجدد دارند
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+    def __init__(self, website_url=None, api_key=None, max_workers=4, max_retries=4,
+                 backoff_base=1.0, max_backoff=30.0, timeout=30):
         self.website_url = website_url or os.environ.get('WEBSITE_URL', '')
         self.api_key = api_key or os.environ.get('WEBSITE_API_KEY', '')
         self.headers = {
             'Authorization': f'Bearer {self.api_key}',
             'Content-Type': 'application/json'
         }
-    
-    def post_to_website(self, article):
-        """ارسال مقاله به وبسایت"""
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+
+        # اتصال‌های HTTP بین همه ارسال‌ها (و threadها) مشترک و ماندگار می‌مانند
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def _build_payload(self, article):
+        payload = {
+            'title': article['title'],
+            'content': article['content'],
+            'category': article['category'],
+            'meta_description': f"مقاله پزشکی درباره {article['title']}",
+            'tags': ['پزشکی', 'سلامت', article['category']],
+            'status': 'publish'
+        }
+        if article.get('idempotency_key'):
+            # slug ثابت هر مقاله امکان پیدا کردن پست قبلاً ساخته‌شده را می‌دهد
+            payload['slug'] = self.post_slug(article['idempotency_key'])
+        return payload
+
+    @staticmethod
+    def post_slug(idempotency_key):
+        return f"irhealthline-{idempotency_key[:20]}"
+
+    def find_existing_post(self, idempotency_key):
+        """شناسه پستی که قبلاً با همین کلید ساخته شده (مثلاً پیش از crash) یا None"""
+        response = self.session.get(
+            f"{self.website_url.rstrip('/')}/wp-json/wp/v2/posts",
+            params={'slug': self.post_slug(idempotency_key)},
+            timeout=self.timeout
+        )
+        if response.status_code == 200:
+            posts = response.json()
+            if posts:
+                return posts[0].get('id')
+        return None
+
+    def _retry_delay(self, response, attempt):
+        """زمان انتظار پیش از تلاش بعدی: Retry-After سرور یا backoff نمایی"""
+        retry_after = response.headers.get('Retry-After', '').strip() if response is not None else ''
+        if retry_after.isdigit():
+            delay = float(retry_after)
+        elif retry_after:
+            try:
+                delay = (parsedate_to_datetime(retry_after) - datetime.now().astimezone()).total_seconds()
+            except (TypeError, ValueError):
+                delay = self.backoff_base * 2 ** attempt
+        else:
+            delay = self.backoff_base * 2 ** attempt
+        return min(max(delay, 0.0), self.max_backoff)
+
+    def publish(self, article):
+        """ارسال یک مقاله با تلاش مجدد - خروجی: نتیجه کامل ارسال همان مقاله"""
+        with span('publish.post') as attrs:
+            outcome = self._publish(article)
+            attrs.update(status=outcome['status_code'], attempts=outcome['attempts'])
+        count('publish.simulated' if outcome['simulated'] else
+              'publish.published' if outcome['success'] else 'publish.failed')
+        if outcome['attempts'] > 1:
+            count('publish.retries', outcome['attempts'] - 1)
+        return outcome
+
+    def _safe_to_retry(self, article, outcome):
+        """پس از پاسخی که شاید پست را ساخته باشد (read timeout یا 5xx): آیا ارسال دوباره امن است؟
+
+        POST ایدمپوتنت نیست و وردپرس هدر Idempotency-Key را نادیده می‌گیرد، پس فقط وقتی پستی با slug
+        مقاله نباشد دوباره ارسال می‌شود. پست پیدا‌شده outcome را موفق می‌کند؛ بدون کلید یا با شکست
+        جستجو تلاش مجدد نمی‌شود.
+        """
+        if not article.get('idempotency_key'):
+            return False
         try:
-            print(f"🌐 در حال ارسال مقاله به وبسایت: {article['title']}")
-            
-            # اگر کلید API تنظیم نشده، فقط شبیه‌سازی کن
-            if not self.api_key or not self.website_url:
-                print("⚠️ کلید وبسایت تنظیم نشده - شبیه‌سازی ارسال")
-                time.sleep(1)
-                return True
-            
-            payload = {
-                'title': article['title'],
-                'content': article['content'],
-                'category': article['category'],
-                'meta_description': f"مقاله پزشکی درباره {article['title']}",
-                'tags': ['پزشکی', 'سلامت', article['category']],
-                'status': 'publish'
-            }
-            
-            response = requests.post(
-                f"{self.website_url}/wp-json/wp/v2/posts",
-                headers=self.headers,
-                json=payload,
-                timeout=30
-            )
-            
-            if response.status_code == 201:
-                print(f"✅ مقاله '{article['title']}' در وبسایت منتشر شد")
-                return True
-            else:
-                print(f"❌ خطا در انتشار: {response.status_code} - {response.text}")
-                return False
-                
-        except Exception as e:
-            print(f"❌ خطا در ارسال به وبسایت: {e}")
+            post_id = self.find_existing_post(article['idempotency_key'])
+        except (requests.RequestException, ValueError):
             return False
-    
+        if post_id is not None:
+            outcome.update(success=True, post_id=post_id, error=None, recovered=True)
+            return False
+        return True
+
+    def _publish(self, article):
+        start = time.perf_counter()
+        outcome = {
+            'title': article['title'],
+            'success': False,
+            'status_code': None,
+            'post_id': None,
+            'attempts': 0,
+            'error': None,
+            'simulated': False
+        }
+
+        # اگر کلید API تنظیم نشده، فقط شبیه‌سازی کن
+        if not self.api_key or not self.website_url:
+            outcome.update(success=True, simulated=True)
+        else:
+            url = f"{self.website_url.rstrip('/')}/wp-json/wp/v2/posts"
+            payload = self._build_payload(article)
+            headers = {}
+            if article.get('idempotency_key'):
+                headers['Idempotency-Key'] = article['idempotency_key']
+            for attempt in range(self.max_retries + 1):
+                outcome['attempts'] = attempt + 1
+                response = None
+                try:
+                    response = self.session.post(url, json=payload, headers=headers, timeout=self.timeout)
+                    outcome['status_code'] = response.status_code
+                    if response.status_code in (200, 201):
+                        outcome['success'] = True
+                        outcome['error'] = None
+                        try:
+                            outcome['post_id'] = response.json().get('id')
+                        except ValueError:
+                            pass
+                        break
+                    outcome['error'] = f"{response.status_code} - {response.text[:200]}"
+                    if response.status_code not in self.RETRY_STATUSES:
+                        break
+                    # 429 پیش از پردازش رد می‌شود ولی 5xx ممکن است بعد از ساخت پست برگشته باشد
+                    if response.status_code != 429 and not self._safe_to_retry(article, outcome):
+                        break
+                except requests.ReadTimeout as e:
+                    # درخواست ارسال شده و ممکن است پست ساخته شده باشد
+                    outcome['error'] = str(e)
+                    if not self._safe_to_retry(article, outcome):
+                        break
+                except requests.ConnectionError as e:
+                    # اتصال برقرار نشد (شامل ConnectTimeout) - درخواستی به سرور نرسیده است
+                    outcome['error'] = str(e)
+                except requests.RequestException as e:
+                    outcome['error'] = str(e)
+                    break
+
+                if attempt < self.max_retries:
+                    delay = self._retry_delay(response, attempt)
+                    print(f"⏳ تلاش مجدد ارسال '{article['title']}' پس از {delay:.1f} ثانیه ({outcome['error']})")
+                    time.sleep(delay)
+
+        outcome['seconds'] = round(time.perf_counter() - start, 3)
+        outcome['timestamp'] = datetime.now().isoformat()
+        return outcome
+
+    def post_to_website(self, article):
+        """ارسال مقاله به وبسایت"""
+        print(f"🌐 در حال ارسال مقاله به وبسایت: {article['title']}")
+        outcome = self.publish(article)
+        if outcome['simulated']:
+            print("⚠️ کلید وبسایت تنظیم نشده - شبیه‌سازی ارسال")
+        elif outcome['success']:
+            print(f"✅ مقاله '{article['title']}' در وبسایت منتشر شد")
+        else:
+            print(f"❌ خطا در انتشار: {outcome['error']}")
+        return outcome['success']
+
     def post_multiple_articles(self, articles):
-        """ارسال چندین مقاله به وبسایت"""
+        """ارسال همزمان چندین مقاله (حداکثر max_workers ارسال در جریان)"""
         print(f"\n🚀 شروع ارسال {len(articles)} مقاله به وبسایت...")
-        results = []
-        for i, article in enumerate(articles, 1):
-            print(f"📤 ارسال مقاله {i}/{len(articles)}: {article['title']}")
-            result = self.post_to_website(article)
-            results.append({
-                'title': article['title'],
-                'success': result,
-                'timestamp': datetime.now().isoformat()
-            })
-            time.sleep(2)  # تأخیر بین ارسال‌ها
-        
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            results = list(executor.map(self.publish, articles))
+
+        for result in results:
+            if not result['success']:
+                print(f"❌ ارسال '{result['title']}' ناموفق: {result['error']}")
+
         success_count = sum(1 for r in results if r['success'])
-        print(f"📊 نتایج ارسال: {success_count}/{len(articles)} موفق")
+        print(f"📊 نتایج ارسال: {success_count}/{len(articles)} موفق در {time.perf_counter() - start:.1f} ثانیه")
         return results
+
+    def _publish_claimed(self, item):
+        """ارسال یک مورد صف - اگر قبلاً تلاش شده، اول پست موجود با همان کلید جستجو می‌شود"""
+        if item['attempts'] > 1:
+            try:
+                post_id = self.find_existing_post(item['idempotency_key'])
+            except (requests.RequestException, ValueError):
+                post_id = None
+            if post_id is not None:
+                print(f"♻️ '{item['title']}' قبلاً منتشر شده بود (پست {post_id})")
+                return {'title': item['title'], 'success': True, 'status_code': 200, 'post_id': post_id,
+                        'attempts': 0, 'error': None, 'simulated': False, 'recovered': True,
+                        'seconds': 0.0, 'timestamp': datetime.now().isoformat()}
+        return self.publish(item)
+
+    def drain_outbox(self, db, batch_size=20, max_batches=None, lease_seconds=300, max_attempts=5):
+        """تخلیه صف انتشار دیتابیس به صورت دسته‌ای تا خالی شدن صف
+
+        نتیجه هر دسته بلافاصله در دیتابیس ثبت می‌شود، پس اجرای بعدی (حتی پس از crash)
+        از همان جایی که کار متوقف شده ادامه می‌دهد.
+        """
+        summary = {'published': 0, 'failed': 0, 'batches': 0}
+        if not self.api_key or not self.website_url:
+            print("⚠️ کلید وبسایت تنظیم نشده - صف انتشار برای اجرای بعدی باقی می‌ماند")
+            return summary
+
+        while max_batches is None or summary['batches'] < max_batches:
+            batch = db.claim_publish_batch(batch_size, lease_seconds)
+            if not batch:
+                break
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                outcomes = list(executor.map(self._publish_claimed, batch))
+            db.complete_publish_batch(list(zip(batch, outcomes)), max_attempts=max_attempts)
+
+            summary['batches'] += 1
+            for outcome in outcomes:
+                summary['published' if outcome['success'] else 'failed'] += 1
+                if not outcome['success']:
+                    print(f"❌ ارسال '{outcome['title']}' ناموفق: {outcome['error']}")
+
+        print(f"📊 صف انتشار: {summary['published']} منتشر شد، {summary['failed']} ناموفق "
+              f"در {summary['batches']} دسته - وضعیت صف: {db.outbox_status()}")
+        return summary
+
+def main():
+    """تخلیه صف انتشار مستقل از اجرای ربات (مثلاً با cron)"""
+    import argparse
+    from database_handler import MedicalDatabase
+    parser = argparse.ArgumentParser(description="ارسال مقالات صف انتشار به وبسایت")
+    parser.add_argument('--db', default="medical_content.db", help="مسیر دیتابیس")
+    parser.add_argument('--batch-size', type=int, default=20, help="تعداد مقالات هر دسته")
+    parser.add_argument('--workers', type=int, default=4, help="تعداد ارسال همزمان")
+    args = parser.parse_args()
+
+    poster = WebsiteAutoPoster(max_workers=args.workers)
+    poster.drain_outbox(MedicalDatabase(args.db), batch_size=args.batch_size)
+
+if __name__ == "__main__":
+    main()